@@ -0,0 +1,55 @@
+"""
+Compare time and peak memory of the Excel output paths of OutputManager.
+
+Usage: python benchmarks/bench_excel_output.py --rows 200000 --sheets 3
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from scorpion.output_manager import _write_excel_streaming
+
+from synthetic import synthetic_drinks
+
+
+def write_excel_writer(file_name, sheets, engine):
+    with pd.ExcelWriter(file_name, engine=engine) as writer:
+        for sheet_name, df in sheets:
+            df.to_excel(writer, sheet_name=sheet_name)
+
+
+def measure(write, file_name, sheets):
+    tracemalloc.start()
+    start = time.perf_counter()
+    write(file_name, sheets)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--sheets', type=int, default=2)
+    args = parser.parse_args()
+
+    sheets = [(f'sheet_{number}', synthetic_drinks(args.rows)) for number in range(args.sheets)]
+    paths = {
+        'openpyxl': lambda file_name, sheets_: write_excel_writer(file_name, sheets_, 'openpyxl'),
+        'xlsxwriter': lambda file_name, sheets_: write_excel_writer(file_name, sheets_, 'xlsxwriter'),
+        'streaming': _write_excel_streaming,
+    }
+    print(f'{"engine":<12}{"seconds":>10}{"peak MiB":>12}')
+    with tempfile.TemporaryDirectory() as directory:
+        for engine, write in paths.items():
+            duration, peak = measure(write, os.path.join(directory, f'{engine}.xlsx'), sheets)
+            print(f'{engine:<12}{duration:>10.2f}{peak / 2 ** 20:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
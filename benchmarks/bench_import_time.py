@@ -0,0 +1,95 @@
+"""
+Measure cold start time of importing scorpion.config and of validating a config, and fail above a threshold.
+
+Every measurement runs in a fresh interpreter; the median of the repeats is compared with the threshold.
+Besides the time, the benchmark fails if pandas is imported, which is the regression it guards against.
+
+Usage: python benchmarks/bench_import_time.py --repeats 7 --threshold 0.25
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG = textwrap.dedent("""\
+    config:
+      sources:
+        priority: source
+        required_config_items_in_source: [priority, filepath_or_buffer]
+        defaults:
+          format: csv
+        data:
+          drinks:
+            priority: source
+            filepath_or_buffer: data/sources/drinks.csv
+      process-steps:
+        - uses_data_processor: count_countries
+          step: 1
+          skip: false
+          description: ''
+          uses_data_frames_for_input: [drinks]
+          expected_output_data_frames: [country_count]
+      output:
+        skip: false
+        target_format: csv
+        target_folder: output
+        target_file_name: drinks
+        output_tables: []
+    """)
+
+# Prints the seconds of the measured statement and whether pandas was imported
+MEASURE = textwrap.dedent("""\
+    import sys, time
+    start = time.perf_counter()
+    {statement}
+    print(time.perf_counter() - start, 'pandas' in sys.modules)
+    """)
+
+SCENARIOS = {
+    'import scorpion.config': 'import scorpion.config',
+    'scorpion validate': 'import scorpion.main; scorpion.main.validate([{config_file!r}])',
+}
+
+
+def measure(statement: str) -> tuple:
+    environment = {**os.environ, 'PYTHONPATH': REPOSITORY_DIRECTORY}
+    output = subprocess.run(
+        [sys.executable, '-c', MEASURE.format(statement=statement)],
+        env=environment, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(output[-2]), output[-1] == 'True'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--threshold', type=float, default=0.25, help='Maximal median seconds per scenario')
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, 'config.yaml')
+        with open(config_file, 'w') as file:
+            file.write(CONFIG)
+
+        print(f'{"scenario":<26}{"median s":>10}{"max s":>10}  pandas imported')
+        for scenario, statement in SCENARIOS.items():
+            results = [measure(statement.format(config_file=config_file)) for _ in range(args.repeats)]
+            durations = [duration for duration, _ in results]
+            pandas_imported = any(imported for _, imported in results)
+            median = statistics.median(durations)
+            print(f'{scenario:<26}{median:>10.3f}{max(durations):>10.3f}  {pandas_imported}')
+            failed = failed or pandas_imported or median > args.threshold
+
+    if failed:
+        print(f'Import time regression: a scenario imports pandas or exceeds {args.threshold}s')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
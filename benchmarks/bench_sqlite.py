@@ -0,0 +1,62 @@
+"""
+Compare rows per second of the SQLite sink and source against the pandas defaults.
+
+Usage: python benchmarks/bench_sqlite.py --rows 500000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from scorpion.output_manager import _write_sqlite
+from scorpion.sources import _read_sqlite
+
+from synthetic import synthetic_drinks
+
+
+def write_to_sql(file_name, df):
+    with sqlite3.connect(file_name) as connection:
+        df.to_sql('drinks', connection)
+    connection.close()
+
+
+def read_sql(file_name):
+    with sqlite3.connect(file_name) as connection:
+        df = pd.read_sql_query('SELECT * FROM drinks', connection)
+    connection.close()
+    return df
+
+
+def rows_per_second(function, rows):
+    start = time.perf_counter()
+    function()
+    return rows / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--batch-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = synthetic_drinks(args.rows)
+    print(f'{"path":<24}{"rows/s":>14}')
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = os.path.join(directory, 'to_sql.sqlite')
+        bulk = os.path.join(directory, 'bulk.sqlite')
+        results = {
+            'write DataFrame.to_sql': rows_per_second(lambda: write_to_sql(baseline, df), args.rows),
+            'write bulk': rows_per_second(lambda: _write_sqlite(bulk, [('drinks', df)], args.batch_size), args.rows),
+            'read read_sql_query': rows_per_second(lambda: read_sql(bulk), args.rows),
+            'read batched': rows_per_second(
+                lambda: _read_sqlite(bulk, 'SELECT * FROM drinks', args.batch_size), args.rows),
+        }
+        for path, value in results.items():
+            print(f'{path:<24}{value:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Benchmark suite of scorpion on synthetic sources shaped like data/sources/drinks.csv.
+
+Measures source loading, config resolution, processor execution and every output format end to end,
+for every combination of --rows and --extra-columns. Each measurement records seconds, peak RSS and
+throughput, and is appended as one JSON line to --results, so that results can be tracked over time.
+
+Usage: PYTHONPATH=. python benchmarks/bench_suite.py --rows 1e3 1e5 1e7 --extra-columns 0 200
+"""
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from scorpion.config import Config
+from scorpion.data_processor import DataProcessor
+from scorpion.pipeline import Pipeline
+from scorpion.run_history import PeakMemorySampler
+from scorpion.sources import SourceFileLoader, resolve_source_configs
+
+from synthetic import write_synthetic_source
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_FORMATS = ['csv', 'parquet', 'feather', 'arrow', 'sqlite', 'excel']
+# Rows of an Excel sheet are limited to 2^20, including the header
+EXCEL_MAX_ROWS = 2 ** 20 - 1
+SOURCE_COUNT_FOR_CONFIG_RESOLUTION = 1_000
+
+
+class DataProcessorServingsByContinent(DataProcessor):
+    key = 'servings_by_continent'
+
+    def process(self) -> None:
+        df = self.get_data_frame_by_key('drinks')
+        df = df.assign(total_servings=df['beer_servings'] + df['spirit_servings'] + df['wine_servings'])
+        self.add_data_frame_to_output('drinks_total', df)
+        self.add_data_frame_to_output(
+            'servings_by_continent', df.groupby('continent', as_index=False)['total_servings'].sum())
+
+
+PROCESS_STEPS = [{
+    'uses_data_processor': 'servings_by_continent',
+    'step': 1,
+    'skip': False,
+    'description': '',
+    'uses_data_frames_for_input': ['drinks'],
+    'expected_output_data_frames': ['drinks_total', 'servings_by_continent'],
+}]
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    scenario: str
+    rows: Optional[int]
+    columns: Optional[int]
+    # Number of processed items, rows for data paths and sources for config resolution
+    items: int
+    seconds: float
+    peak_rss_bytes: Optional[int]
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else float('inf')
+
+
+def measure(scenario: str, function: Callable[[], Any], items: int, rows: int = None,
+            columns: int = None) -> BenchmarkResult:
+    with PeakMemorySampler(interval=0.005) as sampler:
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+    return BenchmarkResult(scenario, rows, columns, items, seconds, sampler.peak_bytes)
+
+
+def sources_config(drinks_file: str) -> Dict[str, Any]:
+    return {
+        'priority': 'source',
+        'required_config_items_in_source': ['priority', 'filepath_or_buffer'],
+        'defaults': {'format': 'csv'},
+        'data': {'drinks': {'priority': 'source', 'filepath_or_buffer': drinks_file}},
+    }
+
+
+def output_config(target_format: str, target_folder: str) -> Dict[str, Any]:
+    return {
+        'skip': False,
+        'target_format': target_format,
+        'target_folder': target_folder,
+        'target_file_name': 'drinks',
+        'current_date_suffix_to_target_file_name': False,
+        'output_tables': [
+            {'skip': False, 'output_table_name': name, 'output_table_data_frame': name, 'output_table_columns': []}
+            for name in ['drinks_total', 'servings_by_continent']
+        ],
+    }
+
+
+def resolve_many_sources() -> None:
+    config = Config({'sources': {
+        **sources_config('drinks.csv'),
+        'data': {f'drinks_{number}': {'priority': 'source', 'filepath_or_buffer': f'drinks_{number}.csv'}
+                 for number in range(SOURCE_COUNT_FOR_CONFIG_RESOLUTION)},
+    }})
+    resolve_source_configs(config)
+
+
+def run_end_to_end(drinks_file: str, target_format: str, target_folder: str) -> None:
+    config = Config({
+        'sources': sources_config(drinks_file),
+        'process-steps': PROCESS_STEPS,
+        'output': output_config(target_format, target_folder),
+    })
+    Pipeline.from_config(config, [DataProcessorServingsByContinent]).run()
+
+
+def benchmark_size(rows: int, extra_columns: int, formats: List[str], directory: str) -> List[BenchmarkResult]:
+    columns = 6 + extra_columns
+    csv_file = write_synthetic_source(os.path.join(directory, 'drinks.csv'), rows, extra_columns)
+    sqlite_file = write_synthetic_source(os.path.join(directory, 'drinks.sqlite'), rows, extra_columns, 'sqlite')
+    results = [
+        measure('load_source/csv', lambda: SourceFileLoader.load(format='csv', filepath_or_buffer=csv_file),
+                rows, rows, columns),
+        measure('load_source/sqlite', lambda: SourceFileLoader.load(
+            format='sqlite', database=sqlite_file, query='SELECT * FROM drinks'), rows, rows, columns),
+    ]
+
+    pipeline = Pipeline(PROCESS_STEPS, [DataProcessorServingsByContinent], output_config('csv', directory),
+                        data_frames={'drinks': pd.read_csv(csv_file)})
+    results.append(measure('process', pipeline.data_processor_manager.process, rows, rows, columns))
+    del pipeline
+
+    for target_format in formats:
+        if target_format == 'excel' and rows > EXCEL_MAX_ROWS:
+            print(f'Skipping end_to_end/excel: {rows} rows exceed the rows of an Excel sheet')
+            continue
+        target_folder = os.path.join(directory, f'output_{target_format}')
+        results.append(measure(f'end_to_end/{target_format}',
+                               lambda: run_end_to_end(csv_file, target_format, target_folder), rows, rows, columns))
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True, cwd=REPOSITORY_DIRECTORY).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'host': platform.node(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+    }
+
+
+def count(value: str) -> int:
+    # Accepts scientific notation, e.g. 1e6
+    return int(float(value))
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=count, nargs='+', default=[10 ** 3, 10 ** 4, 10 ** 5])
+    parser.add_argument('--extra-columns', type=int, nargs='+', default=[0])
+    parser.add_argument('--formats', nargs='+', choices=OUTPUT_FORMATS, default=OUTPUT_FORMATS)
+    parser.add_argument('--results', default='benchmark_results.jsonl', help='JSON lines file the results are appended to')
+    parser.add_argument('--work-dir', default=None, help='Directory of the synthetic sources and outputs')
+    args = parser.parse_args(argv)
+
+    results = [measure('resolve_config', resolve_many_sources, SOURCE_COUNT_FOR_CONFIG_RESOLUTION)]
+    for rows in args.rows:
+        for extra_columns in args.extra_columns:
+            with tempfile.TemporaryDirectory(dir=args.work_dir) as directory:
+                results.extend(benchmark_size(rows, extra_columns, args.formats, directory))
+
+    print(f'{"scenario":<22}{"rows":>12}{"columns":>9}{"seconds":>10}{"peak RSS MiB":>14}{"items/s":>14}')
+    for result in results:
+        peak_rss = f'{result.peak_rss_bytes / 2 ** 20:.1f}' if result.peak_rss_bytes is not None else 'n/a'
+        print(f'{result.scenario:<22}{result.rows or "":>12}{result.columns or "":>9}{result.seconds:>10.3f}'
+              f'{peak_rss:>14}{result.items_per_second:>14,.0f}')
+
+    environment_ = environment()
+    with open(args.results, 'a') as results_file:
+        for result in results:
+            record = {**environment_, **dataclasses.asdict(result), 'items_per_second': result.items_per_second}
+            results_file.write(json.dumps(record) + '\n')
+    print(f'Results appended to {args.results}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Performance regression gate: run fixed timed scenarios and compare them with a committed baseline.
+
+Every scenario runs --repeats times after one warm-up run. A scenario regresses if the median of its
+run times exceeds the baseline median by more than --threshold plus --iqr-factor times the
+interquartile range (IQR) of the baseline, which absorbs the usual noise of the host. The exit
+status is 1 if any scenario regresses.
+
+The baseline depends on the host; record it on the host which runs the gate:
+
+    PYTHONPATH=. python benchmarks/perf_gate.py --update-baseline
+    PYTHONPATH=. python benchmarks/perf_gate.py
+
+The baseline records the host, Python and pandas version it was measured with. If they differ from the
+current environment, the gate fails with exit status 2 without timing anything, because the numbers are
+not comparable; --allow-environment-mismatch compares anyway and only warns.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from scorpion.config import Config
+from scorpion.data_processor import DataProcessor
+from scorpion.pipeline import Pipeline
+from scorpion.sources import SourceFileLoader
+
+from synthetic import synthetic_drinks, write_synthetic_source
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perf_baseline.json')
+SOURCE_ROWS = 100_000
+CONFIG_ATTRIBUTE_ACCESSES = 10_000
+STUB_PROCESS_INSTRUCTIONS = 50
+OUTPUT_ROWS = 100_000
+
+
+class DataProcessorStub(DataProcessor):
+    """Passes its input on unchanged, so that only the orchestration of process instructions is timed."""
+    key = 'stub'
+
+    def process(self) -> None:
+        df = next(iter(self._input_data_frames.values()))
+        for output_key in self._expected_output_data_frames:
+            self.add_data_frame_to_output(output_key, df)
+
+
+def output_configuration(target_format: str, target_folder: str) -> Dict[str, Any]:
+    return {
+        'skip': False,
+        'target_format': target_format,
+        'target_folder': target_folder,
+        'target_file_name': 'drinks',
+        'current_date_suffix_to_target_file_name': False,
+        'output_tables': [{'skip': False, 'output_table_name': 'drinks', 'output_table_data_frame': 'drinks',
+                           'output_table_columns': []}],
+    }
+
+
+# A scenario prepares its state untimed and returns the function which is timed
+def source_load_csv(directory: str) -> Callable[[], Any]:
+    csv_file = os.path.join(directory, 'drinks.csv')
+    if not os.path.exists(csv_file):
+        write_synthetic_source(csv_file, SOURCE_ROWS)
+    return lambda: SourceFileLoader.load(format='csv', filepath_or_buffer=csv_file)
+
+
+def config_attribute_access(directory: str) -> Callable[[], Any]:
+    config = Config({'sources': {'defaults': {'format': 'csv', 'encoding': 'UTF-8'}, 'priority': 'source'}})
+
+    def access():
+        for _ in range(CONFIG_ATTRIBUTE_ACCESSES):
+            config.sources.defaults.format
+    return access
+
+
+def exec_process_instructions(directory: str) -> Callable[[], Any]:
+    process_instructions = [{
+        'uses_data_processor': 'stub',
+        'step': step,
+        'skip': False,
+        'description': '',
+        'uses_data_frames_for_input': [f'drinks_{step - 1}'],
+        'expected_output_data_frames': [f'drinks_{step}'],
+    } for step in range(1, STUB_PROCESS_INSTRUCTIONS + 1)]
+    pipeline = Pipeline(process_instructions, [DataProcessorStub], output_configuration('csv', directory),
+                        data_frames={'drinks_0': synthetic_drinks(1_000)})
+    return pipeline.data_processor_manager._exec_process_instructions
+
+
+def output_writing(target_format: str) -> Callable[[str], Callable[[], Any]]:
+    def scenario(directory: str) -> Callable[[], Any]:
+        target_folder = tempfile.mkdtemp(dir=directory)
+        pipeline = Pipeline([], [], output_configuration(target_format, target_folder),
+                            data_frames={'drinks': synthetic_drinks(OUTPUT_ROWS)})
+        return pipeline.output_manager.produce_output
+    return scenario
+
+
+SCENARIOS = {
+    'source_load/csv': source_load_csv,
+    'config/attribute_access': config_attribute_access,
+    'data_processor_manager/exec_process_instructions': exec_process_instructions,
+    'output/csv': output_writing('csv'),
+    'output/parquet': output_writing('parquet'),
+}
+
+
+def environment() -> Dict[str, str]:
+    return {'host': platform.node(), 'python': platform.python_version(), 'pandas': pd.__version__}
+
+
+def environment_differences(baseline_environment: Dict[str, str], current_environment: Dict[str, str]) -> List[str]:
+    return [f'{key}: baseline {baseline_environment.get(key)}, current {value}'
+            for key, value in current_environment.items() if baseline_environment.get(key) != value]
+
+
+def time_scenario(scenario: Callable[[str], Callable[[], Any]], repeats: int, directory: str) -> List[float]:
+    durations = []
+    # The first run warms up imports and caches and is not counted
+    for _ in range(repeats + 1):
+        function = scenario(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            durations.append(time.perf_counter() - start)
+    return durations[1:]
+
+
+def summarize(durations: List[float]) -> Dict[str, Any]:
+    quartiles = statistics.quantiles(durations, n=4)
+    return {'median': statistics.median(durations), 'iqr': quartiles[2] - quartiles[0], 'repeats': len(durations)}
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float,
+            iqr_factor: float) -> List[Dict[str, Any]]:
+    rows = []
+    for name, summary in current.items():
+        row = {'scenario': name, 'median': summary['median'], 'iqr': summary['iqr'],
+               'baseline_median': None, 'limit': None, 'change': None, 'status': 'new'}
+        if name in baseline:
+            baseline_median = baseline[name]['median']
+            row['baseline_median'] = baseline_median
+            row['limit'] = baseline_median * (1 + threshold) + iqr_factor * baseline[name]['iqr']
+            row['change'] = summary['median'] / baseline_median - 1
+            row['status'] = 'REGRESSED' if summary['median'] > row['limit'] else 'ok'
+        rows.append(row)
+    return rows
+
+
+def milliseconds(seconds: float) -> str:
+    return f'{seconds * 1000:.2f}' if seconds is not None else '-'
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    print(f'{"scenario":<52}{"baseline ms":>13}{"median ms":>11}{"IQR ms":>9}{"limit ms":>11}{"change":>9}  status')
+    for row in rows:
+        change = f'{row["change"]:+.1%}' if row['change'] is not None else '-'
+        print(f'{row["scenario"]:<52}{milliseconds(row["baseline_median"]):>13}{milliseconds(row["median"]):>11}'
+              f'{milliseconds(row["iqr"]):>9}{milliseconds(row["limit"]):>11}{change:>9}  {row["status"]}')
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='Record the results as new baseline')
+    parser.add_argument('--repeats', type=int, default=9)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed relative slowdown of the median, e.g. 0.25 for 25%%')
+    parser.add_argument('--iqr-factor', type=float, default=1.5,
+                        help='Multiple of the baseline IQR which is allowed on top of the threshold')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--allow-environment-mismatch', action='store_true',
+                        help='Compare with a baseline of another host, Python or pandas version and only warn')
+    args = parser.parse_args(argv)
+    if args.repeats < 2:
+        parser.error('--repeats needs at least 2 runs for the IQR')
+
+    baseline = None
+    if not args.update_baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        differences = environment_differences(baseline.get('environment', {}), environment())
+        if len(differences) > 0:
+            print(f'Baseline {args.baseline} was recorded in another environment:')
+            for difference in differences:
+                print(f'  {difference}')
+            if not args.allow_environment_mismatch:
+                print('Record a baseline on this host with --update-baseline, '
+                      'or compare anyway with --allow-environment-mismatch')
+                return 2
+            print('Warning: comparing with the baseline anyway; timings may differ because of the environment')
+
+    with tempfile.TemporaryDirectory() as directory:
+        current = {name: summarize(time_scenario(SCENARIOS[name], args.repeats, directory))
+                   for name in args.scenarios}
+
+    if args.update_baseline:
+        baseline = {
+            'environment': environment(),
+            'scenarios': current,
+        }
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+            baseline_file.write('\n')
+        print_table(compare(current, {}, args.threshold, args.iqr_factor))
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    rows = compare(current, baseline['scenarios'], args.threshold, args.iqr_factor)
+    print_table(rows)
+    regressed = [row['scenario'] for row in rows if row['status'] == 'REGRESSED']
+    if len(regressed) > 0:
+        print(f'Performance regression in {len(regressed)} scenarios: {", ".join(regressed)}')
+        return 1
+    print('No performance regression')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
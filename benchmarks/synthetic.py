@@ -0,0 +1,73 @@
+"""
+Synthetic sources shaped like data/sources/drinks.csv, scalable in rows and widened by extra columns.
+
+Data is generated in chunks with a fixed seed per chunk, so that large sources (10^8 rows) can be
+written without holding them in memory and every run produces the same data.
+"""
+import os
+import sqlite3
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+CONTINENTS = ['AF', 'AS', 'EU', 'NA', 'OC', 'SA']
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def synthetic_drinks(rows: int, extra_columns: int = 0, seed: int = 0, first_row: int = 0) -> pd.DataFrame:
+    """
+    Data frame with the columns of drinks.csv and extra_columns additional columns.
+
+    Every fourth extra column holds strings of low cardinality, the others hold floats.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {
+        'country': [f'country_{number}' for number in range(first_row, first_row + rows)],
+        'beer_servings': rng.integers(0, 400, rows),
+        'spirit_servings': rng.integers(0, 400, rows),
+        'wine_servings': rng.integers(0, 400, rows),
+        'total_litres_of_pure_alcohol': (rng.random(rows) * 15).round(1),
+        'continent': rng.choice(CONTINENTS, rows),
+    }
+    for number in range(extra_columns):
+        columns[f'extra_{number:03d}'] = (
+            rng.choice([f'category_{category}' for category in range(20)], rows)
+            if number % 4 == 3
+            else rng.random(rows)
+        )
+    return pd.DataFrame(columns)
+
+
+def iter_synthetic_drinks(
+        rows: int,
+        extra_columns: int = 0,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    for chunk_number, first_row in enumerate(range(0, rows, chunk_rows)):
+        yield synthetic_drinks(min(chunk_rows, rows - first_row), extra_columns, seed=chunk_number,
+                               first_row=first_row)
+
+
+def write_synthetic_source(
+        file_name: str,
+        rows: int,
+        extra_columns: int = 0,
+        format_: str = 'csv',
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> str:
+    """Write a synthetic source as csv, or as table "drinks" of a SQLite database, chunk by chunk."""
+    if os.path.exists(file_name):
+        os.remove(file_name)
+    chunks = iter_synthetic_drinks(rows, extra_columns, chunk_rows)
+    if format_ == 'csv':
+        for chunk_number, chunk in enumerate(chunks):
+            chunk.to_csv(file_name, mode='a', header=chunk_number == 0, index=False)
+    elif format_ == 'sqlite':
+        with sqlite3.connect(file_name) as connection:
+            for chunk in chunks:
+                chunk.to_sql('drinks', connection, if_exists='append', index=False)
+        connection.close()
+    else:
+        raise ValueError(f'Format {format_} is not supported for synthetic sources')
+    return file_name
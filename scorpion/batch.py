@@ -0,0 +1,82 @@
+"""
+Run many configs in one process, e.g. one config per region, with a shared source cache.
+
+Usage: python -m scorpion.batch config_1.yaml config_2.yaml --max-workers 4
+"""
+import argparse
+import importlib
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from scorpion.config import Config
+from scorpion.pipeline import Pipeline
+from scorpion.sources import SourceCache
+from scorpion.utils import load_config
+
+
+@dataclass
+class BatchResult:
+    config_file: str
+    succeeded: bool
+    duration: float
+    error: Optional[str] = None
+
+
+def load_run_config(config_file: str) -> Config:
+    return Config(load_config(config_file, 'yaml', skip_first_level=True, first_level_key='config'))
+
+
+def _run_config(config_file: str, data_processors: List[type], source_cache: SourceCache) -> BatchResult:
+    # Every failure is caught, so that one broken config does not stop the other configs of the batch
+    start = time.perf_counter()
+    try:
+        Pipeline.from_config(load_run_config(config_file), data_processors, source_cache).run()
+    except Exception:
+        return BatchResult(config_file, False, time.perf_counter() - start, traceback.format_exc())
+    return BatchResult(config_file, True, time.perf_counter() - start)
+
+
+def run_batch(
+        config_files: Sequence[str],
+        data_processors: List[type],
+        max_workers: int = None,
+        source_cache: SourceCache = None,
+) -> List[BatchResult]:
+    """
+    Run the pipeline of every config file and return one result per config file, in the given order.
+
+    Pipelines run on a thread pool, so that all of them share one in-memory SourceCache: every distinct
+    source is loaded once for the whole batch. Pandas releases the GIL in parsing and most computations.
+    """
+    source_cache = source_cache if source_cache is not None else SourceCache()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_run_config, config_file, data_processors, source_cache)
+                   for config_file in config_files]
+        return [future.result() for future in futures]
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('config_files', nargs='+')
+    parser.add_argument('--data-processors-module', default='scorpion.data_processor',
+                        help='Module with a list "data_processors" of the data processor classes')
+    parser.add_argument('--max-workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    data_processors = importlib.import_module(args.data_processors_module).data_processors
+    source_cache = SourceCache()
+    results = run_batch(args.config_files, data_processors, args.max_workers, source_cache)
+    for result in results:
+        print(f'{"ok" if result.succeeded else "FAILED":<8}{result.duration:>10.2f}s  {result.config_file}')
+        if not result.succeeded:
+            print(result.error)
+    print(f'{sum(result.succeeded for result in results)} of {len(results)} configs succeeded; '
+          f'{source_cache.load_count} sources loaded, {source_cache.hit_count} reused')
+    return 0 if all(result.succeeded for result in results) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+import os
+import json
+import dataclasses
+import hashlib
+import pandas as pd
+from typing import List, Dict, Iterable, Tuple, Any
+
+from scorpion.util_classes import auto_repr
+from scorpion.utils import hash_data_frame
+
+
+class CheckpointError(Exception):
+    pass
+
+
+@auto_repr
+class CheckpointStore:
+    """
+    Persist the data frames produced by every completed process instruction together with a run manifest.
+
+    A resumed run continues with the first process instruction which is not recorded as completed;
+    resuming is only allowed if the fingerprint of process instructions and input data frames is unchanged.
+    Data frames are stored as pickle files, which round-trip every pandas dtype without extra dependencies.
+    """
+
+    manifest_file_name = 'manifest.json'
+    data_frame_file_extension = 'pkl'
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._manifest = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, self.manifest_file_name)
+
+    @property
+    def completed_steps(self) -> List[int]:
+        if self._manifest is None:
+            return []
+        return [completed_step['step'] for completed_step in self._manifest['completed_steps']]
+
+    @staticmethod
+    def fingerprint(process_instructions: Iterable[Any], data_frames: Iterable[Tuple[str, Any]]) -> str:
+        # Data frames are hashed one at a time, so that a lazy iterable holds only one of them in memory;
+        # data frames which are read in chunks are hashed chunk by chunk
+        process_instructions_raw = [dataclasses.asdict(process_instruction)
+                                    for process_instruction in process_instructions]
+        data_frame_hashes = {key: hash_data_frame(df) if isinstance(df, pd.DataFrame) else
+                             [hash_data_frame(chunk) for chunk in df]
+                             for key, df in data_frames}
+        content = json.dumps(
+            {'process_instructions': process_instructions_raw, 'data_frames': data_frame_hashes},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def open(self, fingerprint: str, resume: bool = False) -> List[int]:
+        if resume:
+            manifest = self._read_manifest()
+            if manifest['fingerprint'] != fingerprint:
+                raise CheckpointError(
+                    f'Checkpoint in "{self.directory}" cannot be resumed;'
+                    f'\nprocess instructions or input data frames have changed since the checkpoint was written'
+                )
+            self._manifest = manifest
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            self._remove_data_frame_files()
+            self._manifest = {'fingerprint': fingerprint, 'completed_steps': []}
+            self._write_manifest()
+        return self.completed_steps
+
+    def save_step(self, step: int, data_frames: Dict[str, pd.DataFrame]) -> None:
+        self.save_steps({step: data_frames})
+
+    def save_steps(self, data_frames_by_step: Dict[int, Dict[str, pd.DataFrame]]) -> None:
+        """
+        Save several steps as one unit, e.g. a streaming chain: a resumed run skips all of them or none.
+
+        The steps of a streaming chain pass data frames to each other which are never stored, therefore
+        a run cannot be resumed after one of them.
+        """
+        if self._manifest is None:
+            raise CheckpointError(f'{self.__class__.__qualname__} must be opened before steps can be saved')
+        completed_steps = []
+        for step, data_frames in data_frames_by_step.items():
+            files = {}
+            for number, (key, df) in enumerate(data_frames.items()):
+                file_name = f'step_{step}__{number}.{self.data_frame_file_extension}'
+                df.to_pickle(os.path.join(self.directory, file_name))
+                files[key] = file_name
+            completed_steps.append({'step': step, 'data_frames': files})
+        # The manifest is written once all data frames are written
+        self._manifest['completed_steps'].extend(completed_steps)
+        self._write_manifest()
+
+    def load_data_frames(self) -> Dict[str, pd.DataFrame]:
+        if self._manifest is None:
+            return {}
+        return {key: pd.read_pickle(os.path.join(self.directory, file_name))
+                for completed_step in self._manifest['completed_steps']
+                for key, file_name in completed_step['data_frames'].items()}
+
+    def _remove_data_frame_files(self) -> None:
+        # Data frames of an earlier run are not part of the new manifest and are never read again
+        for file_name in os.listdir(self.directory):
+            if file_name.startswith('step_') and file_name.endswith(f'.{self.data_frame_file_extension}'):
+                os.remove(os.path.join(self.directory, file_name))
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path) as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError as err:
+            raise CheckpointError(f'No checkpoint manifest found in "{self.directory}"') from err
+
+    def _write_manifest(self) -> None:
+        # Write to a temporary file first so that an interrupted run never leaves a truncated manifest
+        temporary_path = f'{self.manifest_path}.tmp'
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump(self._manifest, manifest_file, indent=2)
+        os.replace(temporary_path, self.manifest_path)
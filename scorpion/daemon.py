@@ -0,0 +1,203 @@
+"""
+Long-lived scorpion process which keeps imports and loaded sources warm and runs configs on request.
+
+Usage: python -m scorpion.daemon --port 8765
+
+Run requests are posted as JSON to http://127.0.0.1:<port>/run, with either a config file or an inline
+config, i.e. the mapping below the first level key "config":
+
+    curl -d '{"config_file": "config.yaml"}' http://127.0.0.1:8765/run
+
+With --cache-dir, every run writes checkpoints, and a request with "resume": true skips the steps
+which completed in the last run of the same config.
+
+GET /status returns the statistics of the runs and of the source cache.
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+from scorpion.batch import load_run_config
+from scorpion.checkpoint import CheckpointStore
+from scorpion.config import Config
+from scorpion.main import parse_bytes
+from scorpion.pipeline import Pipeline
+from scorpion.sources import SourceCache
+
+
+class DaemonError(Exception):
+    pass
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self) -> None:
+        if self.path != '/status':
+            self._send_json(404, {'error': f'Unknown path {self.path}'})
+            return
+        self._send_json(200, self.server.scorpion_daemon.status())
+
+    def do_POST(self) -> None:
+        if self.path != '/run':
+            self._send_json(404, {'error': f'Unknown path {self.path}'})
+            return
+        try:
+            run_request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            config = self.server.scorpion_daemon.config_from_request(run_request)
+            resume = self.server.scorpion_daemon.resume_from_request(run_request)
+        except (ValueError, DaemonError) as err:
+            self._send_json(400, {'status': 'rejected', 'error': str(err)})
+            return
+        result = self.server.scorpion_daemon.run(config, resume=resume)
+        self._send_json(200 if result['status'] == 'succeeded' else 500, result)
+
+    def _send_json(self, status_code: int, body: Dict[str, Any]) -> None:
+        content = json.dumps(body, default=str).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class ScorpionDaemon:
+    """
+    Serves run requests on localhost; every request runs on its own thread in its own Pipeline.
+
+    Sources are loaded through one SourceCache, so that a source which is used by many requests is
+    parsed once and loaded again only when its file changes. With source_cache_bytes, the least recently
+    used sources are evicted from the cache once it holds more data frame memory.
+
+    With cache_directory, every run writes checkpoints into a directory of its config below cache_directory,
+    so that a later run of the same config can be resumed; runs of the same config wait for each other.
+    """
+
+    def __init__(
+            self,
+            data_processors: List[type],
+            host: str = '127.0.0.1',
+            port: int = 0,
+            source_cache_bytes: int = None,
+            cache_directory: str = None,
+    ) -> None:
+        self.data_processors = data_processors
+        self.source_cache = SourceCache(max_bytes=source_cache_bytes)
+        self.cache_directory = cache_directory
+        self._checkpoint_locks = {}
+        self.run_count = 0
+        self.failed_run_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.scorpion_daemon = self
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def config_from_request(run_request: Any) -> Config:
+        if not isinstance(run_request, dict) or ('config_file' in run_request) == ('config' in run_request):
+            raise DaemonError('A run request needs either "config_file" or "config"')
+        if 'config_file' in run_request:
+            return load_run_config(run_request['config_file'])
+        return Config(run_request['config'])
+
+    def resume_from_request(self, run_request: Dict[str, Any]) -> bool:
+        resume = run_request.get('resume', False)
+        if not isinstance(resume, bool):
+            raise DaemonError('"resume" must be true or false')
+        if resume and self.cache_directory is None:
+            raise DaemonError('Runs cannot be resumed because the daemon has no cache directory, see --cache-dir')
+        return resume
+
+    def checkpoint_directory(self, config: Config) -> str:
+        content = json.dumps(config.as_dict, sort_keys=True, default=str)
+        return os.path.join(self.cache_directory, hashlib.blake2b(content.encode(), digest_size=16).hexdigest())
+
+    def run(self, config: Config, resume: bool = False) -> Dict[str, Any]:
+        if resume and self.cache_directory is None:
+            raise DaemonError('Runs cannot be resumed because the daemon has no cache directory')
+        load_count, hit_count = self.source_cache.load_count, self.source_cache.hit_count
+        start = time.perf_counter()
+        try:
+            pipeline = Pipeline.from_config(config, self.data_processors, self.source_cache)
+            if self.cache_directory is None:
+                pipeline.run()
+            else:
+                checkpoint_directory = self.checkpoint_directory(config)
+                with self._lock:
+                    checkpoint_lock = self._checkpoint_locks.setdefault(checkpoint_directory, threading.Lock())
+                with checkpoint_lock:
+                    pipeline.data_processor_manager.checkpoint_store = CheckpointStore(checkpoint_directory)
+                    pipeline.run(resume=resume)
+        except Exception:
+            status, error, peak_bytes = 'failed', traceback.format_exc(), None
+        else:
+            status, error, peak_bytes = 'succeeded', None, pipeline.data_frame_manager.high_water_mark_bytes
+        duration = time.perf_counter() - start
+
+        with self._lock:
+            self.run_count += 1
+            self.failed_run_count += status == 'failed'
+        # Counts of the shared cache include concurrent requests, therefore they are approximate
+        return {
+            'status': status,
+            'error': error,
+            'metrics': {
+                'duration_seconds': duration,
+                'sources_loaded': self.source_cache.load_count - load_count,
+                'sources_reused': self.source_cache.hit_count - hit_count,
+                'peak_data_frame_bytes': peak_bytes,
+            },
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'run_count': self.run_count,
+            'failed_run_count': self.failed_run_count,
+            'sources_loaded': self.source_cache.load_count,
+            'sources_reused': self.source_cache.hit_count,
+            'sources_cached': len(self.source_cache),
+            'sources_evicted': self.source_cache.eviction_count,
+            'source_cache_bytes': self.source_cache.memory_bytes,
+        }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--source-cache-size', type=parse_bytes, default='2G',
+                        help='Bytes of loaded sources which are kept between requests, e.g. 512M (default: 2G); '
+                             'least recently used sources above are evicted')
+    parser.add_argument('--data-processors-module', default='scorpion.data_processor',
+                        help='Module with a list "data_processors" of the data processor classes')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Directory of the checkpoints of the runs, which requests with "resume": true continue')
+    args = parser.parse_args(argv)
+
+    daemon = ScorpionDaemon(importlib.import_module(args.data_processors_module).data_processors, port=args.port,
+                            source_cache_bytes=args.source_cache_size, cache_directory=args.cache_dir)
+    host, port = daemon.address
+    print(f'scorpion daemon listening on http://{host}:{port}')
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.shutdown()
+
+
+if __name__ == '__main__':
+    main()
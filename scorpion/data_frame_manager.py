@@ -3,6 +3,18 @@
 # from dataclasses import dataclass
 # from typing import List, Dict
 
+import importlib.util
+import itertools
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from typing import Callable, Iterable, Iterator, Union, Any, Dict, List, Optional, Tuple
+
 from scorpion.util_classes import GenericManager, singleton
 
 
@@ -10,15 +22,440 @@ class DataFrameManagerError(Exception):
     pass
 
 
+class DataFrameChunks:
+    """
+    Re-iterable sequence of data frame chunks which are produced lazily by a factory.
+
+    Can be stored in DataFrameManager in place of a data frame; streaming data processors consume it
+    chunk by chunk, all other data processors receive it materialized as one data frame.
+    """
+
+    def __init__(self, factory: Callable[[], Iterable[pd.DataFrame]]) -> None:
+        self._factory = factory
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        return iter(self._factory())
+
+    def materialize(self) -> pd.DataFrame:
+        chunks = list(self)
+        return pd.concat(chunks) if len(chunks) > 0 else pd.DataFrame()
+
+
+def iter_data_frame_chunks(data: Union[pd.DataFrame, DataFrameChunks], chunk_size: int) -> Iterator[pd.DataFrame]:
+    if isinstance(data, DataFrameChunks):
+        yield from data
+    else:
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+
+
+def materialize_data_frame(data: Union[pd.DataFrame, DataFrameChunks]) -> pd.DataFrame:
+    return data.materialize() if isinstance(data, DataFrameChunks) else data
+
+
+def _arrow_buffer_addresses(array) -> List[int]:
+    return [buffer.address
+            for chunk in array.__arrow_array__().chunks
+            for buffer in chunk.buffers() if buffer is not None]
+
+
+def _shares_column_data(column: pd.Series, other_column: pd.Series) -> bool:
+    # Constant time checks for numpy, categorical and Arrow backed columns; other columns are compared by value
+    array, other_array = column.array, other_column.array
+    if isinstance(column.dtype, np.dtype):
+        return np.may_share_memory(column.to_numpy(), other_column.to_numpy())
+    if isinstance(array, pd.Categorical) and isinstance(other_array, pd.Categorical):
+        return np.may_share_memory(array.codes, other_array.codes)
+    if isinstance(array, pd.arrays.ArrowExtensionArray) and isinstance(other_array, pd.arrays.ArrowExtensionArray):
+        return _arrow_buffer_addresses(array) == _arrow_buffer_addresses(other_array)
+    return array.equals(other_array)
+
+
+def check_copy_on_write() -> None:
+    """
+    Raise DataFrameManagerError unless pandas copies on write.
+
+    Frozen views only protect the data frames they were handed out for under Copy-on-Write, which is
+    always enabled from pandas 3 on and can be enabled by option before.
+    """
+    # The option is deprecated from pandas 3 on, therefore it is only read for older versions
+    if int(pd.__version__.split('.')[0]) < 3 and not pd.options.mode.copy_on_write:
+        raise DataFrameManagerError(
+            f'pandas {pd.__version__} does not copy on write; frozen data frames need pandas>=3 '
+            f'or pd.options.mode.copy_on_write = True')
+
+
+def is_data_frame_mutated(view: pd.DataFrame, df: pd.DataFrame) -> bool:
+    """
+    Whether a frozen view, which was handed out for df, has been changed in place.
+
+    Copy-on-Write copies the data of a column as soon as the column is written to through the view,
+    therefore a column is unchanged as long as it still shares its data with df.
+    """
+    if not view.columns.equals(df.columns) or not view.index.equals(df.index):
+        return True
+    return not all(_shares_column_data(view.iloc[:, position], df.iloc[:, position])
+                   for position in range(view.shape[1]))
+
+
+@dataclass
+class SpillMetrics:
+    spill_count: int = 0
+    spill_bytes: int = 0
+    reload_count: int = 0
+    reload_bytes: int = 0
+
+
+@dataclass
+class DataFrameMemory:
+    key: str
+    memory_bytes: int
+    in_memory: bool
+    produced_by_step: Optional[int]
+    produced_by_data_processor: Optional[str]
+    index_bytes: int
+    column_bytes: Dict[str, int]
+    dtype_bytes: Dict[str, int]
+
+
+@dataclass
+class MemoryReport:
+    """
+    Deep memory usage of the data frames in DataFrameManager, largest data frame first.
+
+    Total bytes include spilled data frames, in memory bytes do not. The high-water mark is the
+    largest in memory total since the DataFrameManager was created.
+    """
+    data_frames: List[DataFrameMemory]
+    total_bytes: int
+    in_memory_bytes: int
+    high_water_mark_bytes: int
+
+    def largest(self, share: float = 0.8) -> List[DataFrameMemory]:
+        """Fewest data frames which together make up at least the given share of the total bytes."""
+        largest = []
+        memory_bytes = 0
+        for data_frame_memory in self.data_frames:
+            if memory_bytes >= share * self.total_bytes:
+                break
+            largest.append(data_frame_memory)
+            memory_bytes += data_frame_memory.memory_bytes
+        return largest
+
+    def to_data_frame(self) -> pd.DataFrame:
+        columns = ['key', 'memory_bytes', 'in_memory', 'produced_by_step', 'produced_by_data_processor']
+        df = pd.DataFrame([{column: asdict(data_frame_memory)[column] for column in columns}
+                           for data_frame_memory in self.data_frames], columns=columns)
+        df['share'] = df['memory_bytes'] / self.total_bytes if self.total_bytes > 0 else 0.0
+        df['cumulative_share'] = df['share'].cumsum()
+        return df
+
+
+@dataclass
+class _Footprint:
+    index_bytes: int
+    column_bytes: Dict[str, int]
+    dtype_bytes: Dict[str, int]
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.index_bytes + sum(self.column_bytes.values())
+
+
+def _measure_footprint(df: pd.DataFrame) -> _Footprint:
+    column_bytes = {}
+    dtype_bytes = {}
+    for (column, memory_bytes), dtype in zip(df.memory_usage(index=False, deep=True).items(), df.dtypes):
+        column_bytes[str(column)] = column_bytes.get(str(column), 0) + int(memory_bytes)
+        dtype_bytes[str(dtype)] = dtype_bytes.get(str(dtype), 0) + int(memory_bytes)
+    return _Footprint(int(df.index.memory_usage(deep=True)), column_bytes, dtype_bytes)
+
+
+@dataclass
+class _SpilledDataFrame:
+    # Placeholder which is stored in place of a data frame that has been spilled to disk
+    file_name: str
+    memory_bytes: int
+
+
+def _spill_data_frame(df: pd.DataFrame, file_name: str) -> str:
+    """
+    Write a data frame to an uncompressed Arrow IPC file which can be memory-mapped when it is reloaded.
+
+    Data frames with object data are pickled instead, because Arrow does not reload them as they were:
+    strings and None come back as a string column and lists as numpy arrays. Data frames which cannot be
+    converted to Arrow are pickled as well, as are all data frames if pyarrow is not installed.
+    Returns the name of the written file.
+    """
+    if importlib.util.find_spec('pyarrow') is None or _has_object_data(df):
+        return _pickle_data_frame(df, file_name)
+
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowException, TypeError, ValueError):
+        return _pickle_data_frame(df, file_name)
+    file_name = f'{file_name}.arrow'
+    with pyarrow.ipc.new_file(file_name, table.schema) as writer:
+        writer.write_table(table)
+    return file_name
+
+
+def _has_object_data(df: pd.DataFrame) -> bool:
+    dtypes = [*df.dtypes, *(df.index.dtypes if isinstance(df.index, pd.MultiIndex) else [df.index.dtype])]
+    return any(dtype == object or (isinstance(dtype, pd.CategoricalDtype) and dtype.categories.dtype == object)
+               for dtype in dtypes)
+
+
+def _pickle_data_frame(df: pd.DataFrame, file_name: str) -> str:
+    file_name = f'{file_name}.pkl'
+    df.to_pickle(file_name)
+    return file_name
+
+
+def _reload_data_frame(file_name: str) -> pd.DataFrame:
+    if file_name.endswith('.pkl'):
+        return pd.read_pickle(file_name)
+
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    with pa.memory_map(file_name) as source:
+        return pyarrow.ipc.open_file(source).read_all().to_pandas()
+
+
 @singleton
 class DataFrameManager(GenericManager):
+    """
+    Keeps data frames by key.
+
+    The deep memory usage of every stored data frame is measured once when it is stored, so that
+    memory_report is cheap enough to be taken after every process instruction.
+
+    If a memory budget in bytes is set and it is exceeded, least recently used data frames are spilled to files in the spill
+    directory and are reloaded when they are accessed again. The most recently stored or accessed data
+    frame is never spilled, even if it exceeds the budget on its own.
+    """
 
     exception = DataFrameManagerError
 
     def __init__(self):
         super().__init__()
+        self.memory_budget = None
+        self.freeze = False
+        # A temporary directory is created on first spill if no spill directory is set
+        self.spill_directory = None
+        self.spill_metrics = SpillMetrics()
+        self.high_water_mark_bytes = 0
+        # Memory usage of data frames which are held in memory, in order of last access
+        self._memory_usage = OrderedDict()
+        self._footprints = {}
+        # Reloads of spilled data frames in progress by key; callers of a key which is being reloaded wait for it
+        self._reloads = {}
+        self._spill_file_numbers = itertools.count()
+        # Spill directory which the manager created itself and therefore removes with its spill files
+        self._temporary_spill_directory = None
+
+    # The lock only guards the bookkeeping; measuring, spilling and reloading data frames happen outside of it,
+    # so that other keys can be accessed in the meantime
+
+    def __getitem__(self, key: str) -> Any:
+        return self.get_item_and_stored(key)[0]
+
+    def get_item_and_stored(self, key: str) -> Tuple[Any, Any]:
+        """
+        Return the value of key, frozen if the manager is frozen, together with the stored data frame.
+
+        The stored data frame is the one the frozen view is based on, even if it is spilled and reloaded
+        as another data frame later on.
+        """
+        spills = []
+        with self._lock:
+            value = super().__getitem__(key)
+            reload = self._reloads.get(key)
+            starts_reload = reload is None and isinstance(value, _SpilledDataFrame)
+            if starts_reload:
+                reload = self._reloads[key] = Future()
+            elif reload is None:
+                spills = self._mark_used(key, value)
+        if starts_reload:
+            value = self._reload(key, value, reload)
+        elif reload is not None:
+            value = reload.result()
+        self._write_spills(spills)
+        if self.freeze and isinstance(value, pd.DataFrame):
+            return value.copy(deep=False), value
+        return value, value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        footprint = _measure_footprint(value) if isinstance(value, pd.DataFrame) else None
+        spills = []
+        with self._lock:
+            super().__setitem__(key, value)
+            if footprint is not None:
+                self._footprints[key] = footprint
+                self._memory_usage[key] = footprint.memory_bytes
+                self._update_high_water_mark()
+                spills = self._select_spills(key)
+        self._write_spills(spills)
+
+    def peek(self, key: str) -> Any:
+        """
+        Return the data frame of key without changing the state of the manager.
+
+        A spilled data frame is read from its file but stays spilled, so that it neither counts against
+        the memory budget nor spills other data frames. The data frame is not frozen; it must not be changed.
+        """
+        while True:
+            with self._lock:
+                value = super().__getitem__(key)
+                reload = self._reloads.get(key)
+            if reload is not None:
+                return reload.result()
+            if not isinstance(value, _SpilledDataFrame):
+                return value
+            try:
+                return _reload_data_frame(value.file_name)
+            except FileNotFoundError:
+                # The data frame has been reloaded in the meantime
+                continue
+
+    def remove_spill_files(self) -> None:
+        """
+        Remove the files of spilled data frames, together with the spill directory if the manager created it.
+
+        Spilled data frames are removed from the manager; data frames in memory stay available.
+        """
+        with self._lock:
+            spilled_keys = [key for key, value in self._data.items() if isinstance(value, _SpilledDataFrame)]
+            spilled = [self._data.pop(key) for key in spilled_keys]
+            for key in spilled_keys:
+                del self._footprints[key]
+            temporary_spill_directory = self._temporary_spill_directory
+            if temporary_spill_directory is not None:
+                self.spill_directory = self._temporary_spill_directory = None
+        for spilled_data_frame in spilled:
+            if os.path.exists(spilled_data_frame.file_name):
+                os.remove(spilled_data_frame.file_name)
+        if temporary_spill_directory is not None:
+            shutil.rmtree(temporary_spill_directory, ignore_errors=True)
+
+    def _mark_used(self, key: str, value: Any) -> List[tuple]:
+        if key in self._memory_usage:
+            self._memory_usage.move_to_end(key)
+        elif isinstance(value, pd.DataFrame) and key in self._footprints:
+            # The data frame is being spilled; it stays in memory because it is used again
+            self._memory_usage[key] = self._footprints[key].memory_bytes
+            self._update_high_water_mark()
+            return self._select_spills(key)
+        return []
+
+    def _reload(self, key: str, spilled: _SpilledDataFrame, reload: Future) -> pd.DataFrame:
+        try:
+            df = _reload_data_frame(spilled.file_name)
+        except BaseException as err:
+            with self._lock:
+                del self._reloads[key]
+            reload.set_exception(err)
+            raise
+        with self._lock:
+            del self._reloads[key]
+            self._data[key] = df
+            self._memory_usage[key] = spilled.memory_bytes
+            self.spill_metrics.reload_count += 1
+            self.spill_metrics.reload_bytes += spilled.memory_bytes
+            self._update_high_water_mark()
+            spills = self._select_spills(key)
+        reload.set_result(df)
+        os.remove(spilled.file_name)
+        self._write_spills(spills)
+        return df
+
+    @property
+    def memory_bytes_in_memory(self) -> int:
+        return sum(self._memory_usage.values())
+
+    def memory_report(self, process_instructions: Iterable[Any] = None) -> MemoryReport:
+        """
+        Report the memory usage of every data frame.
+
+        Parameters
+        ----------
+        process_instructions:
+            Process instructions of the run; a data frame is attributed to the process instruction
+            which lists it as expected output data frame.
+        """
+        producers = {key: process_instruction
+                     for process_instruction in (process_instructions if process_instructions is not None else [])
+                     for key in process_instruction.expected_output_data_frames}
+        with self._lock:
+            data_frames = []
+            for key, footprint in self._footprints.items():
+                producer = producers.get(key)
+                data_frames.append(DataFrameMemory(
+                    key=key,
+                    memory_bytes=footprint.memory_bytes,
+                    in_memory=key in self._memory_usage,
+                    produced_by_step=producer.step if producer is not None else None,
+                    produced_by_data_processor=producer.uses_data_processor if producer is not None else None,
+                    index_bytes=footprint.index_bytes,
+                    column_bytes=dict(footprint.column_bytes),
+                    dtype_bytes=dict(footprint.dtype_bytes),
+                ))
+            data_frames.sort(key=lambda data_frame_memory: data_frame_memory.memory_bytes, reverse=True)
+            return MemoryReport(
+                data_frames=data_frames,
+                total_bytes=sum(data_frame_memory.memory_bytes for data_frame_memory in data_frames),
+                in_memory_bytes=self.memory_bytes_in_memory,
+                high_water_mark_bytes=self.high_water_mark_bytes,
+            )
+
+    def _update_high_water_mark(self) -> None:
+        self.high_water_mark_bytes = max(self.high_water_mark_bytes, self.memory_bytes_in_memory)
+
+    def _select_spills(self, key_in_use: str) -> List[tuple]:
+        """
+        Select least recently used data frames to spill until the memory budget is kept.
 
+        Selected data frames no longer count as in memory; they are written by _write_spills after
+        the lock is released.
+        """
+        if self.memory_budget is None:
+            return []
+        spills = []
+        for key in list(self._memory_usage):
+            if self.memory_bytes_in_memory <= self.memory_budget:
+                break
+            if key != key_in_use:
+                if self.spill_directory is None:
+                    self._temporary_spill_directory = tempfile.mkdtemp(prefix='scorpion_spill_')
+                    self.spill_directory = self._temporary_spill_directory
+                # Keys are not necessarily valid file names, therefore files are numbered
+                file_name = os.path.join(self.spill_directory, f'data_frame_{next(self._spill_file_numbers):06d}')
+                spills.append((key, self._data[key], file_name, self._memory_usage.pop(key)))
+        return spills
 
+    def _write_spills(self, spills: List[tuple]) -> None:
+        for key, df, file_name, memory_bytes in spills:
+            try:
+                os.makedirs(os.path.dirname(file_name), exist_ok=True)
+                file_name = _spill_data_frame(df, file_name)
+            except BaseException:
+                with self._lock:
+                    if key not in self._memory_usage:
+                        self._memory_usage[key] = memory_bytes
+                raise
+            with self._lock:
+                # A data frame which has been used while it was written stays in memory
+                spilled = key not in self._memory_usage
+                if spilled:
+                    self._data[key] = _SpilledDataFrame(file_name, memory_bytes)
+                    self.spill_metrics.spill_count += 1
+                    self.spill_metrics.spill_bytes += memory_bytes
+            if not spilled:
+                os.remove(file_name)
 
     # @property
     # def _data(self):
@@ -1,16 +1,18 @@
 import re
 import pandas as pd
 import abc
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator
 
-from src.utils import AutoReprMixin, vlookup
+from scorpion.util_classes import auto_repr
+from scorpion.data_frame_manager import iter_data_frame_chunks
 
 
 class DataProcessorError(Exception):
     pass
 
 
-class DataProcessor(abc.ABC, AutoReprMixin):
+@auto_repr
+class DataProcessor(abc.ABC):
     key = None
 
     def __init__(self):
@@ -58,7 +60,44 @@ class DataProcessor(abc.ABC, AutoReprMixin):
             raise KeyError(f'Key "{key}" cannot be used more than once in "{self.key}"')
         self._output_data_frames[key] = df
 
+class StreamingDataProcessor(DataProcessor):
+    """
+    Data processor which consumes its first input data frame as a stream of chunks.
 
+    All further input data frames are available as whole data frames through get_data_frame_by_key.
+    process_chunk returns the output chunks for one input chunk; processors which need global state,
+    e.g. aggregations, keep accumulators on the instance and return their result in finalize.
+    DataProcessorManager chains consecutive streaming data processors without materializing the
+    data frames which are only passed from one streaming step to the next.
+    """
+    chunk_size = 100_000
+
+    @abc.abstractmethod
+    def process_chunk(self, chunk: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        pass
+
+    def finalize(self) -> Dict[str, pd.DataFrame]:
+        return {}
+
+    def stream(self, chunks: Iterable[pd.DataFrame]) -> Iterator[Dict[str, pd.DataFrame]]:
+        for chunk in chunks:
+            output = self.process_chunk(chunk)
+            if output:
+                yield output
+        output = self.finalize()
+        if output:
+            yield output
+
+    def process(self) -> None:
+        # Whole-frame processing, e.g. for partitioned execution; the output chunks are materialized
+        streamed_key = next(iter(self._input_data_frames))
+        chunks = iter_data_frame_chunks(self._input_data_frames[streamed_key], self.chunk_size)
+        output_chunks = {}
+        for output in self.stream(chunks):
+            for key, chunk in output.items():
+                output_chunks.setdefault(key, []).append(chunk)
+        for key, chunks_of_key in output_chunks.items():
+            self.add_data_frame_to_output(key, pd.concat(chunks_of_key))
 
 
 
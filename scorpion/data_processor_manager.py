@@ -1,8 +1,27 @@
+import contextlib
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from dataclasses import dataclass
-from typing import List, Set, Dict, Union
-
-from src.utils import AutoReprMixin, DFManagerMixin, singleton
+from typing import List, Set, Dict, Union, Iterator, Iterable, Optional, Any
+
+from scorpion.util_classes import auto_repr, singleton, DFManagerMixin
+from scorpion.data_processor import StreamingDataProcessor
+from scorpion.data_frame_manager import (
+    DataFrameChunks,
+    iter_data_frame_chunks,
+    materialize_data_frame,
+    is_data_frame_mutated,
+)
+from scorpion.checkpoint import CheckpointStore
+from scorpion.run_history import PeakMemorySampler
+from scorpion.shared_frame_store import SharedFrameHandle, SharedFrameStoreError
+from scorpion.execution_plan import (
+    ExecutionPlan,
+    build_execution_plan,
+    dependencies,
+    remaining_path_durations,
+)
 
 
 class DataProcessorManagerError(Exception):
@@ -17,6 +36,9 @@ class ProcessInstruction:
     description: str
     uses_data_frames_for_input: List[str]
     expected_output_data_frames: List[str]
+    partition_by: str = None
+    partition_workers: int = None
+    partition_executor: str = 'process'
 
     def __getattr__(self, item):
         return self.__dict__[item]
@@ -26,34 +48,77 @@ class ProcessInstruction:
         return list(self.__dict__.keys())
 
 
-class ProcessInstructionContainer:
+def _run_data_processor(data_processor, df_input, expected_output_data_frames) -> Dict[str, pd.DataFrame]:
+    # Module level function so that it can be sent to worker processes
+    df_input = {key: df.open() if isinstance(df, SharedFrameHandle) else df for key, df in df_input.items()}
+    processor = data_processor()
+    processor.add_input_data_frames(df_input)
+    processor.set_expected_output_data_frames(expected_output_data_frames)
+    processor.process()
+    return processor.output
+
+
+def _split_data_frames_by_partition(
+        data_frames: Dict[str, pd.DataFrame],
+        partition_by: str,
+) -> List[Dict[str, pd.DataFrame]]:
+    """
+    Split data frames into one mapping of data frames per value of the partition column.
+
+    Data frames which contain the partition column are split, all other data frames are handed
+    to every partition unchanged. A partition which has no rows in one of the split data frames
+    receives an empty data frame for it.
+    """
+    partitioned_keys = [key for key, df in data_frames.items() if partition_by in df.columns]
+    if len(partitioned_keys) == 0:
+        raise DataProcessorManagerError(
+            f'Partition column "{partition_by}" is not found in any of the input data frames: '
+            f'{", ".join(data_frames)}'
+        )
+
+    partition_values = pd.Index(
+        pd.concat([data_frames[key][partition_by] for key in partitioned_keys]).unique())
+    groups = {}
+    for key in partitioned_keys:
+        df = data_frames[key]
+        codes = partition_values.get_indexer(df[partition_by])
+        groups[key] = dict(iter(df.groupby(codes, sort=False)))
+
+    partitions = []
+    for code in range(len(partition_values)):
+        partition = dict(data_frames)
+        for key in partitioned_keys:
+            partition[key] = groups[key].get(code, data_frames[key].iloc[0:0])
+        partitions.append(partition)
+    return partitions
 
-    def __init__(self) -> None:
-        self.process_instructions = None
+
+class ProcessInstructionContainer:
+    _partition_executors = ['thread', 'process']
 
     def __get__(self, instance, owner) -> \
             Union['ProcessInstructionContainer', List[ProcessInstruction]]:
         if instance is None:
             return self
-        return self.process_instructions
+        return instance.__dict__.get(self.name)
 
     def __set__(self, instance, process_instructions) -> Union['ProcessInstructionContainer', None]:
         if instance is None:
             return self
-        if self.process_instructions is not None:
+        if instance.__dict__.get(self.name) is not None:
             raise AttributeError('Process instructions can only be set once')
         if len(process_instructions) == 0:
-            self.process_instructions = []
+            instance.__dict__[self.name] = []
         else:
             self.validate(process_instructions)
-            self.process_instructions = self.create_process_instructions(process_instructions)
-            self.process_instructions = self.sort(self.process_instructions)
+            instance.__dict__[self.name] = self.sort(self.create_process_instructions(process_instructions))
 
     def __set_name__(self, owner, name) -> None:
         self.name = name
 
     def validate(self, process_instructions) -> None:
         self.check_steps(process_instructions)
+        self.check_partition_executors(process_instructions)
 
     def check_steps(self, process_instructions) -> None:
         steps = []
@@ -70,6 +135,16 @@ class ProcessInstructionContainer:
                 )
             steps.append(step)
 
+    def check_partition_executors(self, process_instructions) -> None:
+        for process_instruction in process_instructions:
+            partition_executor = process_instruction.get('partition_executor', 'process')
+            if partition_executor not in self._partition_executors:
+                raise ValueError(
+                    f'Partition executor "{partition_executor}" is not supported; '
+                    f'these partition executors are supported: {", ".join(self._partition_executors)}\n'
+                    f'Given process instruction: {process_instruction}'
+                )
+
     def create_process_instructions(self, process_instructions) -> List[ProcessInstruction]:
 
         return [ProcessInstruction(
@@ -79,7 +154,10 @@ class ProcessInstructionContainer:
             description=process_instruction['description'],
             uses_data_frames_for_input=
             process_instruction['uses_data_frames_for_input'],
-            expected_output_data_frames=process_instruction['expected_output_data_frames'])
+            expected_output_data_frames=process_instruction['expected_output_data_frames'],
+            partition_by=process_instruction.get('partition_by'),
+            partition_workers=process_instruction.get('partition_workers'),
+            partition_executor=process_instruction.get('partition_executor', 'process'))
 
             for process_instruction in process_instructions]
 
@@ -89,27 +167,25 @@ class ProcessInstructionContainer:
 
 class DataProcessorContainer:
 
-    def __init__(self) -> None:
-        self.data_processors = None
-
     def __get__(self, instance, owner) -> \
             Union['DataProcessorContainer', Dict[str, 'DataProcessor']]:
         if instance is None:
             return self
-        return self.data_processors
+        return instance.__dict__.get(self.attribute_name)
 
     def __set__(self, instance, data_processors):
         if instance is None:
             return self
-        if self.data_processors is not None:
+        if instance.__dict__.get(self.attribute_name) is not None:
             raise AttributeError('Processors can only be set once')
         if len(data_processors) == 0:
-            self.data_processors = {}
+            instance.__dict__[self.attribute_name] = {}
         else:
             self.validate(data_processors)
-            self.data_processors = self.create_mapping(data_processors)
+            instance.__dict__[self.attribute_name] = self.create_mapping(data_processors)
 
     def __set_name__(self, owner, name):
+        self.attribute_name = name
         self.name = f'{owner.__name__}.{name}'
 
     def create_mapping(self, data_processors):
@@ -129,12 +205,27 @@ class DataProcessorContainer:
 
 
 @singleton
-class DataProcessorManager(AutoReprMixin, DFManagerMixin):
+@auto_repr
+class DataProcessorManager(DFManagerMixin):
     process_instructions = ProcessInstructionContainer()
     data_processors = DataProcessorContainer()
 
     def __init__(self):
         super().__init__()
+        self.checkpoint_store = None
+        self.run_history = None
+        # Process instructions run one after another unless more than one worker is configured
+        self.max_workers = None
+        # Memory budget in bytes for process instructions which run at the same time
+        self.memory_budget = None
+        # SharedFrameStore through which data frames that every partition needs are sent to worker processes
+        self.shared_frame_store = None
+        # Keys of data frames which are used after processing, e.g. by output tables; streaming steps
+        # materialize them even if they are otherwise only passed on to the next streaming step
+        self.data_frames_required_after_processing = set()
+        # Called with the keys of data frames which no remaining process instruction uses or produces,
+        # e.g. OutputManager.data_frames_final to write output while processing is still running
+        self.on_data_frames_final = None
 
     @property
     def process_instructions_not_skipped(self) -> List[ProcessInstruction]:
@@ -152,10 +243,10 @@ class DataProcessorManager(AutoReprMixin, DFManagerMixin):
     def required_data_processors(self) -> Set[str]:
         return {process_instruction.uses_data_processor for process_instruction in self.process_instructions}
 
-    def process(self, skip=False) -> None:
+    def process(self, skip=False, resume=False) -> None:
         if not skip:
             self._data_processors_available()
-            self._exec_process_instructions()
+            self._exec_process_instructions(resume=resume)
         else:
             print('Data processing is skipped')
 
@@ -169,50 +260,381 @@ class DataProcessorManager(AutoReprMixin, DFManagerMixin):
                     f'Processor for "{required_data_processor}" not available'
                 )
 
-    def _exec_process_instructions(self) -> None:
-        for process_instruction in self.process_instructions_not_skipped:
+    def _exec_process_instructions(self, resume: bool = False) -> None:
+        completed_steps = self._open_checkpoint_store(resume)
+        process_instructions = [process_instruction for process_instruction in self.process_instructions_not_skipped
+                                if process_instruction.step not in completed_steps]
+        chains = self._group_streaming_chains(process_instructions)
+        pending_uses = self._count_pending_uses(process_instructions)
+        self._release_final_data_frames([key for key in self._df_manager.keys() if key not in pending_uses])
+        if self.max_workers is None or self.max_workers <= 1:
+            for chain in chains:
+                outputs, duration, memory_growth = self._exec_chain(chain, chains)
+                self._store_chain_outputs(chain, outputs, duration, memory_growth)
+                self._release_final_data_frames(self._complete_pending_uses(chain, pending_uses))
+        else:
+            self._exec_chains_scheduled(chains, pending_uses)
+        if self.run_history is not None:
+            self.run_history.save()
+
+    def _exec_chains_scheduled(self, chains: List[List[ProcessInstruction]], pending_uses: Dict[str, int]) -> None:
+        """
+        Run chains of process instructions in parallel as soon as the data frames they need are available.
+
+        Ready chains on the longest remaining path, according to run history, are started first.
+        A chain is not started next to running chains if their remembered memory would exceed the memory budget.
+        """
+        process_instructions = [process_instruction for chain in chains for process_instruction in chain]
+        depends_on = dependencies(process_instructions)
+        step_durations = self.run_history.step_durations(process_instructions) if self.run_history else {}
+        step_memory = self.run_history.step_memory(process_instructions) if self.run_history else {}
+        remaining = remaining_path_durations(depends_on, step_durations)
+
+        position_by_step = {process_instruction.step: position
+                            for position, chain in enumerate(chains) for process_instruction in chain}
+        chain_depends_on = {position: {position_by_step[dependency]
+                                       for process_instruction in chain
+                                       for dependency in depends_on[process_instruction.step]} - {position}
+                            for position, chain in enumerate(chains)}
+        chain_memory = {position: sum(step_memory.get(process_instruction.step, 0) for process_instruction in chain)
+                        for position, chain in enumerate(chains)}
+
+        pending = set(range(len(chains)))
+        done = set()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(pending) > 0 or len(running) > 0:
+                ready = sorted((position for position in pending if chain_depends_on[position] <= done),
+                               key=lambda position: remaining[chains[position][0].step],
+                               reverse=True)
+                for position in ready:
+                    if len(running) >= self.max_workers:
+                        break
+                    running_memory = sum(chain_memory[running_position] for running_position in running.values())
+                    if (len(running) > 0
+                            and self.memory_budget is not None
+                            and running_memory + chain_memory[position] > self.memory_budget):
+                        continue
+                    pending.remove(position)
+                    running[pool.submit(self._exec_chain, chains[position], chains)] = position
+
+                if len(running) == 0:
+                    raise DataProcessorManagerError(
+                        f'Process instructions cannot be scheduled; steps '
+                        f'{[chains[position][0].step for position in pending]} wait for each other'
+                    )
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    position = running.pop(future)
+                    outputs, duration, memory_growth = future.result()
+                    self._store_chain_outputs(chains[position], outputs, duration, memory_growth)
+                    self._release_final_data_frames(self._complete_pending_uses(chains[position], pending_uses))
+                    done.add(position)
+
+    def _exec_chain(self, chain: List[ProcessInstruction], chains: List[List[ProcessInstruction]]):
+        # Memory is only sampled if it is recorded
+        sampler = PeakMemorySampler() if self.run_history is not None else contextlib.nullcontext()
+        with sampler:
+            start = time.perf_counter()
+            outputs = self._exec_chain_outputs(chain, chains)
+            duration = time.perf_counter() - start
+        return outputs, duration, sampler.growth_bytes if self.run_history is not None else None
+
+    def _exec_chain_outputs(
+            self,
+            chain: List[ProcessInstruction],
+            chains: List[List[ProcessInstruction]],
+    ) -> List[Dict[str, pd.DataFrame]]:
+        if self._is_streaming(chain[0]):
+            keys_required_elsewhere = {key
+                                       for other_chain in chains if other_chain is not chain
+                                       for process_instruction in other_chain
+                                       for key in process_instruction.uses_data_frames_for_input}
+            keys_required_elsewhere.update(key
+                                           for process_instruction in chain
+                                           for key in process_instruction.uses_data_frames_for_input[1:])
+            keys_required_elsewhere.update(self.data_frames_required_after_processing)
+            return self._exec_streaming_chain(chain, keys_required_elsewhere)
+        return [self._exec_process_instruction(chain[0])]
+
+    def _store_chain_outputs(
+            self,
+            chain: List[ProcessInstruction],
+            outputs: List[Dict[str, pd.DataFrame]],
+            duration: float,
+            memory_growth: Optional[int] = None,
+    ) -> None:
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.save_steps({process_instruction.step: output
+                                              for process_instruction, output in zip(chain, outputs)})
+        for process_instruction, output in zip(chain, outputs):
+            self._df_manager.set_multiple_items(output)
+            if self.run_history is not None:
+                # Steps of a streaming chain run interleaved, therefore they share the duration and memory growth
+                # of the chain; a step needs at least the memory of its output, e.g. if the process memory is
+                # not measured or reused memory hides the growth
+                output_bytes = sum(int(df.memory_usage(deep=True).sum()) for df in output.values())
+                peak_memory_bytes = max(output_bytes, (memory_growth or 0) // len(chain))
+                self.run_history.record(process_instruction, duration / len(chain), peak_memory_bytes)
+
+    @staticmethod
+    def _count_pending_uses(process_instructions: List[ProcessInstruction]) -> Dict[str, int]:
+        # Number of process instructions which still use or produce a data frame
+        pending_uses = {}
+        for process_instruction in process_instructions:
+            for key in dict.fromkeys([*process_instruction.uses_data_frames_for_input,
+                                      *process_instruction.expected_output_data_frames]):
+                pending_uses[key] = pending_uses.get(key, 0) + 1
+        return pending_uses
+
+    @staticmethod
+    def _complete_pending_uses(chain: List[ProcessInstruction], pending_uses: Dict[str, int]) -> List[str]:
+        completed_keys = []
+        for process_instruction in chain:
+            for key in dict.fromkeys([*process_instruction.uses_data_frames_for_input,
+                                      *process_instruction.expected_output_data_frames]):
+                pending_uses[key] -= 1
+                if pending_uses[key] == 0:
+                    completed_keys.append(key)
+        return completed_keys
+
+    def _release_final_data_frames(self, keys: Iterable[str]) -> None:
+        # Data frames which were only streamed between steps are never stored and are therefore not released
+        final_keys = [key for key in keys if key in self._df_manager]
+        if self.on_data_frames_final is not None and len(final_keys) > 0:
+            self.on_data_frames_final(final_keys)
+
+    def _is_streaming(self, process_instruction: ProcessInstruction) -> bool:
+        data_processor = self.get_data_processor_by_key(process_instruction.uses_data_processor)
+        return process_instruction.partition_by is None and issubclass(data_processor, StreamingDataProcessor)
+
+    def _group_streaming_chains(self, process_instructions: List[ProcessInstruction]) -> List[List[ProcessInstruction]]:
+        # A streaming step joins the chain of the previous streaming step if it streams one of its outputs;
+        # a step whose further inputs are produced by the chain starts a new chain, because further inputs
+        # are read as whole data frames before the chain starts streaming
+        chains = []
+        for process_instruction in process_instructions:
+            previous = chains[-1][-1] if len(chains) > 0 else None
+            keys_produced_by_chain = ({key for chained in chains[-1] for key in chained.expected_output_data_frames}
+                                      if len(chains) > 0 else set())
+            if (previous is not None
+                    and self._is_streaming(previous)
+                    and self._is_streaming(process_instruction)
+                    and process_instruction.uses_data_frames_for_input[0] in previous.expected_output_data_frames
+                    and keys_produced_by_chain.isdisjoint(process_instruction.uses_data_frames_for_input[1:])):
+                chains[-1].append(process_instruction)
+            else:
+                chains.append([process_instruction])
+        return chains
+
+    def _exec_streaming_chain(
+            self,
+            chain: List[ProcessInstruction],
+            keys_required_later: Set[str],
+    ) -> List[Dict[str, pd.DataFrame]]:
+        streamed_keys = [process_instruction.uses_data_frames_for_input[0] for process_instruction in chain]
+        output_chunks = [{} for _ in chain]
+
+        chunk_size = self.get_data_processor_by_key(chain[0].uses_data_processor).chunk_size
+        stream = ({streamed_keys[0]: chunk}
+                  for chunk in iter_data_frame_chunks(self._df_manager[streamed_keys[0]], chunk_size))
+        for position, process_instruction in enumerate(chain):
             processor = self.get_data_processor_by_key(process_instruction.uses_data_processor)()
-            df_input = self._df_manager.get_data_frames(process_instruction.uses_data_frames_for_input)
-            processor.add_input_data_frames(df_input)
+            processor.add_input_data_frames(
+                {key: materialize_data_frame(self._df_manager[key])
+                 for key in process_instruction.uses_data_frames_for_input[1:]})
             processor.set_expected_output_data_frames(process_instruction.expected_output_data_frames)
-            processor.process()
-            # processor_output = self._receive_processor_output(process_instruction.returns_data_frames, processor.output)
-            self._df_manager.add_data_frames(processor.output)
+            # Data frames which are only passed on to the next streaming step are never materialized
+            keys_not_materialized = (
+                {streamed_keys[position + 1]} - keys_required_later
+                if position + 1 < len(chain)
+                else set()
+            )
+            stream = self._stream_through(
+                processor, streamed_keys[position], stream, keys_not_materialized, output_chunks[position])
+
+        for _ in stream:
+            pass
+
+        outputs = []
+        for process_instruction, chunks in zip(chain, output_chunks):
+            for key in process_instruction.expected_output_data_frames:
+                if key not in chunks and key not in streamed_keys:
+                    raise DataProcessorManagerError(
+                        f'Data frame output key "{key}" is defined in config as expected output dataframe key,'
+                        f'\nbut streaming DataProcessor "{process_instruction.uses_data_processor}" '
+                        f'did not emit any chunk for it'
+                    )
+            outputs.append({key: pd.concat(chunks_of_key) for key, chunks_of_key in chunks.items()})
+        return outputs
+
+    @staticmethod
+    def _stream_through(
+            processor: StreamingDataProcessor,
+            streamed_key: str,
+            stream: Iterator[Dict[str, pd.DataFrame]],
+            keys_not_materialized: Set[str],
+            output_chunks: Dict[str, List[pd.DataFrame]],
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        chunks = (output[streamed_key] for output in stream if streamed_key in output)
+        for output in processor.stream(chunks):
+            for key, chunk in output.items():
+                if key not in keys_not_materialized:
+                    output_chunks.setdefault(key, []).append(chunk)
+            yield output
+
+    def _exec_process_instruction(self, process_instruction: ProcessInstruction) -> Dict[str, pd.DataFrame]:
+        data_processor = self.get_data_processor_by_key(process_instruction.uses_data_processor)
+        # The stored data frames are recorded as they are handed out; the entries of the data frame manager
+        # may be spilled and reloaded as other data frames by parallel steps in the meantime
+        df_input, df_stored = {}, {}
+        for key in process_instruction.uses_data_frames_for_input:
+            df, df_stored[key] = self._df_manager.get_item_and_stored(key)
+            df_input[key] = materialize_data_frame(df)
+        if process_instruction.partition_by is None:
+            output = _run_data_processor(data_processor, df_input, process_instruction.expected_output_data_frames)
+        else:
+            output = self._exec_process_instruction_partitioned(process_instruction, data_processor, df_input)
+        self._check_input_data_frames_unchanged(process_instruction, df_input, df_stored)
+        return output
+
+    @staticmethod
+    def _check_input_data_frames_unchanged(
+            process_instruction: ProcessInstruction,
+            df_input: Dict[str, pd.DataFrame],
+            df_stored: Dict[str, Any],
+    ) -> None:
+        # Only frozen views are checked; a data frame which was handed out as is cannot be told apart from its changes
+        mutated_keys = [key for key, df in df_input.items()
+                        if isinstance(df_stored[key], pd.DataFrame)
+                        and df is not df_stored[key]
+                        and is_data_frame_mutated(df, df_stored[key])]
+        if len(mutated_keys) > 0:
+            raise DataProcessorManagerError(
+                f'DataProcessor "{process_instruction.uses_data_processor}" in step {process_instruction.step} '
+                f'changed input data frames in place: {", ".join(mutated_keys)};'
+                f'\nThe stored data frames are unchanged, assign changes to a new data frame instead'
+            )
+
+    def _exec_process_instruction_partitioned(
+            self,
+            process_instruction: ProcessInstruction,
+            data_processor: 'DataProcessor',
+            df_input: Dict[str, pd.DataFrame],
+    ) -> Dict[str, pd.DataFrame]:
+        partitions = _split_data_frames_by_partition(df_input, process_instruction.partition_by)
+        if len(partitions) == 0:
+            return _run_data_processor(data_processor, df_input, process_instruction.expected_output_data_frames)
+
+        executors = {
+            'thread': ThreadPoolExecutor,
+            'process': ProcessPoolExecutor,
+        }
+        executor = executors[process_instruction.partition_executor]
+        if process_instruction.partition_executor == 'process' and self.shared_frame_store is not None:
+            # Data frames which are not split are written once and opened as shared views by every worker;
+            # data frames which Arrow cannot store are sent to the workers as they are
+            shared = {}
+            for key, df in df_input.items():
+                if all(partition[key] is df for partition in partitions):
+                    try:
+                        shared[key] = self.shared_frame_store.share(df)
+                    except SharedFrameStoreError:
+                        pass
+            partitions = [{**partition, **shared} for partition in partitions]
+        with executor(max_workers=process_instruction.partition_workers) as pool:
+            outputs = list(pool.map(
+                _run_data_processor,
+                [data_processor] * len(partitions),
+                partitions,
+                [process_instruction.expected_output_data_frames] * len(partitions),
+            ))
+
+        # Partial outputs are concatenated in partition order, i.e. rows are grouped by partition value
+        return {key: pd.concat([output[key] for output in outputs])
+                for key in outputs[0]}
+
+    @property
+    def has_partitioned_process_execution(self) -> bool:
+        return any(process_instruction.partition_by is not None and process_instruction.partition_executor == 'process'
+                   for process_instruction in self.process_instructions_not_skipped)
+
+    def _open_checkpoint_store(self, resume: bool) -> List[int]:
+        if self.checkpoint_store is None:
+            if resume:
+                raise DataProcessorManagerError('Processing cannot be resumed because no checkpoint store is set')
+            return []
+        # The fingerprint is taken before rehydration so that it only covers the input data frames of the run;
+        # data frames are peeked one by one, so that spilled data frames are not reloaded into the manager
+        data_frames = ((key, self._df_manager.peek(key)) for key in self._df_manager.keys())
+        fingerprint = CheckpointStore.fingerprint(
+            self.process_instructions,
+            ((key, df) for key, df in data_frames if isinstance(df, (pd.DataFrame, DataFrameChunks))))
+        completed_steps = self.checkpoint_store.open(fingerprint, resume=resume)
+        self._df_manager.set_multiple_items(self.checkpoint_store.load_data_frames())
+        return completed_steps
 
     # def _receive_processor_output(self, df_output_names: List[str], output: Dict[str, pd.DataFrame]):
     #     message = f'Mismatch in {inspect.currentframe().f_code.co_name}'
     #     one_in_the_other_and_vc(df_output_names, output.keys(), DataProcessorManagerError, message)
     #     return output
 
+    def memory_report(self) -> 'MemoryReport':
+        # Data frames are attributed to the process instructions which produced them
+        return self._df_manager.memory_report(self.process_instructions)
+
+    def explain(
+            self,
+            data_frame_sizes: Dict[str, int] = None,
+            step_durations: Dict[int, float] = None,
+    ) -> ExecutionPlan:
+        """
+        Return the execution plan of the process instructions which are not skipped.
+
+        Data frames in the data frame manager are sized by the footprints recorded when they were stored,
+        so that spilled data frames are not reloaded. data_frame_sizes are estimates of the other data frames,
+        e.g. file sizes of sources which are not loaded yet or are read in chunks.
+        """
+        if self.process_instructions is None:
+            raise DataProcessorManagerError(
+                'Execution plan is not available because process instructions are not set')
+        data_frame_sizes = dict(data_frame_sizes) if data_frame_sizes is not None else {}
+        if self._df_manager is not None:
+            data_frame_sizes.update((data_frame_memory.key, data_frame_memory.memory_bytes)
+                                    for data_frame_memory in self.memory_report().data_frames)
+        if step_durations is None and self.run_history is not None:
+            step_durations = self.run_history.step_durations(self.process_instructions_not_skipped)
+        return build_execution_plan(self.process_instructions_not_skipped, data_frame_sizes, step_durations)
+
+    def print_execution_plan(self, data_frame_sizes: Dict[str, int] = None) -> None:
+        """Print the execution plan, see explain, followed by the skipped process instructions."""
+        execution_plan = self.explain(data_frame_sizes)
+        df = execution_plan.to_data_frame()
+        with pd.option_context('display.max_rows', None,
+                               'display.max_columns', None,
+                               'display.max_colwidth', None,
+                               'display.expand_frame_repr', False):
+            print('*' * 200)
+            print('These process instructions will be applied:')
+            print(df)
+            skipped = [process_instruction for process_instruction in self.process_instructions
+                       if process_instruction.skip]
+            if len(skipped) > 0:
+                print('These process instructions are skipped:')
+                print(pd.DataFrame(
+                    [[process_instruction.step, process_instruction.uses_data_processor,
+                      process_instruction.description] for process_instruction in skipped],
+                    columns=['step', 'uses_data_processor', 'description']))
+            print(f'Critical path: {execution_plan.critical_path} '
+                  f'({execution_plan.critical_path_duration:.1f} s)')
+            print(f'Predicted peak memory: {execution_plan.peak_memory_bytes} bytes')
+            print('*' * 200)
+            print()
+
     @property
-    def readout(self):  # Ugly code, ugly hack
+    def readout(self):
         if None in [self.process_instructions, self.data_processors]:
             raise DataProcessorManagerError(
                 'Process instruction readout is not available because process instructions are not set')
         else:
-            data = None
-            for process_instruction in self.process_instructions:
-                if data is None:
-                    data = {head: [] for head in process_instruction.header}
-                for head, value in data.items():
-                    value.append(process_instruction.__getattr__(head))
-
-            df = pd.DataFrame(data=data)
-            order_columns = [
-                'step',
-                'skip',
-                'description',
-                'uses_data_processor',
-                'uses_data_frames_for_input',
-                'expected_output_data_frames',
-            ]
-            df = df.reindex(columns=order_columns)
-            with pd.option_context('display.max_rows', None,
-                                   'display.max_columns', None,
-                                   'display.max_colwidth', None,
-                                   'display.expand_frame_repr', False):
-                print('*' * 200)
-                print('These process instructions will be applied:')
-                print(df)
-                print('*' * 200)
-                print()
+            self.print_execution_plan()
@@ -1,20 +1,27 @@
-from src.utils import get_values_to_key_from_list_of_dict, items_unique_in_container
+import importlib.util
+
+from scorpion.utils import get_values_to_key_from_list_of_dict, items_unique_in_container
+
+
+def _require_module(module_name, extra, needed_for):
+    # Optional dependencies are checked when the output is configured, not after all steps have run
+    if importlib.util.find_spec(module_name) is None:
+        raise ImportError(f'{needed_for} needs {module_name}; install it with: pip install local_scorpion[{extra}]')
 
 
 class SetValueOnlyOnceDescriptor:
-    def __init__(self):
-        self._value = None
-        self._value_set = False
+    # The value is kept per instance, so that several instances of the owner can be set independently
 
     def __get__(self, instance, owner):
-        return self._value if self._value_set else None
+        if instance is None:
+            return self
+        return instance.__dict__.get(self._name)
 
     def __set__(self, instance, value):
-        if self._value_set:
+        if self._name in instance.__dict__:
             raise AttributeError(f'Attribute "{self._name}" in "{instance.__class__.__name__}" can only be set once')
-        self._value_set = True
         self._validate(value)
-        self._value = value
+        instance.__dict__[self._name] = value
 
     def __set_name__(self, owner, name):
         self._name = name
@@ -25,13 +32,74 @@ class SetValueOnlyOnceDescriptor:
 
 class OutputConfigurationDescriptor(SetValueOnlyOnceDescriptor):
 
-    _allowed_formats = ['excel', 'csv']
+    _allowed_formats = ['excel', 'csv', 'parquet', 'feather', 'arrow', 'sqlite']
+    _allowed_parallel_executors = ['thread', 'process']
+    _allowed_excel_engines = [None, 'openpyxl', 'xlsxwriter', 'streaming']
+    # Codecs which the writer of every format accepts; single file formats are not compressed
+    _allowed_compressions = {
+        'csv': [None, 'gzip', 'zstd', 'bz2', 'xz'],
+        'parquet': [None, 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'],
+        'feather': [None, 'lz4', 'zstd'],
+        'arrow': [None, 'lz4', 'zstd'],
+        'excel': [None],
+        'sqlite': [None],
+    }
 
     def _validate(self, value):
         self._validate_target_format(value['target_format'])
+        self._validate_parallel_executor(value.get('parallel_executor', 'process'))
+        self._validate_excel_engine(value.get('excel_engine'))
+        self._validate_compression(value.get('compression'), value['target_format'])
+        for key in ['parallel_workers', 'row_group_size', 'chunk_size']:
+            self._validate_positive_integer(value.get(key), key)
+        self._validate_dependencies(value)
+        for output_table in value['output_tables']:
+            self._validate_partition_columns(output_table, value['target_format'])
         all_sheet_names = get_values_to_key_from_list_of_dict(value['output_tables'], 'output_table_name')
         items_unique_in_container(all_sheet_names, ValueError, 'sheets in output configuration')
 
     def _validate_target_format(self, target_format):
         if target_format not in self._allowed_formats:
             raise ValueError(f'Target format "{target_format}" is not supported')
+
+    def _validate_parallel_executor(self, parallel_executor):
+        if parallel_executor not in self._allowed_parallel_executors:
+            raise ValueError(f'Parallel executor "{parallel_executor}" is not supported')
+
+    def _validate_excel_engine(self, excel_engine):
+        if excel_engine not in self._allowed_excel_engines:
+            raise ValueError(f'Excel engine "{excel_engine}" is not supported')
+
+    def _validate_compression(self, compression, target_format):
+        if compression not in self._allowed_compressions[target_format]:
+            raise ValueError(f'Compression "{compression}" is not supported for {target_format}')
+
+    def _validate_positive_integer(self, number, key):
+        # bool is a subclass of int, but True is no number of workers or rows
+        if number is not None and (not isinstance(number, int) or isinstance(number, bool) or number < 1):
+            raise ValueError(f'"{key}" must be a positive integer, not {number!r}')
+
+    def _validate_dependencies(self, value):
+        target_format = value['target_format']
+        if target_format in ['parquet', 'feather', 'arrow']:
+            _require_module('pyarrow', 'arrow', f'Target format {target_format}')
+        if target_format == 'excel':
+            excel_engine = value.get('excel_engine')
+            if excel_engine in ['xlsxwriter', 'streaming']:
+                _require_module('xlsxwriter', 'excel', f'Excel engine {excel_engine}')
+            else:
+                _require_module('openpyxl', 'excel', 'Excel output')
+        if target_format == 'csv' and value.get('compression') == 'zstd':
+            _require_module('zstandard', 'zstd', 'Compression zstd')
+
+    def _validate_partition_columns(self, output_table, target_format):
+        partition_columns = output_table.get('partition_columns', [])
+        if not isinstance(partition_columns, list) or not all(isinstance(column, str) for column in partition_columns):
+            raise ValueError(
+                f'Partition columns of output table "{output_table["output_table_name"]}" must be a list of column names')
+        if len(partition_columns) > 0 and target_format in ['excel', 'sqlite']:
+            raise ValueError(
+                f'Output table "{output_table["output_table_name"]}" declares partition columns, '
+                f'which are not supported for target format {target_format}'
+            )
+        self._validate_positive_integer(output_table.get('max_rows_per_file'), 'max_rows_per_file')
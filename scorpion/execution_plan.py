@@ -0,0 +1,164 @@
+import os
+import pandas as pd
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Iterable, Optional, Any
+
+
+@dataclass
+class PlannedStep:
+    step: int
+    uses_data_processor: str
+    description: str
+    level: int
+    depends_on_steps: List[int]
+    parallel_with_steps: List[int]
+    estimated_input_bytes: int
+    estimated_output_bytes: int
+    estimated_duration: Optional[float]
+    on_critical_path: bool
+
+
+@dataclass
+class ExecutionPlan:
+    """
+    Resolved execution plan of process instructions.
+
+    Steps on the same dependency level do not depend on each other and can run in parallel.
+    Durations are taken from run history; steps without history count as zero seconds.
+    Peak memory is the predicted size of all data frames held after the last level,
+    because DataFrameManager keeps every data frame until the end of the run.
+    """
+    steps: List[PlannedStep]
+    levels: List[List[int]]
+    critical_path: List[int]
+    critical_path_duration: float
+    memory_after_level: List[int]
+
+    @property
+    def peak_memory_bytes(self) -> int:
+        return max(self.memory_after_level, default=0)
+
+    def to_data_frame(self) -> pd.DataFrame:
+        columns = list(PlannedStep.__dataclass_fields__)
+        return pd.DataFrame([asdict(planned_step) for planned_step in self.steps], columns=columns)
+
+
+def file_sizes(paths: Dict[str, str]) -> Dict[str, int]:
+    """Estimate data frame sizes from the sizes of the files they are loaded from, e.g. before the sources are loaded."""
+    return {key: os.path.getsize(path) for key, path in paths.items() if os.path.exists(path)}
+
+
+def dependencies(process_instructions: Iterable[Any]) -> Dict[int, List[int]]:
+    """Map every step to the steps which produce its input data frames; steps are given in order of execution."""
+    producers = {}
+    depends_on = {}
+    for process_instruction in process_instructions:
+        depends_on[process_instruction.step] = sorted({producers[key]
+                                                       for key in process_instruction.uses_data_frames_for_input
+                                                       if key in producers})
+        for key in process_instruction.expected_output_data_frames:
+            producers[key] = process_instruction.step
+    return depends_on
+
+
+def remaining_path_durations(depends_on: Dict[int, List[int]], step_durations: Dict[int, float]) -> Dict[int, float]:
+    """Duration of the longest path from every step, including the step itself, to the end of the run."""
+    remaining = {step: step_durations.get(step, 0.0) for step in depends_on}
+    for step in reversed(list(depends_on)):
+        for dependency in depends_on[step]:
+            remaining[dependency] = max(remaining[dependency],
+                                        step_durations.get(dependency, 0.0) + remaining[step])
+    return remaining
+
+
+def build_execution_plan(
+        process_instructions: Iterable[Any],
+        data_frame_sizes: Dict[str, int] = None,
+        step_durations: Dict[int, float] = None,
+) -> ExecutionPlan:
+    """
+    Build the execution plan for process instructions which are given in order of execution.
+
+    Parameters
+    ----------
+    process_instructions:
+        Process instructions which are executed, sorted by step.
+    data_frame_sizes:
+        Known sizes in bytes of data frames, e.g. the footprints recorded by DataFrameManager or file sizes.
+        The output of a step without known size is estimated as the total size of its inputs.
+    step_durations:
+        Known durations in seconds per step, e.g. from run history.
+    """
+    process_instructions = list(process_instructions)
+    data_frame_sizes = dict(data_frame_sizes) if data_frame_sizes is not None else {}
+    step_durations = step_durations if step_durations is not None else {}
+
+    depends_on = dependencies(process_instructions)
+    produced_keys = set()
+    level_by_step = {}
+    input_bytes = {}
+    output_bytes = {}
+    for process_instruction in process_instructions:
+        step = process_instruction.step
+        level_by_step[step] = 1 + max((level_by_step[dependency] for dependency in depends_on[step]), default=-1)
+        input_bytes[step] = sum(data_frame_sizes.get(key, 0) for key in process_instruction.uses_data_frames_for_input)
+        output_bytes[step] = 0
+        for key in process_instruction.expected_output_data_frames:
+            data_frame_sizes.setdefault(key, input_bytes[step])
+            output_bytes[step] += data_frame_sizes[key]
+            produced_keys.add(key)
+
+    levels = [[] for _ in range(max(level_by_step.values(), default=-1) + 1)]
+    for step, level in level_by_step.items():
+        levels[level].append(step)
+
+    critical_path, critical_path_duration = _critical_path(depends_on, step_durations)
+
+    memory = sum(size for key, size in data_frame_sizes.items() if key not in produced_keys)
+    memory_after_level = []
+    for steps_of_level in levels:
+        memory += sum(output_bytes[step] for step in steps_of_level)
+        memory_after_level.append(memory)
+
+    steps = [PlannedStep(
+        step=process_instruction.step,
+        uses_data_processor=process_instruction.uses_data_processor,
+        description=process_instruction.description,
+        level=level_by_step[process_instruction.step],
+        depends_on_steps=depends_on[process_instruction.step],
+        parallel_with_steps=[step for step in levels[level_by_step[process_instruction.step]]
+                             if step != process_instruction.step],
+        estimated_input_bytes=input_bytes[process_instruction.step],
+        estimated_output_bytes=output_bytes[process_instruction.step],
+        estimated_duration=step_durations.get(process_instruction.step),
+        on_critical_path=process_instruction.step in critical_path)
+
+        for process_instruction in process_instructions]
+
+    return ExecutionPlan(
+        steps=steps,
+        levels=levels,
+        critical_path=critical_path,
+        critical_path_duration=critical_path_duration,
+        memory_after_level=memory_after_level,
+    )
+
+
+def _critical_path(depends_on: Dict[int, List[int]], step_durations: Dict[int, float]):
+    # Longest path by duration; ties, e.g. if no durations are known, are broken by the number of steps
+    longest = {}
+    for step, dependencies in depends_on.items():
+        previous = max(dependencies, key=lambda dependency: longest[dependency][:2], default=None)
+        duration, length, _ = longest[previous] if previous is not None else (0.0, 0, None)
+        longest[step] = (duration + step_durations.get(step, 0.0), length + 1, previous)
+
+    if len(longest) == 0:
+        return [], 0.0
+
+    step = max(longest, key=lambda s: longest[s][:2])
+    critical_path_duration = longest[step][0]
+    critical_path = []
+    while step is not None:
+        critical_path.append(step)
+        step = longest[step][2]
+    return critical_path[::-1], critical_path_duration
@@ -1,22 +1,245 @@
-from collections import OrderedDict
+"""
+Run scorpion from the command line.
+
+Usage:
+    scorpion [run] config.yaml [options]    Run the pipeline of one config file
+    scorpion validate config.yaml           Check a config file without loading any data
+    scorpion steps config.yaml              List the process instructions of a config file
+    scorpion plan config.yaml [--history H] Print the execution plan with size estimates from the source files
+    scorpion batch config_1.yaml ...        Run many config files in one process, see scorpion.batch
+    scorpion daemon [--port PORT]           Serve run requests on localhost, see scorpion.daemon
+"""
+import argparse
+import importlib
+import re
+import sys
+import time
+from typing import TYPE_CHECKING, List, Sequence
 
 from scorpion.utils import load_config
 from scorpion.config import Config
-from scorpion.data_frame_manager import DataFrameManager
-from scorpion.sources import SourceManager
+from scorpion.sources import SourceManagementError, resolve_source_configs, source_file_paths
 
+# The pipeline and with it pandas is imported only by commands which process data,
+# so that validate, steps and --help start fast
+if TYPE_CHECKING:
+    from scorpion.pipeline import Pipeline
 
+# Commands which are run by the main function of their own module
+_delegated_commands = {
+    'batch': 'scorpion.batch',
+    'daemon': 'scorpion.daemon',
+}
 
-def main() -> None:
-    pass
+_byte_units = {'': 1, 'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
 
 
-if __name__ == '__main__':
+def parse_bytes(value: str) -> int:
+    """Parse a number of bytes with an optional binary unit, e.g. 512M or 4G."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*', value, flags=re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError(f'Invalid number of bytes: {value}')
+    return int(float(match.group(1)) * _byte_units[match.group(2).upper()])
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='scorpion', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('config_file', nargs='?', default='config.yaml')
+    parser.add_argument('--data-processors-module', default='scorpion.data_processor',
+                        help='Module with a list "data_processors" of the data processor classes')
+
+    workers = parser.add_argument_group('workers')
+    workers.add_argument('--max-workers', type=int, default=None,
+                         help='Number of process instructions which run at the same time')
+    workers.add_argument('--output-workers', type=int, default=None,
+                         help='Number of output files which are written at the same time')
+    workers.add_argument('--overlap-output', action='store_true',
+                         help='Write output tables as soon as their data frames are final')
+    workers.add_argument('--share-frames', action='store_true',
+                         help='Send the unsplit input data frames of partitioned steps to worker processes '
+                              'as memory-mapped Arrow files; needs pyarrow')
+    workers.add_argument('--shared-frame-dir', default=None,
+                         help='Directory of the shared data frames (default: /dev/shm)')
+
+    memory = parser.add_argument_group('memory')
+    memory.add_argument('--memory-budget', type=parse_bytes, default=None,
+                        help='Bytes of data frames held in memory, e.g. 4G; data frames above are spilled to disk. '
+                             'With --history, steps whose recorded peak memory exceeds the budget do not run '
+                             'at the same time')
+    memory.add_argument('--spill-dir', default=None, help='Directory of spilled data frames')
+    memory.add_argument('--history', default=None,
+                        help='JSON file of the measured runtime and peak memory of every step, which is read '
+                             'to schedule the steps and updated after the run')
+
+    cache = parser.add_argument_group('cache')
+    cache.add_argument('--cache-dir', default=None, help='Directory of the checkpoints of completed steps')
+    cache.add_argument('--cache-mode', choices=['off', 'write', 'resume'], default=None,
+                       help='off: no checkpoints; write: start from scratch and write checkpoints; '
+                            'resume: skip the steps which completed in an earlier run (default: write with --cache-dir)')
+    cache.add_argument('--resume', action='store_const', const='resume', dest='cache_mode',
+                       help='Same as --cache-mode resume')
+
+    rows = parser.add_argument_group('rows')
+    rows_mode = rows.add_mutually_exclusive_group()
+    rows_mode.add_argument('--limit-rows', type=int, default=None, help='Load only the first rows of every source')
+    rows_mode.add_argument('--sample', type=float, default=None, dest='sample_fraction',
+                           help='Load a random sample of this fraction of the rows of every source')
+
+    parser.add_argument('--profile', default=None, help='Write cProfile statistics of the run to this path')
+    return parser
+
+
+def _check_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.cache_mode is None:
+        args.cache_mode = 'off' if args.cache_dir is None else 'write'
+    if args.cache_mode != 'off' and args.cache_dir is None:
+        parser.error(f'--cache-mode {args.cache_mode} needs --cache-dir')
+    if args.sample_fraction is not None and not 0 < args.sample_fraction <= 1:
+        parser.error('--sample needs a fraction between 0 and 1')
+
+
+def build_pipeline(args: argparse.Namespace) -> 'Pipeline':
+    from scorpion.checkpoint import CheckpointStore
+    from scorpion.pipeline import Pipeline
+    from scorpion.run_history import RunHistory
+
+    config_raw = load_config(args.config_file, 'yaml', skip_first_level=True, first_level_key='config')
+    if args.output_workers is not None:
+        config_raw = {**config_raw, 'output': {**config_raw['output'], 'parallel_workers': args.output_workers}}
+
+    pipeline = Pipeline.from_config(
+        Config(config_raw),
+        importlib.import_module(args.data_processors_module).data_processors,
+        limit_rows=args.limit_rows,
+        sample_fraction=args.sample_fraction,
+    )
+    pipeline.data_processor_manager.max_workers = args.max_workers
+    pipeline.data_processor_manager.memory_budget = args.memory_budget
+    pipeline.data_frame_manager.memory_budget = args.memory_budget
+    pipeline.data_frame_manager.spill_directory = args.spill_dir
+    pipeline.shared_frame_directory = args.shared_frame_dir
+    if args.cache_mode != 'off':
+        pipeline.data_processor_manager.checkpoint_store = CheckpointStore(args.cache_dir)
+    if args.history is not None:
+        pipeline.data_processor_manager.run_history = RunHistory(args.history)
+    return pipeline
+
+
+def run_pipeline(args: argparse.Namespace) -> 'Pipeline':
+    pipeline = build_pipeline(args)
+    pipeline.run(resume=args.cache_mode == 'resume', overlap_output=args.overlap_output,
+                 share_frames=args.share_frames)
+    return pipeline
+
+
+def run(argv: Sequence[str]) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    _check_arguments(parser, args)
+
+    start = time.perf_counter()
+    if args.profile is None:
+        pipeline = run_pipeline(args)
+    else:
+        import cProfile
+
+        # Source loading is part of the profile, therefore the pipeline is built inside the profiled call
+        profile = cProfile.Profile()
+        pipeline = profile.runcall(run_pipeline, args)
+        profile.dump_stats(args.profile)
+
+    print(f'Run finished in {time.perf_counter() - start:.2f}s; '
+          f'peak data frame memory {pipeline.data_frame_manager.high_water_mark_bytes:,} bytes')
+    return 0
 
-    config_raw = load_config('config.yaml', 'yaml', skip_first_level=True, first_level_key='config')
-    config = Config(config_raw)
-    data_frame_manager = DataFrameManager()
-    source_manager = SourceManager()
-    source_manager.config = config
-    sources = source_manager.prepare_sources()
-    data_frame_manager.set_multiple_items(sources)
+
+_required_config_keys = ['sources', 'process_steps', 'output']
+
+
+def validate_config(config: Config) -> List[str]:
+    """Return the problems of a config which can be found without loading any data."""
+    config_data = config.as_dict
+    problems = [f'Config has no "{key}"' for key in _required_config_keys if key not in config_data]
+    if 'sources' in config_data:
+        try:
+            resolve_source_configs(config)
+        except (SourceManagementError, AttributeError, KeyError) as err:
+            problems.append(f'Sources are invalid: {err}')
+
+    steps = []
+    for position, process_step in enumerate(config_data.get('process_steps') or []):
+        missing = [key for key in ['step', 'uses_data_processor'] if key not in process_step]
+        if len(missing) > 0:
+            problems.append(f'Process step {position} has no {", ".join(missing)}')
+        steps.append(process_step.get('step'))
+    duplicates = sorted({step for step in steps if step is not None and steps.count(step) > 1})
+    if len(duplicates) > 0:
+        problems.append(f'Steps are not unique: {", ".join(map(str, duplicates))}')
+    return problems
+
+
+def _load_config_argument(command: str, argv: Sequence[str]) -> Config:
+    parser = argparse.ArgumentParser(prog=f'scorpion {command}')
+    parser.add_argument('config_file', nargs='?', default='config.yaml')
+    args = parser.parse_args(argv)
+    return Config(load_config(args.config_file, 'yaml', skip_first_level=True, first_level_key='config'))
+
+
+def validate(argv: Sequence[str]) -> int:
+    problems = validate_config(_load_config_argument('validate', argv))
+    for problem in problems:
+        print(problem)
+    print('Config is valid' if len(problems) == 0 else f'Config has {len(problems)} problems')
+    return 0 if len(problems) == 0 else 1
+
+
+def steps(argv: Sequence[str]) -> int:
+    process_steps = _load_config_argument('steps', argv).as_dict.get('process_steps') or []
+    for process_step in sorted(process_steps, key=lambda process_step: process_step['step']):
+        print(f'{process_step["step"]:>4}  {process_step["uses_data_processor"]:<30}'
+              f'{", ".join(process_step.get("uses_data_frames_for_input", []))} -> '
+              f'{", ".join(process_step.get("expected_output_data_frames", []))}'
+              f'{"  (skipped)" if process_step.get("skip") else ""}')
+    return 0
+
+
+def plan(argv: Sequence[str]) -> int:
+    from scorpion.data_processor_manager import DataProcessorManager
+    from scorpion.execution_plan import file_sizes
+    from scorpion.run_history import RunHistory
+
+    parser = argparse.ArgumentParser(prog='scorpion plan')
+    parser.add_argument('config_file', nargs='?', default='config.yaml')
+    parser.add_argument('--history', default=None, help='JSON file of the run history, see scorpion run --history')
+    args = parser.parse_args(argv)
+    config = Config(load_config(args.config_file, 'yaml', skip_first_level=True, first_level_key='config'))
+
+    # No data is loaded; sources are estimated by the sizes of their files
+    data_processor_manager = DataProcessorManager.__wrapped__()
+    data_processor_manager.process_instructions = config.as_dict.get('process_steps') or []
+    if args.history is not None:
+        data_processor_manager.run_history = RunHistory(args.history)
+    data_processor_manager.print_execution_plan(file_sizes(source_file_paths(config)))
+    return 0
+
+
+_commands = {
+    'run': run,
+    'validate': validate,
+    'steps': steps,
+    'plan': plan,
+}
+
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if len(argv) > 0 and argv[0] in _delegated_commands:
+        return importlib.import_module(_delegated_commands[argv[0]]).main(argv[1:]) or 0
+    if len(argv) > 0 and argv[0] in _commands:
+        return _commands[argv[0]](argv[1:])
+    return run(argv)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,23 +1,279 @@
+import numpy as np
 import pandas as pd
+import contextlib
 import datetime
 import os
+import shutil
+import sqlite3
+import urllib.parse
+import uuid
+from collections import abc
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Iterable, Iterator, Tuple, List
 
-from src.utils import AutoReprMixin, singleton
+from scorpion.util_classes import auto_repr, singleton
 
-from src.descriptors import SetValueOnlyOnceDescriptor, OutputConfigurationDescriptor
+from scorpion.descriptors import SetValueOnlyOnceDescriptor, OutputConfigurationDescriptor
+from scorpion.output_manifest import OutputManifest
 
 
 class OutputManagerNotReadyError(Exception):
     pass
 
 
+@contextlib.contextmanager
+def _replacing_file(file_name: str) -> Iterator[str]:
+    """
+    Yield a temporary file name in the folder of file_name, which replaces file_name once it is written.
+
+    The target is never written in place: it may be a hard link to the file of an earlier run
+    (see OutputManifest.reuse), which must keep its content. The temporary file name ends with the
+    name of the target, so that writers which infer the format from the extension keep working.
+    """
+    folder, name = os.path.split(file_name)
+    temporary_file_name = os.path.join(folder, f'.{uuid.uuid4().hex}.{name}')
+    try:
+        yield temporary_file_name
+        os.replace(temporary_file_name, file_name)
+    finally:
+        if os.path.exists(temporary_file_name):
+            os.remove(temporary_file_name)
+
+
+_default_date_format = '%Y%m%d'
+
+
+def _global_configuration_item(global_configuration, key: str, default=None):
+    """
+    Return an item of the global configuration.
+
+    The global section of a config is either a mapping or, as in the config files, a list of
+    mappings with one item each; a Config object is read through its data.
+    """
+    if hasattr(global_configuration, 'as_dict'):
+        global_configuration = global_configuration.as_dict
+    if isinstance(global_configuration, abc.Mapping):
+        global_configuration = [global_configuration]
+    for item in global_configuration or []:
+        if isinstance(item, abc.Mapping) and key in item:
+            return item[key]
+    return default
+
+
+# Writers of one file per output table are module level functions so that they can be sent to worker processes
+
+def _write_csv(df: pd.DataFrame, file_name: str, output_configuration: dict) -> None:
+    # Rows are formatted and compressed chunk by chunk, so the file is written to disk once with bounded memory
+    with _replacing_file(file_name) as temporary_file_name:
+        df.to_csv(
+            path_or_buf=temporary_file_name,
+            encoding='UTF-8',
+            sep=';',
+            chunksize=output_configuration.get('chunk_size'),
+            compression=output_configuration.get('compression'),
+        )
+
+
+def _write_parquet(df: pd.DataFrame, file_name: str, output_configuration: dict) -> None:
+    with _replacing_file(file_name) as temporary_file_name:
+        df.to_parquet(
+            temporary_file_name,
+            compression=output_configuration.get('compression', 'snappy'),
+            row_group_size=output_configuration.get('row_group_size'),
+        )
+
+
+def _write_feather(df: pd.DataFrame, file_name: str, output_configuration: dict) -> None:
+    import pyarrow as pa
+    import pyarrow.feather
+
+    with _replacing_file(file_name) as temporary_file_name:
+        pyarrow.feather.write_feather(
+            pa.Table.from_pandas(df),
+            temporary_file_name,
+            compression=output_configuration.get('compression'),
+            chunksize=output_configuration.get('row_group_size'),
+        )
+
+
+def _write_arrow(df: pd.DataFrame, file_name: str, output_configuration: dict) -> None:
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    table = pa.Table.from_pandas(df)
+    options = pyarrow.ipc.IpcWriteOptions(compression=output_configuration.get('compression'))
+    with _replacing_file(file_name) as temporary_file_name:
+        with pyarrow.ipc.new_file(temporary_file_name, table.schema, options=options) as writer:
+            writer.write_table(table, max_chunksize=output_configuration.get('row_group_size'))
+
+
+def _hive_partition_value(value) -> str:
+    if pd.isna(value):
+        return '__HIVE_DEFAULT_PARTITION__'
+    return urllib.parse.quote(str(value), safe='')
+
+
+def _excel_cell_value(value):
+    # Missing values are written as empty cells, as pandas does
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    return value
+
+
+def _write_excel_cell(worksheet, row_number: int, column_number: int, value, duration_format) -> None:
+    if isinstance(value, datetime.timedelta) and value is not pd.NaT:
+        # Durations are numbers of days; a time of day format would wrap around after 24 hours
+        worksheet.write_number(row_number, column_number, value / datetime.timedelta(days=1), duration_format)
+    else:
+        worksheet.write(row_number, column_number, _excel_cell_value(value))
+
+
+def _write_excel_streaming(file_name: str, sheets: Iterable[Tuple[str, pd.DataFrame]]) -> None:
+    """
+    Write sheets row by row in constant memory.
+
+    Every row is flushed to disk as soon as the next row is written, therefore only one row of the
+    workbook is held in memory. The layout follows DataFrame.to_excel: index levels in the first columns,
+    column names in the first row. Timedeltas are written as durations, i.e. numbers of days in [h]:mm:ss
+    format. Data frames with MultiIndex columns are rejected, because their header takes several rows.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(file_name, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'remove_timezone': True,
+    })
+    duration_format = workbook.add_format({'num_format': '[h]:mm:ss'})
+    try:
+        for sheet_name, df in sheets:
+            if isinstance(df.columns, pd.MultiIndex):
+                raise ValueError(
+                    f'Sheet "{sheet_name}" has MultiIndex columns, which the streaming Excel writer does not support; '
+                    f'flatten the columns or use excel_engine xlsxwriter')
+            worksheet = workbook.add_worksheet(sheet_name)
+            index_names = [name if name is not None else '' for name in df.index.names]
+            worksheet.write_row(0, 0, index_names + [str(column) for column in df.columns])
+            rows = zip(df.index, df.itertuples(index=False, name=None))
+            for row_number, (index_value, row) in enumerate(rows, start=1):
+                index_values = index_value if df.index.nlevels > 1 else (index_value,)
+                for column_number, value in enumerate((*index_values, *row)):
+                    _write_excel_cell(worksheet, row_number, column_number, value, duration_format)
+    finally:
+        workbook.close()
+
+
+def _sqlite_column_type(dtype) -> str:
+    if (pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype)
+            or pd.api.types.is_timedelta64_dtype(dtype)):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _sqlite_values(series: pd.Series) -> list:
+    # Values which sqlite3 cannot bind are converted as DataFrame.to_sql does: datetimes to text, timedeltas
+    # to integer nanoseconds; other values, e.g. periods, times or decimals, are written as text
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        series = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+    elif pd.api.types.is_timedelta64_dtype(series.dtype):
+        values = series.dt.as_unit('ns').to_numpy().view('int64').astype(object)
+        values[series.isna().to_numpy()] = None
+        return values.tolist()
+    values = series.astype(object).where(series.notna(), None).tolist()
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biuf':
+        return values
+    return [value if value is None or isinstance(value, (int, float, str, bytes)) else _sqlite_value(value)
+            for value in values]
+
+
+def _sqlite_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    if isinstance(value, datetime.timedelta):
+        return pd.Timedelta(value).value
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _sqlite_identifier(name) -> str:
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def _write_sqlite(file_name: str, tables: Iterable[Tuple[str, pd.DataFrame]], batch_size: int = 100_000) -> None:
+    """
+    Write every table into a new SQLite database in bulk.
+
+    Tables are created from the data frame dtypes and filled with executemany in one transaction per table.
+    The database is written from scratch, therefore journaling and syncing are switched off.
+    """
+    with _replacing_file(file_name) as temporary_file_name:
+        _write_sqlite_tables(temporary_file_name, tables, batch_size)
+
+
+def _write_sqlite_tables(file_name: str, tables: Iterable[Tuple[str, pd.DataFrame]], batch_size: int) -> None:
+    connection = sqlite3.connect(file_name, isolation_level=None)
+    try:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.execute('PRAGMA temp_store = MEMORY')
+        connection.execute('PRAGMA cache_size = -262144')
+        for table_name, df in tables:
+            # The index is written as a column, as DataFrame.to_sql does
+            df = df.reset_index()
+            columns = ', '.join(f'{_sqlite_identifier(column)} {_sqlite_column_type(dtype)}'
+                                for column, dtype in df.dtypes.items())
+            placeholders = ', '.join('?' * len(df.columns))
+            connection.execute(f'CREATE TABLE {_sqlite_identifier(table_name)} ({columns})')
+            connection.execute('BEGIN')
+            for start in range(0, len(df), batch_size):
+                batch = df.iloc[start:start + batch_size]
+                values = [_sqlite_values(batch.iloc[:, position]) for position in range(batch.shape[1])]
+                connection.executemany(
+                    f'INSERT INTO {_sqlite_identifier(table_name)} VALUES ({placeholders})', zip(*values))
+            connection.execute('COMMIT')
+    finally:
+        connection.close()
+
+
+@auto_repr
+class _BackgroundOutput:
+    """State of output which is written on background threads while data processing is still running."""
+
+    def __init__(self, parallel_workers: int, current_date: str, output_manifest: OutputManifest = None) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=parallel_workers)
+        self.current_date = current_date
+        self.output_manifest = output_manifest
+        self.futures = []
+        self.manifest_records = []
+        self.final_data_frames = set()
+        self.queued_tables = set()
+
+
 @singleton
-class OutputManager(AutoReprMixin):
+@auto_repr
+class OutputManager:
+
+    _table_file_writers = {
+        'csv': _write_csv,
+        'parquet': _write_parquet,
+        'feather': _write_feather,
+        'arrow': _write_arrow,
+    }
 
     global_configuration = SetValueOnlyOnceDescriptor()
     output_configuration = OutputConfigurationDescriptor()
     data_frames = SetValueOnlyOnceDescriptor()
 
+    def __init__(self):
+        self._background_output = None
+
     def _is_ready(self):
 
         required_attributes = [
@@ -26,18 +282,16 @@ class OutputManager(AutoReprMixin):
             self.data_frames
         ]
         try:
-            if None in required_attributes:
+            if any(attribute is None for attribute in required_attributes):
                 raise OutputManagerNotReadyError(
                     f'Output Manager is not ready; not all required attributes are provided: {required_attributes}'
                 )
 
             for output_table in self.output_configuration['output_tables']:
                 if not output_table['skip']:
-                    try:
-                        _ = output_table['output_table_data_frame'] in self.data_frames
-                    except KeyError as err:
+                    if output_table['output_table_data_frame'] not in self.data_frames:
                         raise OutputManagerNotReadyError(
-                            f""""{output_table['output_table_data_frame']}" is required for output production but was not supplied by DFManager""") from err
+                            f""""{output_table['output_table_data_frame']}" is required for output production but was not supplied by DFManager""")
         except (OutputManagerNotReadyError, KeyError):
             raise
         else:
@@ -49,44 +303,242 @@ class OutputManager(AutoReprMixin):
 
             if not self.output_configuration['skip']:
                 current_date_file_name = self._get_current_date()
-                if self.output_configuration['target_format'] == 'excel':
-                    self._produce_excel_output(current_date=current_date_file_name)
-                elif self.output_configuration['target_format'] == 'csv':
-                    self._produce_csv_output(current_date=current_date_file_name)
+                if self._background_output is not None:
+                    self._finish_background_output()
+                elif self.output_configuration['target_format'] in ['excel', 'sqlite']:
+                    self._produce_single_file_output(current_date=current_date_file_name)
+                else:
+                    self._produce_table_file_output(current_date=current_date_file_name)
                 print('Production of output is complete')
             else:
                 print(f'Production of output is skipped')
 
+    def start_background_output(self) -> None:
+        """
+        Write output tables on background threads as soon as their data frames are reported as final.
+
+        Data frames are reported by data_frames_final, e.g. by setting it as on_data_frames_final of
+        DataProcessorManager. produce_output waits for the background writes and writes the remaining tables.
+        Single file formats are written as soon as all of their tables are final.
+        """
+        if any(attribute is None for attribute in [self.global_configuration, self.output_configuration,
+                                                   self.data_frames]):
+            raise OutputManagerNotReadyError(
+                'Background output cannot be started; not all required attributes are provided')
+        if self.output_configuration['skip']:
+            return
+        single_file = self.output_configuration['target_format'] in ['excel', 'sqlite']
+        self._background_output = _BackgroundOutput(
+            parallel_workers=max(self.output_configuration.get('parallel_workers') or 1, 1),
+            current_date=self._get_current_date(),
+            # Single file output opens the manifest itself when it is written
+            output_manifest=self._open_output_manifest() if not single_file else None,
+        )
+
+    def cancel_background_output(self) -> None:
+        """
+        Stop background output which has not been finished by produce_output, e.g. because processing failed.
+
+        Queued writes are cancelled and running writes are waited for; the manifest is not updated.
+        """
+        background_output = self._background_output
+        if background_output is None:
+            return
+        self._background_output = None
+        background_output.executor.shutdown(cancel_futures=True)
+
+    def data_frames_final(self, keys: List[str]) -> None:
+        background_output = self._background_output
+        if background_output is None:
+            return
+        background_output.final_data_frames.update(keys)
+        output_tables = [output_table for output_table in self.output_configuration['output_tables']
+                         if not output_table['skip']
+                         and output_table['output_table_name'] not in background_output.queued_tables]
+        output_tables_final = [output_table for output_table in output_tables
+                               if output_table['output_table_data_frame'] in background_output.final_data_frames]
+        if self.output_configuration['target_format'] in ['excel', 'sqlite']:
+            if len(output_tables) > 0 and len(output_tables_final) == len(output_tables):
+                background_output.queued_tables.update(output_table['output_table_name']
+                                                       for output_table in output_tables)
+                background_output.futures.append(background_output.executor.submit(
+                    self._produce_single_file_output, background_output.current_date))
+            return
+
+        write = self._table_file_writers[self.output_configuration['target_format']]
+        for output_table in output_tables_final:
+            background_output.queued_tables.add(output_table['output_table_name'])
+            jobs = self._produce_table_jobs(output_table, background_output.current_date,
+                                            background_output.output_manifest, background_output.manifest_records)
+            for job in jobs:
+                background_output.futures.append(background_output.executor.submit(write, *job))
+
+    def _finish_background_output(self):
+        background_output = self._background_output
+        try:
+            # Tables whose data frames were never reported as final are written now
+            self.data_frames_final(self.data_frames.keys())
+            # Single file output reports skipped tables itself
+            if self.output_configuration['target_format'] not in ['excel', 'sqlite']:
+                for output_table in self.output_configuration['output_tables']:
+                    if output_table['skip']:
+                        print(f'Output for table "{output_table["output_table_name"]}" was skipped')
+            for future in background_output.futures:
+                future.result()
+        finally:
+            self._background_output = None
+            # Writes which are still queued after a failed write are not started
+            background_output.executor.shutdown(cancel_futures=True)
+
+        if background_output.output_manifest is not None:
+            for table_name, fingerprint, file_name in background_output.manifest_records:
+                background_output.output_manifest.record(table_name, fingerprint, file_name)
+            background_output.output_manifest.save()
+
     def _get_current_date(self):
         current_date = ''
         if self.output_configuration['current_date_suffix_to_target_file_name']:
-            date_format = self.global_configuration.get_config_item('date_format').value
+            date_format = _global_configuration_item(self.global_configuration, 'date_format', _default_date_format)
             current_date = f'{datetime.datetime.now().strftime(date_format)}'
         return current_date
 
-    def _produce_excel_output(self, current_date):
+    def _produce_single_file_output(self, current_date):
         target_file_name = self._produce_target_file_name(current_date=current_date)
-        with pd.ExcelWriter(target_file_name) as writer:
-            for output_table in self.output_configuration['output_tables']:
-                if not output_table['skip']:
-                    df = self.data_frames.get_data_frame(output_table['output_table_data_frame'])
-                    sheet_name = output_table['output_table_name']
-                    columns = output_table['output_table_columns'] if len(output_table['output_table_columns']) > 0 else None
-                    df.to_excel(writer, sheet_name=sheet_name, columns=columns)
-                else:
-                    print(f'Output for table "{output_table["output_table_name"]}" was skipped')
+        for output_table in self.output_configuration['output_tables']:
+            if output_table['skip']:
+                print(f'Output for table "{output_table["output_table_name"]}" was skipped')
+        # Tables are produced lazily for the fingerprint and again for writing, so that only one of them
+        # is held at a time
+        output_manifest = self._open_output_manifest()
+        if output_manifest is not None:
+            file_key = self.output_configuration['target_file_name']
+            fingerprint = OutputManifest.fingerprint(self._iter_output_tables(), self._serialization_options)
+            if output_manifest.reuse(file_key, fingerprint, target_file_name):
+                print(f'Output for "{file_key}" is unchanged and was not written again')
+                output_manifest.save()
+                return
+
+        if self.output_configuration['target_format'] == 'sqlite':
+            _write_sqlite(target_file_name, self._iter_output_tables())
+        else:
+            self._write_excel(target_file_name, self._iter_output_tables())
 
-    def _produce_csv_output(self, current_date):
+        if output_manifest is not None:
+            output_manifest.record(file_key, fingerprint, target_file_name)
+            output_manifest.save()
+
+    def _write_excel(self, target_file_name, sheets):
+        excel_engine = self.output_configuration.get('excel_engine')
+        with _replacing_file(target_file_name) as temporary_file_name:
+            if excel_engine == 'streaming':
+                _write_excel_streaming(temporary_file_name, sheets)
+            else:
+                with pd.ExcelWriter(temporary_file_name, engine=excel_engine) as writer:
+                    for sheet_name, df in sheets:
+                        df.to_excel(writer, sheet_name=sheet_name)
+
+    def _iter_output_tables(self) -> Iterator[Tuple[str, pd.DataFrame]]:
         for output_table in self.output_configuration['output_tables']:
             if not output_table['skip']:
-                file_name = self._produce_target_file_name(csv_part=output_table['output_table_name'], current_date=current_date)
-                df = self.data_frames.get_data_frame(output_table['output_table_data_frame'])
+                df = self.data_frames[output_table['output_table_data_frame']]
+                table_name = output_table['output_table_name']
                 columns = output_table['output_table_columns'] if len(output_table['output_table_columns']) > 0 else None
-                df.to_csv(path_or_buf=file_name, encoding='UTF-8', sep=';', columns=columns)
+                yield table_name, df if columns is None else df[columns]
+
+    def _produce_table_file_output(self, current_date):
+        output_manifest = self._open_output_manifest()
+        jobs = []
+        manifest_records = []
+        partitioned = False
+        for output_table in self.output_configuration['output_tables']:
+            if not output_table['skip']:
+                jobs.extend(self._produce_table_jobs(output_table, current_date, output_manifest, manifest_records))
+                partitioned = partitioned or len(output_table.get('partition_columns', [])) > 0
             else:
                 print(f'Output for table "{output_table["output_table_name"]}" was skipped')
+        # Partitioned tables are written in parallel even if no number of workers is configured
+        self._run_output_jobs(
+            self._table_file_writers[self.output_configuration['target_format']],
+            jobs,
+            default_parallel_workers=os.cpu_count() if partitioned else None,
+        )
+
+        if output_manifest is not None:
+            for table_name, fingerprint, file_name in manifest_records:
+                output_manifest.record(table_name, fingerprint, file_name)
+            output_manifest.save()
+
+    def _produce_table_jobs(self, output_table, current_date, output_manifest, manifest_records):
+        table_name = output_table['output_table_name']
+        partition_columns = output_table.get('partition_columns', [])
+        # File names are produced up front so that creating the target folder does not race between workers
+        file_name = self._produce_target_file_name(table_part=table_name, current_date=current_date)
+        df = self.data_frames[output_table['output_table_data_frame']]
+        columns = output_table['output_table_columns'] if len(output_table['output_table_columns']) > 0 else None
+        if columns is not None:
+            columns = columns + [column for column in partition_columns if column not in columns]
+        df = df if columns is None else df[columns]
+        if len(partition_columns) > 0:
+            table_folder = file_name[:-len(self._file_extension) - 1]
+            return self._produce_partitioned_jobs(
+                df, table_folder, partition_columns, output_table.get('max_rows_per_file'))
+        if output_manifest is not None:
+            fingerprint = OutputManifest.fingerprint([(table_name, df)], self._serialization_options)
+            if output_manifest.reuse(table_name, fingerprint, file_name):
+                print(f'Output for table "{table_name}" is unchanged and was not written again')
+                return []
+            manifest_records.append((table_name, fingerprint, file_name))
+        return [(df, file_name, self.output_configuration)]
+
+    def _produce_partitioned_jobs(self, df, table_folder, partition_columns, max_rows_per_file):
+        """
+        Produce one job per file of a Hive-style partitioned table, e.g. table/continent=EU/part-0000.parquet.
+
+        Partition columns are encoded in the folder names and are not written to the files;
+        a partition is split into several files if it has more than max_rows_per_file rows.
+        """
+        if os.path.exists(table_folder):
+            shutil.rmtree(table_folder)
+        jobs = []
+        for values, df_partition in df.groupby(partition_columns, sort=False, dropna=False, observed=True):
+            partition_folder = os.path.join(
+                table_folder,
+                *[f'{column}={_hive_partition_value(value)}' for column, value in zip(partition_columns, values)])
+            os.makedirs(partition_folder)
+            df_partition = df_partition.drop(columns=partition_columns)
+            rows_per_file = max_rows_per_file if max_rows_per_file is not None else max(len(df_partition), 1)
+            for number, start in enumerate(range(0, len(df_partition), rows_per_file)):
+                file_name = os.path.join(partition_folder, f'part-{number:04d}.{self._file_extension}')
+                jobs.append((df_partition.iloc[start:start + rows_per_file], file_name, self.output_configuration))
+        return jobs
+
+    @property
+    def _serialization_options(self):
+        keys = ['target_format', 'compression', 'row_group_size', 'excel_engine']
+        return {key: self.output_configuration.get(key) for key in keys}
 
-    def _produce_target_file_name(self, csv_part=None, current_date=None):
+    def _open_output_manifest(self):
+        # The manifest is kept next to the dated target folders, so that a run with a new date finds the previous files
+        if not self.output_configuration.get('skip_unchanged', False):
+            return None
+        return OutputManifest(f"{self.output_configuration['target_folder']}__manifest.json")
+
+    def _run_output_jobs(self, write, jobs, default_parallel_workers=None):
+        parallel_workers = self.output_configuration.get('parallel_workers', default_parallel_workers)
+        if parallel_workers is None or parallel_workers <= 1 or len(jobs) <= 1:
+            for job in jobs:
+                write(*job)
+        else:
+            executors = {
+                'thread': ThreadPoolExecutor,
+                'process': ProcessPoolExecutor,
+            }
+            executor = executors[self.output_configuration.get('parallel_executor', 'process')]
+            with executor(max_workers=parallel_workers) as pool:
+                for future in [pool.submit(write, *job) for job in jobs]:
+                    future.result()
+
+    def _produce_target_file_name(self, table_part=None, current_date=None):
 
         current_date = current_date if current_date else ''
 
@@ -94,19 +546,39 @@ class OutputManager(AutoReprMixin):
         if not os.path.exists(target_folder):
             os.mkdir(target_folder)
 
-        supported_output_formats = {
-            'csv': 'csv',
-            'excel': 'xlsx',
-        }
-
         target_file_name = self.output_configuration['target_file_name']
         if '.' in target_file_name:
             target_file_name = target_file_name.partition('.')[0]
 
-        csv_part = f'__{csv_part}' if csv_part is not None else ''
+        table_part = f'__{table_part}' if table_part is not None else ''
 
-        file_extension = supported_output_formats[self.output_configuration['target_format']]
+        file_extension = self._file_extension
 
-        file_name = f'{target_file_name}{csv_part}__{current_date}.{file_extension}'
+        file_name = f'{target_file_name}{table_part}__{current_date}.{file_extension}'
         full_path = os.path.join(target_folder, file_name)
         return full_path
+
+    @property
+    def _file_extension(self):
+
+        supported_output_formats = {
+            'csv': 'csv',
+            'excel': 'xlsx',
+            'parquet': 'parquet',
+            'feather': 'feather',
+            'arrow': 'arrow',
+            'sqlite': 'sqlite',
+        }
+
+        file_extension = supported_output_formats[self.output_configuration['target_format']]
+        if self.output_configuration['target_format'] == 'csv':
+            compression_extensions = {
+                'gzip': 'gz',
+                'zstd': 'zst',
+                'bz2': 'bz2',
+                'xz': 'xz',
+            }
+            compression = self.output_configuration.get('compression')
+            if compression is not None:
+                file_extension = f'{file_extension}.{compression_extensions[compression]}'
+        return file_extension
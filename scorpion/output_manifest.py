@@ -0,0 +1,59 @@
+import os
+import json
+import shutil
+import hashlib
+import pandas as pd
+from typing import Iterable, Tuple, Dict, Any
+
+from scorpion.util_classes import auto_repr
+from scorpion.utils import hash_data_frame
+
+
+@auto_repr
+class OutputManifest:
+    """
+    Remember the content fingerprint and the last written file of every output table.
+
+    An output table whose fingerprint is unchanged is not serialized again; its previous file is
+    hard-linked, or copied if linking is not possible, to the new file name instead.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self._entries = self._load()
+
+    @staticmethod
+    def fingerprint(tables: Iterable[Tuple[str, pd.DataFrame]], options: Dict[str, Any]) -> str:
+        # Serialization options are part of the fingerprint because they change the written file
+        content = ''.join(f'{table_name}:{hash_data_frame(df)};' for table_name, df in tables)
+        content = f'{content}{json.dumps(options, sort_keys=True, default=str)}'
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def reuse(self, table_name: str, fingerprint: str, file_name: str) -> bool:
+        entry = self._entries.get(table_name)
+        if entry is None or entry['fingerprint'] != fingerprint or not os.path.exists(entry['file_name']):
+            return False
+        if os.path.abspath(entry['file_name']) != os.path.abspath(file_name):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+            try:
+                os.link(entry['file_name'], file_name)
+            except OSError:
+                shutil.copy2(entry['file_name'], file_name)
+        self.record(table_name, fingerprint, file_name)
+        return True
+
+    def record(self, table_name: str, fingerprint: str, file_name: str) -> None:
+        self._entries[table_name] = {'fingerprint': fingerprint, 'file_name': file_name}
+
+    def save(self) -> None:
+        temporary_path = f'{self.file_path}.tmp'
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump(self._entries, manifest_file, indent=2)
+        os.replace(temporary_path, self.file_path)
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.exists(self.file_path):
+            return {}
+        with open(self.file_path) as manifest_file:
+            return json.load(manifest_file)
@@ -0,0 +1,109 @@
+import pandas as pd
+from typing import List, Dict, Any
+
+from scorpion.util_classes import auto_repr
+from scorpion.descriptors import _require_module
+from scorpion.data_frame_manager import DataFrameManager, check_copy_on_write
+from scorpion.data_processor_manager import DataProcessorManager
+from scorpion.output_manager import OutputManager
+from scorpion.shared_frame_store import SharedFrameStore
+from scorpion.sources import SourceManager, SourceCache
+
+
+@auto_repr
+class Pipeline:
+    """
+    One configured run of scorpion, which owns its own manager instances instead of the singletons.
+
+    Several pipelines can run in one process, one after another or side by side on threads, so that
+    imports and loaded reference data are reused. Data frames which are passed to more than one
+    pipeline are shared, not copied; the data frame manager of a pipeline is frozen, therefore no
+    pipeline can change a shared data frame in place.
+    """
+
+    def __init__(
+            self,
+            process_instructions: List[Dict[str, Any]],
+            data_processors: List[type],
+            output_configuration: Dict[str, Any],
+            global_configuration: Any = None,
+            data_frames: Dict[str, pd.DataFrame] = None,
+    ) -> None:
+        check_copy_on_write()
+        self.data_frame_manager = DataFrameManager.__wrapped__()
+        self.data_frame_manager.freeze = True
+        self.source_manager = SourceManager.__wrapped__()
+        self.data_processor_manager = DataProcessorManager.__wrapped__()
+        self.output_manager = OutputManager.__wrapped__()
+        # Directory of the shared frame store of runs with share_frames; by default /dev/shm or the temp directory
+        self.shared_frame_directory = None
+
+        self.data_processor_manager.add_df_manager(self.data_frame_manager)
+        self.data_processor_manager.process_instructions = process_instructions
+        self.data_processor_manager.data_processors = data_processors
+        self.data_processor_manager.data_frames_required_after_processing = {
+            output_table['output_table_data_frame']
+            for output_table in output_configuration.get('output_tables', []) if not output_table['skip']
+        }
+        self.output_manager.global_configuration = global_configuration if global_configuration is not None else {}
+        self.output_manager.output_configuration = output_configuration
+        self.output_manager.data_frames = self.data_frame_manager
+        self.data_frame_manager.set_multiple_items(data_frames if data_frames is not None else {})
+
+    @classmethod
+    def from_config(
+            cls,
+            config,
+            data_processors: List[type],
+            source_cache: SourceCache = None,
+            limit_rows: int = None,
+            sample_fraction: float = None,
+    ) -> 'Pipeline':
+        """
+        Build a pipeline from a loaded Config and load its sources.
+
+        With source_cache, sources which were already loaded by another pipeline are reused.
+        limit_rows and sample_fraction reduce every source to its first rows or to a random sample.
+        """
+        config_data = config.as_dict
+        pipeline = cls(
+            process_instructions=config_data['process_steps'],
+            data_processors=data_processors,
+            output_configuration=config_data['output'],
+            global_configuration=config_data.get('global_'),
+        )
+        pipeline.source_manager.config = config
+        pipeline.source_manager.limit_rows = limit_rows
+        pipeline.source_manager.sample_fraction = sample_fraction
+        pipeline.data_frame_manager.set_multiple_items(pipeline.source_manager.prepare_sources(source_cache))
+        return pipeline
+
+    def run(self, resume: bool = False, overlap_output: bool = False, share_frames: bool = False) -> None:
+        """
+        Process the data frames and produce the output.
+
+        With overlap_output, output tables are written in the background as soon as no remaining
+        process instruction uses their data frames. With share_frames, partitioned steps which run on worker
+        processes share their unsplit input data frames through a SharedFrameStore in shared_frame_directory;
+        data frames which cannot be shared are sent to the workers as they are.
+
+        After the run, also a failed one, background output is cancelled if it was not finished, and the
+        shared frame store and the spill files are removed; spilled data frames are not available afterwards.
+        """
+        if share_frames:
+            _require_module('pyarrow', 'arrow', 'Sharing data frames with worker processes')
+            if self.data_processor_manager.has_partitioned_process_execution:
+                self.data_processor_manager.shared_frame_store = SharedFrameStore(self.shared_frame_directory)
+        try:
+            if overlap_output:
+                self.output_manager.start_background_output()
+                self.data_processor_manager.on_data_frames_final = self.output_manager.data_frames_final
+            self.data_processor_manager.process(resume=resume)
+            self.output_manager.produce_output()
+        finally:
+            self.data_processor_manager.on_data_frames_final = None
+            self.output_manager.cancel_background_output()
+            if self.data_processor_manager.shared_frame_store is not None:
+                self.data_processor_manager.shared_frame_store.close()
+                self.data_processor_manager.shared_frame_store = None
+            self.data_frame_manager.remove_spill_files()
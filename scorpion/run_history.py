@@ -0,0 +1,115 @@
+import os
+import json
+import statistics
+import threading
+from typing import List, Dict, Iterable, Any, Optional
+
+from scorpion.util_classes import auto_repr
+
+
+class PeakMemorySampler:
+    """
+    Samples the resident set size of the process on a thread while the context is active.
+
+    peak_bytes is the peak resident set size and growth_bytes the peak above the size at entry; both are
+    None if psutil is not installed. Steps which run at the same time share the process, so each of them
+    is charged the growth of all of them; the estimate errs on the side of too much memory.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self._process = None
+        self._start_bytes = None
+        self._peak_bytes = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def peak_bytes(self) -> Optional[int]:
+        return self._peak_bytes
+
+    @property
+    def growth_bytes(self) -> Optional[int]:
+        if self._start_bytes is None:
+            return None
+        return self._peak_bytes - self._start_bytes
+
+    def __enter__(self) -> 'PeakMemorySampler':
+        try:
+            import psutil
+        except ImportError:
+            return self
+        self._process = psutil.Process()
+        self._start_bytes = self._peak_bytes = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+
+    def _sample(self) -> None:
+        while True:
+            self._peak_bytes = max(self._peak_bytes, self._process.memory_info().rss)
+            if self._stop.wait(self.interval):
+                break
+
+
+@auto_repr
+class RunHistory:
+    """
+    Local store of measured runtime and peak memory per process instruction.
+
+    A process instruction is identified by its step and data processor, so that a changed
+    process instruction does not inherit the history of another one. Only the latest max_records
+    records are kept; estimates are the median of the kept records.
+    """
+
+    max_records = 10
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self._records = self._load()
+
+    @staticmethod
+    def step_key(process_instruction: Any) -> str:
+        return f'{process_instruction.step}:{process_instruction.uses_data_processor}'
+
+    def record(self, process_instruction: Any, duration: float, peak_memory_bytes: int) -> None:
+        records = self._records.setdefault(self.step_key(process_instruction), [])
+        records.append({'duration': duration, 'peak_memory_bytes': peak_memory_bytes})
+        del records[:-self.max_records]
+
+    def step_durations(self, process_instructions: Iterable[Any]) -> Dict[int, float]:
+        return self._estimate(process_instructions, 'duration')
+
+    def step_memory(self, process_instructions: Iterable[Any]) -> Dict[int, int]:
+        return {step: int(peak_memory_bytes)
+                for step, peak_memory_bytes in self._estimate(process_instructions, 'peak_memory_bytes').items()}
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f'{self.file_path}.tmp'
+        with open(temporary_path, 'w') as history_file:
+            json.dump(self._records, history_file, indent=2)
+        os.replace(temporary_path, self.file_path)
+
+    def _estimate(self, process_instructions: Iterable[Any], measure: str) -> Dict[int, float]:
+        estimates = {}
+        for process_instruction in process_instructions:
+            # Records of older versions may lack a measure
+            values = [record[measure] for record in self._records.get(self.step_key(process_instruction), [])
+                      if measure in record]
+            if len(values) > 0:
+                estimates[process_instruction.step] = statistics.median(values)
+        return estimates
+
+    def _load(self) -> Dict[str, List[Dict[str, float]]]:
+        if not os.path.exists(self.file_path):
+            return {}
+        with open(self.file_path) as history_file:
+            return json.load(history_file)
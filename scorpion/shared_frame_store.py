@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import pandas as pd
+from dataclasses import dataclass
+from typing import Any
+
+from scorpion.util_classes import GenericManager
+
+
+class SharedFrameStoreError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SharedFrameHandle:
+    """
+    Picklable reference to a data frame in a SharedFrameStore.
+
+    Sending a handle to a worker process costs a few bytes; the worker opens the data frame from
+    the memory-mapped file, so all processes share the same pages of the page cache.
+    """
+    file_name: str
+
+    def open(self) -> pd.DataFrame:
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        # Columns without nulls of numeric, boolean or string type are zero-copy views on the mapped file;
+        # the buffers are read-only, therefore in-place mutation raises ValueError
+        with pa.memory_map(self.file_name) as source:
+            table = pyarrow.ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=True)
+
+
+def _default_directory():
+    # /dev/shm is backed by memory, so that mapped data frames never hit the disk
+    return '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+class SharedFrameStore(GenericManager):
+    """
+    Store which keeps data frames in memory-mapped Arrow IPC files instead of process memory.
+
+    Every access returns a read-only, zero-copy view; handle returns a picklable SharedFrameHandle which
+    opens the same data frame in another process. The store has no memory report and does not replace
+    DataFrameManager. Files are removed by close.
+
+    A data frame which cannot be written, because Arrow cannot convert it or the directory is full,
+    raises SharedFrameStoreError and leaves no file behind.
+    """
+
+    exception = SharedFrameStoreError
+
+    def __init__(self, directory: str = None) -> None:
+        super().__init__()
+        self.directory = tempfile.mkdtemp(prefix='scorpion_shared_', dir=directory or _default_directory())
+        self._file_count = 0
+
+    def __getitem__(self, key: str) -> Any:
+        value = super().__getitem__(key)
+        return value.open() if isinstance(value, SharedFrameHandle) else value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if isinstance(value, pd.DataFrame):
+            value = self._write(value)
+        super().__setitem__(key, value)
+
+    def handle(self, key: str) -> SharedFrameHandle:
+        value = super().__getitem__(key)
+        if not isinstance(value, SharedFrameHandle):
+            raise SharedFrameStoreError(f'Value of key "{key}" is not a data frame and has no shared frame handle')
+        return value
+
+    def share(self, df: pd.DataFrame) -> SharedFrameHandle:
+        """Write a data frame which is not stored by key, e.g. an input which is sent to many worker processes."""
+        return self._write(df)
+
+    def close(self) -> None:
+        # Views which are still open keep their mapping until they are garbage collected
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._data = {}
+
+    def _write(self, df: pd.DataFrame) -> SharedFrameHandle:
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        with self._lock:
+            file_number = self._file_count
+            self._file_count += 1
+
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowException, TypeError, ValueError) as err:
+            raise SharedFrameStoreError(f'Data frame cannot be converted to Arrow for shared storage: {err}') from err
+        # Keys are not necessarily valid file names, therefore files are numbered
+        file_name = os.path.join(self.directory, f'data_frame_{file_number:06d}.arrow')
+        try:
+            with pyarrow.ipc.new_file(file_name, table.schema) as writer:
+                writer.write_table(table)
+        except OSError as err:
+            # e.g. the directory is full; /dev/shm of a container is small by default
+            if os.path.exists(file_name):
+                os.remove(file_name)
+            raise SharedFrameStoreError(f'Data frame cannot be written to {self.directory}: {err}') from err
+        return SharedFrameHandle(file_name)
@@ -1,8 +1,11 @@
 import os.path
+import json
+import sqlite3
+import threading
+from concurrent.futures import Future
 from dataclasses import dataclass
-import pandas as pd
-from collections import ChainMap
-from typing import List, Hashable, Dict, Any
+from collections import ChainMap, OrderedDict
+from typing import TYPE_CHECKING, List, Hashable, Dict, Any, Iterable, Iterator
 
 from scorpion.util_classes import GenericManager, singleton, ConfigMixin
 from scorpion.utils import (
@@ -11,6 +14,11 @@ from scorpion.utils import (
     filter_mapping,
 )
 
+# pandas is imported when a source is loaded, so that resolving and validating source configs stays fast
+if TYPE_CHECKING:
+    import pandas as pd
+    from scorpion.data_frame_manager import DataFrameChunks
+
 
 # TODO Source Manager manages Sources by key
 # TODO Source manager checks integrity of source config
@@ -23,9 +31,43 @@ from scorpion.utils import (
 class SourceManagementError(Exception): pass
 
 
+def _iter_sqlite_batches(database: str, query: str, batch_size: int = 100_000) -> Iterator['pd.DataFrame']:
+    import pandas as pd
+
+    # The connection is read only and closed once all batches have been read
+    connection = sqlite3.connect(f'file:{database}?mode=ro', uri=True)
+    try:
+        yield from pd.read_sql_query(query, connection, chunksize=batch_size)
+    finally:
+        connection.close()
+
+
+def _read_sqlite(database: str, query: str, batch_size: int = 100_000) -> 'pd.DataFrame':
+    import pandas as pd
+
+    # pandas yields at least one, possibly empty, batch
+    return pd.concat(_iter_sqlite_batches(database, query, batch_size), ignore_index=True)
+
+
+def _read_csv(**kwargs) -> 'pd.DataFrame':
+    import pandas as pd
+    return pd.read_csv(**kwargs)
+
+
+def _read_excel(**kwargs) -> 'pd.DataFrame':
+    import pandas as pd
+    return pd.read_excel(**kwargs)
+
+
 class SourceFileLoader:
 
-    supported_formats = ['csv', 'excel']
+    supported_formats = ['csv', 'excel', 'sqlite']
+
+    _loaders = {
+        'csv': _read_csv,
+        'excel': _read_excel,
+        'sqlite': _read_sqlite,
+    }
 
     def __init__(self, **kwargs):
 
@@ -49,8 +91,9 @@ class SourceFileLoader:
     def _filter_kwargs_for_loader(self, format_):
 
         kwargs = {
-            'csv': filter_mapping(self._kwargs, ['sheet_name'], 'drop', silent_key_error=True),
-            'excel': filter_mapping(self._kwargs, ['encoding', 'delimiter'], 'drop', silent_key_error=True),
+            'csv': filter_mapping(self._kwargs, ['format', 'sheet_name'], 'drop', silent_key_error=True),
+            'excel': filter_mapping(self._kwargs, ['format', 'encoding', 'delimiter'], 'drop', silent_key_error=True),
+            'sqlite': filter_mapping(self._kwargs, ['database', 'query', 'batch_size'], 'keep', silent_key_error=True),
         }
 
         return kwargs[format_]
@@ -59,8 +102,25 @@ class SourceFileLoader:
     def load(cls, **kwargs):
 
         source_file_loader = cls(**kwargs)
-        kwargs = source_file_loader._filter_kwargs_for_loader(source_file_loader._kwargs['format'])
-        return pd.read_csv(**kwargs)
+        format_ = source_file_loader._kwargs['format']
+        kwargs = source_file_loader._filter_kwargs_for_loader(format_)
+        return cls._loaders[format_](**kwargs)
+
+    @classmethod
+    def load_chunks(cls, chunksize: int, **kwargs) -> 'DataFrameChunks':
+        import pandas as pd
+        from scorpion.data_frame_manager import DataFrameChunks
+
+        # Chunks are read lazily, each iteration over the returned chunks reads the file again
+        source_file_loader = cls(**kwargs)
+        format_ = source_file_loader._kwargs['format']
+        kwargs = source_file_loader._filter_kwargs_for_loader(format_)
+        if format_ == 'sqlite':
+            kwargs['batch_size'] = chunksize
+            return DataFrameChunks(lambda: _iter_sqlite_batches(**kwargs))
+        if format_ != 'csv':
+            raise SourceManagementError(f'Chunked loading is not supported for format {format_}')
+        return DataFrameChunks(lambda: pd.read_csv(chunksize=chunksize, **kwargs))
 
 class Source:
     pass
@@ -141,28 +201,199 @@ class SourceConfig:
             )
 
 
+def resolve_source_configs(config) -> Dict[str, Dict[str, Any]]:
+    """Resolve the effective loader configuration of every source in config."""
+    return {
+        source_name: SourceConfig(
+            source_name=source_name,
+            default_priority=config.sources.priority,
+            config_default=config.sources.defaults.as_dict,
+            config_source=source.as_dict,
+            required_config_items_in_source=config.sources.required_config_items_in_source).config
+        for source_name, source in config.sources.data
+    }
+
+
+def source_file_paths(config) -> Dict[str, str]:
+    """Paths of the files which the sources of config are loaded from, by source name."""
+    paths_by_source = {}
+    for source_name, source_config in resolve_source_configs(config).items():
+        paths = [source_config.get(key) for key in SourceCache._path_keys]
+        paths = [path for path in paths if isinstance(path, str)]
+        if len(paths) > 0:
+            paths_by_source[source_name] = paths[0]
+    return paths_by_source
+
+
+class SourceCache:
+    """
+    Loads every distinct source only once and hands out the loaded data frame to every caller.
+
+    Sources are distinct if their effective loader configuration differs; file paths are compared as
+    real paths, so that different spellings of the same path share one entry. A source whose file has
+    been changed since it was loaded is loaded again. Concurrent callers of the same source wait for
+    the first load. Cached data frames are shared, not copied, therefore they must not be changed in place.
+
+    With max_bytes, least recently used sources are evicted once the deep memory usage of the cached
+    data frames exceeds it; the most recently loaded source is kept even if it exceeds max_bytes on its own.
+    Evicted data frames stay valid for the callers which hold them.
+    """
+
+    _path_keys = ['filepath_or_buffer', 'io', 'database']
+
+    def __init__(self, max_bytes: int = None) -> None:
+        self.max_bytes = max_bytes
+        # Entries in order of last use
+        self._loads = OrderedDict()
+        # Deep memory usage of the completed loads
+        self._memory_bytes = {}
+        self._lock = threading.Lock()
+        self.load_count = 0
+        self.hit_count = 0
+        self.eviction_count = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(self._memory_bytes.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._loads)
+
+    def load(self, source_config: Dict[str, Any]) -> 'pd.DataFrame':
+        cache_key = self.cache_key(source_config)
+        signature = self.file_signature(source_config)
+        with self._lock:
+            cached = self._loads.get(cache_key)
+            loads_source = cached is None or cached[0] != signature
+            if loads_source:
+                load = Future()
+                self._loads[cache_key] = (signature, load)
+                self._memory_bytes.pop(cache_key, None)
+                self.load_count += 1
+            else:
+                load = cached[1]
+                self.hit_count += 1
+            self._loads.move_to_end(cache_key)
+        if loads_source:
+            try:
+                df = SourceFileLoader.load(**source_config)
+            except Exception as err:
+                # A failed load is not cached, the next caller tries again
+                with self._lock:
+                    if self._loads.get(cache_key, (None, None))[1] is load:
+                        del self._loads[cache_key]
+                load.set_exception(err)
+            else:
+                load.set_result(df)
+                self._add_memory_bytes(cache_key, load, df)
+        return load.result()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loads = OrderedDict()
+            self._memory_bytes = {}
+
+    def _add_memory_bytes(self, cache_key: str, load: Future, df: Any) -> None:
+        import pandas as pd
+
+        # Measured outside of the lock, deep memory usage of object columns is slow
+        memory_bytes = int(df.memory_usage(deep=True).sum()) if isinstance(df, pd.DataFrame) else 0
+        with self._lock:
+            if self._loads.get(cache_key, (None, None))[1] is not load:
+                return
+            self._memory_bytes[cache_key] = memory_bytes
+            if self.max_bytes is None:
+                return
+            for key in list(self._loads):
+                if sum(self._memory_bytes.values()) <= self.max_bytes:
+                    break
+                # Loads in progress are not evicted, their callers wait for them
+                if key != cache_key and key in self._memory_bytes:
+                    del self._loads[key]
+                    del self._memory_bytes[key]
+                    self.eviction_count += 1
+
+    def cache_key(self, source_config: Dict[str, Any]) -> str:
+        normalized = dict(source_config)
+        for key in self._path_keys:
+            if isinstance(normalized.get(key), str):
+                normalized[key] = os.path.realpath(normalized[key])
+        return json.dumps(normalized, sort_keys=True, default=str)
+
+    def file_signature(self, source_config: Dict[str, Any]) -> List[List[int]]:
+        # Modification time and size of the source files; a source without file is never reloaded
+        return [[os.stat(path).st_mtime_ns, os.stat(path).st_size]
+                for path in (source_config.get(key) for key in self._path_keys)
+                if isinstance(path, str) and os.path.exists(path)]
+
+
 @singleton
 class SourceManager(GenericManager, ConfigMixin):
     exception = SourceManagementError
 
+    # Formats whose loader stops reading after nrows rows
+    _formats_with_nrows = ['csv', 'excel']
+
     def __init__(self):
         super().__init__()
-
-    def prepare_sources(self) -> Dict[str, Any]:
-        for source_name, source in self.config.sources.data:
-            source_config = SourceConfig(
-                source_name=source_name,
-                default_priority=self.config.sources.priority,
-                config_default=self.config.sources.defaults.as_dict,
-                config_source=source.as_dict,
-                required_config_items_in_source=self.config.sources.required_config_items_in_source).config
-
-            file_handle = SourceFileLoader.load(**source_config)
-            print(file_handle)
-
-
+        # Load only the first rows, or a random sample of the rows, of every source, e.g. for fast trial runs
+        self.limit_rows = None
+        self.sample_fraction = None
+
+    def prepare_sources(self, source_cache: 'SourceCache' = None) -> Dict[str, Any]:
+        """
+        Load every source of the config.
+
+        A source with chunk_size is not loaded but read lazily in chunks of this number of rows, so that
+        streaming data processors can process sources which are larger than memory; it is not cached.
+        """
+        for source_name, source_config in resolve_source_configs(self.config).items():
+            source_config = self._limit_source_config(source_config)
+            if source_config.get('chunk_size') is not None:
+                self[source_name] = self._load_source_chunks(
+                    source_config['chunk_size'], filter_mapping(source_config, ['chunk_size'], 'drop'))
+                continue
+            df = (
+                source_cache.load(source_config)
+                if source_cache is not None
+                else SourceFileLoader.load(**source_config)
+            )
+            if self.limit_rows is not None:
+                df = df.head(self.limit_rows)
+            if self.sample_fraction is not None:
+                df = df.sample(frac=self.sample_fraction, random_state=0)
+            self[source_name] = df
         return self.data
 
+    def _load_source_chunks(self, chunk_size: int, source_config: Dict[str, Any]) -> 'DataFrameChunks':
+        from scorpion.data_frame_manager import DataFrameChunks
+
+        if not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or chunk_size < 1:
+            raise SourceManagementError(f'Chunk size must be a positive integer, not {chunk_size!r}')
+        chunks = SourceFileLoader.load_chunks(chunk_size, **source_config)
+        if self.limit_rows is None and self.sample_fraction is None:
+            return chunks
+        return DataFrameChunks(lambda: self._limit_chunks(chunks))
+
+    def _limit_chunks(self, chunks: Iterable['pd.DataFrame']) -> Iterator['pd.DataFrame']:
+        remaining_rows = self.limit_rows
+        for chunk in chunks:
+            if remaining_rows is not None:
+                if remaining_rows <= 0:
+                    return
+                chunk = chunk.head(remaining_rows)
+                remaining_rows -= len(chunk)
+            if self.sample_fraction is not None:
+                chunk = chunk.sample(frac=self.sample_fraction, random_state=0)
+            yield chunk
+
+    def _limit_source_config(self, source_config: Dict[str, Any]) -> Dict[str, Any]:
+        if self.limit_rows is None or source_config.get('format') not in self._formats_with_nrows:
+            return source_config
+        return {**source_config, 'nrows': min(self.limit_rows, source_config.get('nrows') or self.limit_rows)}
+
     def _prepare_source_config(self, source_config):
         pass
 
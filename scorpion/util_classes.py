@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 import string
+import threading
 from typing import Tuple, List, Dict, Any
 
 
@@ -7,11 +8,17 @@ def singleton(cls):
     # TODO needs tests
     # TODO needs docstring
     instances = {}
+    lock = threading.Lock()
 
     def get_instance(*args, **kwargs):
         if cls not in instances:
-            instances[cls] = cls(*args, **kwargs)
+            # Checked again under the lock, so that concurrent first calls create only one instance
+            with lock:
+                if cls not in instances:
+                    instances[cls] = cls(*args, **kwargs)
         return instances[cls]
+    # The class itself stays available, e.g. for Pipeline, which owns one instance of every manager
+    get_instance.__wrapped__ = cls
     return get_instance
 
 
@@ -53,6 +60,17 @@ class ConfigMixin:
         self._config = config
 
 
+class DFManagerMixin:
+    # TODO needs unittest
+    # TODO needs docstring
+
+    def __init__(self):
+        self._df_manager = None
+
+    def add_df_manager(self, df_manager):
+        self._df_manager = df_manager
+
+
 class DataIntegrityCheckMixin(ABC):
     # TODO needs unittest
     # TODO needs docstring
@@ -74,26 +92,33 @@ class GenericManager:
     def __init__(self) -> None:
         super().__init__()
         self._data = {}
+        # Guards _data; the lock is reentrant so that subclasses can hold it around calls to these methods
+        self._lock = threading.Condition(threading.RLock())
 
     def __iter__(self) -> Tuple[str, Any]:
-        for key in self._data:
-            yield key, self._data[key]
+        for key in self.keys():
+            yield key, self[key]
 
     def __len__(self) -> int:
-        return len(self._data)
+        with self._lock:
+            return len(self._data)
 
     def __getitem__(self, key: str) -> Any:
-        if key not in self:
-            raise self.exception(self.exception_message__get_item__.safe_substitute(key=key))
-        return self._data[key]
+        with self._lock:
+            if key not in self:
+                raise self.exception(self.exception_message__get_item__.safe_substitute(key=key))
+            return self._data[key]
 
     def __setitem__(self, key: str, value: Any) -> None:
-        if key in self:
-            raise self.exception(self.exception_message__set_item__.safe_substitute(key=key))
-        self._data[key] = value
+        with self._lock:
+            if key in self:
+                raise self.exception(self.exception_message__set_item__.safe_substitute(key=key))
+            self._data[key] = value
+            self._lock.notify_all()
 
     def __contains__(self, key: str) -> bool:
-        return key in self._data
+        with self._lock:
+            return key in self._data
 
     __eq__ = None
 
@@ -103,9 +128,35 @@ class GenericManager:
     def data(self):
         return self._data
 
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._data)
+
+    def peek(self, key: str) -> Any:
+        """Return the value of key without side effects of item access in subclasses."""
+        return self[key]
+
     def get_multiple_items(self, keys: List[str]) -> Dict[str, Any]:
         return {key: self[key] for key in keys}
 
+    def get_item_and_stored(self, key: str) -> Tuple[Any, Any]:
+        """Return the value of key as item access returns it, together with the stored value it is based on."""
+        value = self[key]
+        return value, value
+
+    def wait_for(self, key: str, timeout: float = None) -> Any:
+        """Block until key is set by another thread and return its value."""
+        return self.wait_for_multiple_items([key], timeout)[key]
+
+    def wait_for_multiple_items(self, keys: List[str], timeout: float = None) -> Dict[str, Any]:
+        with self._lock:
+            if not self._lock.wait_for(lambda: all(key in self._data for key in keys), timeout):
+                missing_keys = [key for key in keys if key not in self._data]
+                raise self.exception(
+                    f'Keys {", ".join(missing_keys)} are not available after waiting for {timeout} seconds')
+        # Keys are never removed, therefore the items are read after the lock is released
+        return self.get_multiple_items(keys)
+
     def set_multiple_items(self, items: Dict[str, Any]) -> None:
         for key, value in items.items():
             self[key] = value
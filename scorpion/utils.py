@@ -1,13 +1,16 @@
 import re
-import json
-import yaml
+import hashlib
 import itertools
 from functools import singledispatch, reduce
 from collections import Counter, namedtuple
 from dataclasses import dataclass
 from keyword import iskeyword
-import pandas as pd
-from typing import Tuple, Iterable, Hashable, Union, List, Dict, Any, Mapping
+from typing import TYPE_CHECKING, Tuple, Iterable, Hashable, Union, List, Dict, Any, Mapping
+
+# pandas, yaml and json are imported by the functions which need them, so that importing scorpion.utils,
+# e.g. for scorpion.config, stays fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 KeyPair = Tuple[Hashable, Hashable]
@@ -229,6 +232,37 @@ def produce_mapping_with_valid_attr_names(mapping: Mapping[str, Any]) -> Dict[st
     return {transform_to_valid_attr_name(k): v for k, v in mapping.items()}
 
 
+def hash_data_frame(df: 'pd.DataFrame') -> str:
+    """
+    Produce a content fingerprint of a data frame.
+
+    The fingerprint covers column names, dtypes, index and values; two data frames with the same
+    fingerprint are considered to have the same content. Data frames with values which pandas cannot
+    hash, e.g. lists or dicts in object columns, are fingerprinted by their pickle instead.
+    """
+    import pickle
+    import pandas as pd
+
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr([str(column) for column in df.columns]).encode())
+    hasher.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    try:
+        hasher.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    except TypeError:
+        hasher.update(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+    return hasher.hexdigest()
+
+
+def _load_json(file):
+    import json
+    return json.load(file)
+
+
+def _load_yaml(file):
+    import yaml
+    return yaml.safe_load(file)
+
+
 def load_config(
         file_path: str,
         format_: str,
@@ -239,8 +273,8 @@ def load_config(
     # TODO check if change to enum for loaders is a better way
     # TODO check if other Loader can be used so that a tuple can be retrieved rather than a Dict
     loaders = {
-        'json': lambda file: json.load(file),
-        'yaml': lambda file: yaml.safe_load(file),
+        'json': _load_json,
+        'yaml': _load_yaml,
     }
 
     if skip_first_level and first_level_key is None:
@@ -256,25 +290,28 @@ def load_config(
         with open(file_path) as config_file:
             return loader(config_file) if not skip_first_level else loader(config_file)[first_level_key]
 
-# def get_values_to_key_from_list_of_dict(list_of_dict: List[Dict], key: str) -> List[Any]:
-#     return [dict_[key] for dict_ in list_of_dict]
-#
-#
-# def items_unique_in_container(
-#         container: Iterable,
-#         exception,
-#         container_name: str = None,
-#         extra_message: str = None
-# ) -> None:
-#     cached = {}
-#     for item in container:
-#         if item in cached:
-#             raise exception(
-#                 f'Item "{item}" is not unique'
-#                 + (f' in {container_name}' if container_name is not None else '')
-#                 + (f'\n{extra_message}' if extra_message is not None else '')
-#             )
-#         cached[item] = None
+
+def get_values_to_key_from_list_of_dict(list_of_dict: List[Dict], key: str) -> List[Any]:
+    return [dict_[key] for dict_ in list_of_dict]
+
+
+def items_unique_in_container(
+        container: Iterable,
+        exception,
+        container_name: str = None,
+        extra_message: str = None
+) -> None:
+    cached = {}
+    for item in container:
+        if item in cached:
+            raise exception(
+                f'Item "{item}" is not unique'
+                + (f' in {container_name}' if container_name is not None else '')
+                + (f'\n{extra_message}' if extra_message is not None else '')
+            )
+        cached[item] = None
+
+
 #
 #
 #
@@ -0,0 +1,98 @@
+import textwrap
+
+import pandas as pd
+import pytest
+
+import scorpion.batch
+import scorpion.data_processor
+import scorpion.sources
+
+
+class DataProcessorJoinContinents(scorpion.data_processor.DataProcessor):
+    key = 'join_continents'
+
+    def process(self) -> None:
+        df_drinks = self.get_data_frame_by_key('drinks')
+        df_continents = self.get_data_frame_by_key('continents')
+        self.add_data_frame_to_output('drinks_continents', df_drinks.merge(df_continents, on='continent'))
+
+
+def write_config(tmp_path, region, drinks_file, continents_file):
+    config_file = tmp_path / f'{region}.yaml'
+    config_file.write_text(textwrap.dedent(f"""\
+        config:
+          sources:
+            priority: source
+            required_config_items_in_source: [priority, filepath_or_buffer]
+            defaults:
+              format: csv
+            data:
+              drinks:
+                priority: source
+                filepath_or_buffer: {drinks_file}
+              continents:
+                priority: source
+                filepath_or_buffer: {continents_file}
+          process-steps:
+            - uses_data_processor: join_continents
+              step: 1
+              skip: false
+              description: ''
+              uses_data_frames_for_input: [drinks, continents]
+              expected_output_data_frames: [drinks_continents]
+          output:
+            skip: false
+            target_format: csv
+            target_folder: {tmp_path / region}
+            target_file_name: drinks
+            current_date_suffix_to_target_file_name: false
+            output_tables:
+              - skip: false
+                output_table_name: continents
+                output_table_data_frame: drinks_continents
+                output_table_columns: []
+        """))
+    return str(config_file)
+
+
+@pytest.fixture
+def continents_file(tmp_path):
+    file_name = tmp_path / 'continents.csv'
+    pd.DataFrame({'continent': ['EU', 'AF'], 'continent_name': ['Europe', 'Africa']}).to_csv(file_name, index=False)
+    return str(file_name)
+
+
+@pytest.fixture
+def drinks_files(tmp_path):
+    file_names = {}
+    for region, country, continent in [('europe', 'Albania', 'EU'), ('africa', 'Algeria', 'AF')]:
+        file_names[region] = tmp_path / f'drinks_{region}.csv'
+        pd.DataFrame({'country': [country], 'continent': [continent]}).to_csv(file_names[region], index=False)
+    return file_names
+
+
+class TestRunBatch:
+
+    def test_shared_source_is_loaded_once(self, tmp_path, continents_file, drinks_files):
+        config_files = [write_config(tmp_path, region, drinks_file, continents_file)
+                        for region, drinks_file in drinks_files.items()]
+        source_cache = scorpion.sources.SourceCache()
+        results = scorpion.batch.run_batch(config_files, [DataProcessorJoinContinents], max_workers=2,
+                                           source_cache=source_cache)
+
+        assert [result.succeeded for result in results] == [True, True]
+        assert source_cache.load_count == 3
+        assert source_cache.hit_count == 1
+        df_africa = pd.read_csv(tmp_path / 'africa__' / 'drinks__continents__.csv', sep=';', index_col=0)
+        assert df_africa['continent_name'].tolist() == ['Africa']
+
+    def test_failure_of_one_config_is_isolated(self, tmp_path, continents_file, drinks_files):
+        config_files = [
+            write_config(tmp_path, 'europe', drinks_files['europe'], continents_file),
+            write_config(tmp_path, 'missing', tmp_path / 'missing.csv', continents_file),
+        ]
+        results = scorpion.batch.run_batch(config_files, [DataProcessorJoinContinents], max_workers=2)
+
+        assert [result.succeeded for result in results] == [True, False]
+        assert 'missing.csv' in results[1].error
+        assert (tmp_path / 'europe__' / 'drinks__continents__.csv').exists()
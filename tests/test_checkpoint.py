@@ -0,0 +1,251 @@
+import os
+
+import pandas as pd
+import pytest
+
+import scorpion.checkpoint
+import scorpion.data_frame_manager
+import scorpion.data_processor
+import scorpion.data_processor_manager
+from scorpion.data_processor_manager import ProcessInstruction
+
+
+class TestCheckpointStore:
+
+    process_instructions = [
+        ProcessInstruction(
+            uses_data_processor='processor_1',
+            step=1,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks'],
+            expected_output_data_frames=['drinks_eu'],
+        ),
+    ]
+
+    data_frames = {'drinks': pd.DataFrame({'country': ['Albania', 'Algeria'], 'continent': ['EU', 'AF']})}
+
+    def test_resume_returns_completed_steps_and_data_frames(self, tmp_path):
+        fingerprint = scorpion.checkpoint.CheckpointStore.fingerprint(
+            self.process_instructions, self.data_frames.items())
+        store = scorpion.checkpoint.CheckpointStore(str(tmp_path))
+        assert store.open(fingerprint) == []
+        df_output = self.data_frames['drinks'].iloc[:1]
+        store.save_step(1, {'drinks_eu': df_output})
+
+        store_resumed = scorpion.checkpoint.CheckpointStore(str(tmp_path))
+        assert store_resumed.open(fingerprint, resume=True) == [1]
+        pd.testing.assert_frame_equal(store_resumed.load_data_frames()['drinks_eu'], df_output)
+
+    def test_resume_raises_if_inputs_changed(self, tmp_path):
+        fingerprint = scorpion.checkpoint.CheckpointStore.fingerprint(
+            self.process_instructions, self.data_frames.items())
+        scorpion.checkpoint.CheckpointStore(str(tmp_path)).open(fingerprint)
+
+        data_frames_changed = {'drinks': self.data_frames['drinks'].iloc[::-1]}
+        fingerprint_changed = scorpion.checkpoint.CheckpointStore.fingerprint(
+            self.process_instructions, data_frames_changed.items())
+        assert fingerprint_changed != fingerprint
+        with pytest.raises(scorpion.checkpoint.CheckpointError):
+            scorpion.checkpoint.CheckpointStore(str(tmp_path)).open(fingerprint_changed, resume=True)
+
+    def test_fingerprint_of_unhashable_values(self):
+        data_frames = {'drinks': pd.DataFrame({'countries': [['Albania', 'Andorra'], ['Algeria']],
+                                               'servings': [{'beer': 89}, {'beer': 25}]})}
+        fingerprint = scorpion.checkpoint.CheckpointStore.fingerprint(self.process_instructions, data_frames.items())
+
+        assert fingerprint == scorpion.checkpoint.CheckpointStore.fingerprint(
+            self.process_instructions, {'drinks': data_frames['drinks'].copy(deep=True)}.items())
+        data_frames_changed = {'drinks': data_frames['drinks'].assign(countries=[['Albania'], ['Algeria']])}
+        assert fingerprint != scorpion.checkpoint.CheckpointStore.fingerprint(
+            self.process_instructions, data_frames_changed.items())
+
+    def test_open_without_resume_removes_data_frames_of_earlier_runs(self, tmp_path):
+        store = scorpion.checkpoint.CheckpointStore(str(tmp_path))
+        store.open('fingerprint')
+        store.save_step(1, {'drinks_eu': self.data_frames['drinks'].iloc[:1]})
+        (tmp_path / 'notes.txt').write_text('kept')
+
+        store_new = scorpion.checkpoint.CheckpointStore(str(tmp_path))
+        assert store_new.open('fingerprint_new') == []
+        assert sorted(os.listdir(tmp_path)) == ['manifest.json', 'notes.txt']
+
+    def test_resume_raises_without_manifest(self, tmp_path):
+        with pytest.raises(scorpion.checkpoint.CheckpointError):
+            scorpion.checkpoint.CheckpointStore(str(tmp_path)).open('fingerprint', resume=True)
+
+
+class DataProcessorFilterEurope(scorpion.data_processor.DataProcessor):
+    key = 'filter_europe'
+    call_count = 0
+
+    def process(self) -> None:
+        type(self).call_count += 1
+        df_drinks = self.get_data_frame_by_key('drinks')
+        self.add_data_frame_to_output('drinks_eu', df_drinks[df_drinks['continent'] == 'EU'])
+
+
+class DataProcessorCountCountries(scorpion.data_processor.DataProcessor):
+    key = 'count_countries'
+    fails = False
+
+    def process(self) -> None:
+        if type(self).fails:
+            raise RuntimeError('Counting failed')
+        self.add_data_frame_to_output(
+            'country_count', pd.DataFrame({'count': [len(self.get_data_frame_by_key('drinks_eu'))]}))
+
+
+class TestResume:
+
+    df_drinks = pd.DataFrame({'country': ['Albania', 'Algeria', 'Andorra'], 'continent': ['EU', 'AF', 'EU']})
+
+    @pytest.fixture(autouse=True)
+    def reset_data_processors(self):
+        DataProcessorFilterEurope.call_count = 0
+        DataProcessorCountCountries.fails = False
+
+    @staticmethod
+    def data_processor_manager(tmp_path, df_drinks, description=''):
+        data_frame_manager = scorpion.data_frame_manager.DataFrameManager.__wrapped__()
+        data_frame_manager['drinks'] = df_drinks
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager.__wrapped__()
+        data_processor_manager.add_df_manager(data_frame_manager)
+        data_processor_manager.process_instructions = [
+            {
+                'uses_data_processor': 'filter_europe',
+                'step': 1,
+                'skip': False,
+                'description': description,
+                'uses_data_frames_for_input': ['drinks'],
+                'expected_output_data_frames': ['drinks_eu'],
+            },
+            {
+                'uses_data_processor': 'count_countries',
+                'step': 2,
+                'skip': False,
+                'description': '',
+                'uses_data_frames_for_input': ['drinks_eu'],
+                'expected_output_data_frames': ['country_count'],
+            },
+        ]
+        data_processor_manager.data_processors = [DataProcessorFilterEurope, DataProcessorCountCountries]
+        data_processor_manager.checkpoint_store = scorpion.checkpoint.CheckpointStore(str(tmp_path / 'cache'))
+        return data_processor_manager
+
+    def test_completed_steps_are_skipped_and_their_data_frames_rehydrated(self, tmp_path):
+        DataProcessorCountCountries.fails = True
+        with pytest.raises(RuntimeError, match='Counting failed'):
+            self.data_processor_manager(tmp_path, self.df_drinks).process()
+        assert DataProcessorFilterEurope.call_count == 1
+
+        DataProcessorCountCountries.fails = False
+        data_processor_manager = self.data_processor_manager(tmp_path, self.df_drinks)
+        data_processor_manager.process(resume=True)
+
+        assert DataProcessorFilterEurope.call_count == 1
+        data_frame_manager = data_processor_manager._df_manager
+        assert data_frame_manager['drinks_eu']['country'].tolist() == ['Albania', 'Andorra']
+        assert data_frame_manager['country_count']['count'].tolist() == [2]
+
+    @pytest.mark.parametrize('df_drinks, description', [
+        (df_drinks.iloc[:2], ''),
+        (df_drinks, 'changed description'),
+    ])
+    def test_changed_input_data_frame_or_process_instruction_cannot_be_resumed(self, tmp_path, df_drinks,
+                                                                              description):
+        self.data_processor_manager(tmp_path, self.df_drinks).process()
+
+        data_processor_manager = self.data_processor_manager(tmp_path, df_drinks, description)
+        with pytest.raises(scorpion.checkpoint.CheckpointError):
+            data_processor_manager.process(resume=True)
+        assert DataProcessorFilterEurope.call_count == 1
+
+    def test_resume_without_checkpoint_store_raises(self, tmp_path):
+        data_processor_manager = self.data_processor_manager(tmp_path, self.df_drinks)
+        data_processor_manager.checkpoint_store = None
+        with pytest.raises(scorpion.data_processor_manager.DataProcessorManagerError):
+            data_processor_manager.process(resume=True)
+
+
+class StreamingDataProcessorFilterEurope(scorpion.data_processor.StreamingDataProcessor):
+    key = 'stream_europe'
+    chunk_size = 2
+
+    def process_chunk(self, chunk):
+        return {'drinks_eu': chunk[chunk['continent'] == 'EU']}
+
+
+class StreamingDataProcessorCountCountries(scorpion.data_processor.StreamingDataProcessor):
+    key = 'stream_count'
+
+    def __init__(self):
+        super().__init__()
+        self._count = 0
+
+    def process_chunk(self, chunk):
+        self._count += len(chunk)
+        return {}
+
+    def finalize(self):
+        return {'country_count': pd.DataFrame({'count': [self._count]})}
+
+
+class TestResumeStreamingChain:
+
+    @staticmethod
+    def data_processor_manager(tmp_path, drinks):
+        data_frame_manager = scorpion.data_frame_manager.DataFrameManager.__wrapped__()
+        data_frame_manager['drinks'] = drinks
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager.__wrapped__()
+        data_processor_manager.add_df_manager(data_frame_manager)
+        data_processor_manager.process_instructions = [
+            {
+                'uses_data_processor': 'stream_europe',
+                'step': 1,
+                'skip': False,
+                'description': '',
+                'uses_data_frames_for_input': ['drinks'],
+                'expected_output_data_frames': ['drinks_eu'],
+            },
+            {
+                'uses_data_processor': 'stream_count',
+                'step': 2,
+                'skip': False,
+                'description': '',
+                'uses_data_frames_for_input': ['drinks_eu'],
+                'expected_output_data_frames': ['country_count'],
+            },
+        ]
+        data_processor_manager.data_processors = [StreamingDataProcessorFilterEurope,
+                                                  StreamingDataProcessorCountCountries]
+        data_processor_manager.checkpoint_store = scorpion.checkpoint.CheckpointStore(str(tmp_path / 'cache'))
+        return data_processor_manager
+
+    def test_chain_is_saved_completely_or_not_at_all(self, tmp_path, monkeypatch):
+        to_pickle = pd.DataFrame.to_pickle
+
+        def failing_to_pickle(df, path, *args, **kwargs):
+            if 'step_2__' in str(path):
+                raise OSError('Disk full')
+            return to_pickle(df, path, *args, **kwargs)
+
+        monkeypatch.setattr(pd.DataFrame, 'to_pickle', failing_to_pickle)
+        with pytest.raises(OSError, match='Disk full'):
+            self.data_processor_manager(tmp_path, TestResume.df_drinks).process()
+        monkeypatch.undo()
+
+        data_processor_manager = self.data_processor_manager(tmp_path, TestResume.df_drinks)
+        data_processor_manager.process(resume=True)
+        assert data_processor_manager._df_manager['country_count']['count'].tolist() == [2]
+
+    def test_changed_chunked_input_cannot_be_resumed(self, tmp_path):
+        def drinks_chunks(df):
+            return scorpion.data_frame_manager.DataFrameChunks(lambda: (df.iloc[start:start + 2]
+                                                                        for start in range(0, len(df), 2)))
+
+        self.data_processor_manager(tmp_path, drinks_chunks(TestResume.df_drinks)).process()
+
+        data_processor_manager = self.data_processor_manager(tmp_path, drinks_chunks(TestResume.df_drinks.iloc[:2]))
+        with pytest.raises(scorpion.checkpoint.CheckpointError):
+            data_processor_manager.process(resume=True)
@@ -0,0 +1,144 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import scorpion.config
+import scorpion.daemon
+import scorpion.data_processor
+
+
+class DataProcessorCountCountries(scorpion.data_processor.DataProcessor):
+    key = 'count_countries'
+
+    def process(self) -> None:
+        df_drinks = self.get_data_frame_by_key('drinks')
+        self.add_data_frame_to_output('country_count', pd.DataFrame({'count': [len(df_drinks)]}))
+
+
+def inline_config(tmp_path, drinks_file):
+    return {
+        'sources': {
+            'priority': 'source',
+            'required_config_items_in_source': ['priority', 'filepath_or_buffer'],
+            'defaults': {'format': 'csv'},
+            'data': {'drinks': {'priority': 'source', 'filepath_or_buffer': str(drinks_file)}},
+        },
+        'process-steps': [{
+            'uses_data_processor': 'count_countries',
+            'step': 1,
+            'skip': False,
+            'description': '',
+            'uses_data_frames_for_input': ['drinks'],
+            'expected_output_data_frames': ['country_count'],
+        }],
+        'output': {
+            'skip': False,
+            'target_format': 'csv',
+            'target_folder': str(tmp_path / 'output'),
+            'target_file_name': 'drinks',
+            'current_date_suffix_to_target_file_name': False,
+            'output_tables': [{
+                'skip': False,
+                'output_table_name': 'count',
+                'output_table_data_frame': 'country_count',
+                'output_table_columns': [],
+            }],
+        },
+    }
+
+
+def serve(daemon):
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+
+
+@pytest.fixture
+def daemon():
+    yield from serve(scorpion.daemon.ScorpionDaemon([DataProcessorCountCountries]))
+
+
+@pytest.fixture
+def daemon_with_cache(tmp_path):
+    yield from serve(scorpion.daemon.ScorpionDaemon([DataProcessorCountCountries],
+                                                    cache_directory=str(tmp_path / 'cache')))
+
+
+def request(daemon, path, body=None):
+    host, port = daemon.address
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(f'http://{host}:{port}{path}', data=data) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as err:
+        return err.code, json.load(err)
+
+
+class TestScorpionDaemon:
+
+    def test_runs_reuse_sources_until_the_file_changes(self, tmp_path, daemon):
+        drinks_file = tmp_path / 'drinks.csv'
+        pd.DataFrame({'country': ['Albania']}).to_csv(drinks_file, index=False)
+        config = inline_config(tmp_path, drinks_file)
+
+        status_code, first = request(daemon, '/run', {'config': config})
+        assert (status_code, first['status']) == (200, 'succeeded')
+        assert first['metrics']['sources_loaded'] == 1
+
+        config['output']['target_folder'] = str(tmp_path / 'second')
+        _, second = request(daemon, '/run', {'config': config})
+        assert (second['metrics']['sources_loaded'], second['metrics']['sources_reused']) == (0, 1)
+
+        pd.DataFrame({'country': ['Albania', 'Algeria']}).to_csv(drinks_file, index=False)
+        config['output']['target_folder'] = str(tmp_path / 'third')
+        _, third = request(daemon, '/run', {'config': config})
+        assert third['metrics']['sources_loaded'] == 1
+        df_count = pd.read_csv(tmp_path / 'third__' / 'drinks__count__.csv', sep=';', index_col=0)
+        assert df_count['count'].tolist() == [2]
+        # The changed source replaces its earlier entry
+        assert request(daemon, '/status')[1]['sources_cached'] == 1
+
+    def test_failed_run_returns_error(self, tmp_path, daemon):
+        status_code, result = request(daemon, '/run', {'config': inline_config(tmp_path, tmp_path / 'missing.csv')})
+        assert (status_code, result['status']) == (500, 'failed')
+        assert 'missing.csv' in result['error']
+        assert request(daemon, '/status')[1]['failed_run_count'] == 1
+
+    def test_request_without_config_is_rejected(self, daemon):
+        status_code, result = request(daemon, '/run', {'unknown': 1})
+        assert (status_code, result['status']) == (400, 'rejected')
+
+    def test_resume_needs_cache_directory(self, tmp_path, daemon):
+        drinks_file = tmp_path / 'drinks.csv'
+        pd.DataFrame({'country': ['Albania']}).to_csv(drinks_file, index=False)
+        status_code, result = request(daemon, '/run', {'config': inline_config(tmp_path, drinks_file), 'resume': True})
+        assert (status_code, result['status']) == (400, 'rejected')
+        assert 'cache directory' in result['error']
+
+    def test_runs_write_checkpoints_and_resume(self, tmp_path, daemon_with_cache):
+        drinks_file = tmp_path / 'drinks.csv'
+        pd.DataFrame({'country': ['Albania', 'Algeria']}).to_csv(drinks_file, index=False)
+        config = inline_config(tmp_path, drinks_file)
+
+        status_code, result = request(daemon_with_cache, '/run', {'config': config})
+        assert (status_code, result['status']) == (200, 'succeeded')
+        checkpoint_directory = daemon_with_cache.checkpoint_directory(scorpion.config.Config(config))
+        with open(f'{checkpoint_directory}/manifest.json') as manifest_file:
+            assert [completed_step['step'] for completed_step in json.load(manifest_file)['completed_steps']] == [1]
+
+        (tmp_path / 'output__' / 'drinks__count__.csv').unlink()
+        status_code, result = request(daemon_with_cache, '/run', {'config': config, 'resume': True})
+        assert (status_code, result['status']) == (200, 'succeeded')
+        df_count = pd.read_csv(tmp_path / 'output__' / 'drinks__count__.csv', sep=';', index_col=0)
+        assert df_count['count'].tolist() == [2]
+
+        pd.DataFrame({'country': ['Albania']}).to_csv(drinks_file, index=False)
+        status_code, result = request(daemon_with_cache, '/run', {'config': config, 'resume': True})
+        assert (status_code, result['status']) == (500, 'failed')
+        assert 'CheckpointError' in result['error']
@@ -0,0 +1,247 @@
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import scorpion.checkpoint
+import scorpion.data_frame_manager
+import scorpion.data_processor_manager
+
+
+@pytest.fixture
+def data_frame_manager(tmp_path):
+    # A new instance instead of the singleton, so that tests do not share data frames
+    data_frame_manager = type(scorpion.data_frame_manager.DataFrameManager())()
+    data_frame_manager.spill_directory = str(tmp_path / 'spill')
+    return data_frame_manager
+
+
+def drinks(rows):
+    return pd.DataFrame({
+        'country': [f'country_{number}' for number in range(rows)],
+        'beer_servings': range(rows),
+        'continent': pd.Categorical(['EU', 'AF'] * (rows // 2)),
+    })
+
+
+class TestSpillToDisk:
+
+    def test_least_recently_used_data_frames_are_spilled_and_reloaded(self, data_frame_manager):
+        pytest.importorskip('pyarrow')
+        df = drinks(1000)
+        memory_bytes = int(df.memory_usage(deep=True).sum())
+        data_frame_manager.memory_budget = int(memory_bytes * 2.5)
+
+        data_frame_manager['drinks_1'] = df
+        data_frame_manager['drinks_2'] = drinks(1000)
+        _ = data_frame_manager['drinks_1']
+        data_frame_manager['drinks_3'] = drinks(1000)
+
+        assert isinstance(data_frame_manager.data['drinks_2'], scorpion.data_frame_manager._SpilledDataFrame)
+        assert len(os.listdir(data_frame_manager.spill_directory)) == 1
+        assert data_frame_manager.spill_metrics == scorpion.data_frame_manager.SpillMetrics(
+            spill_count=1, spill_bytes=memory_bytes)
+
+        pd.testing.assert_frame_equal(data_frame_manager['drinks_2'], df)
+        assert isinstance(data_frame_manager.data['drinks_1'], scorpion.data_frame_manager._SpilledDataFrame)
+        assert data_frame_manager.spill_metrics.reload_count == 1
+        assert data_frame_manager.spill_metrics.reload_bytes == memory_bytes
+        assert data_frame_manager.memory_bytes_in_memory <= data_frame_manager.memory_budget
+
+    def test_data_frames_which_arrow_cannot_convert_are_pickled(self, data_frame_manager):
+        pytest.importorskip('pyarrow')
+        df_mixed = pd.DataFrame({'value': [1, 'one', 1.0]})
+        data_frame_manager.memory_budget = 1
+
+        data_frame_manager['mixed'] = df_mixed
+        data_frame_manager['drinks'] = drinks(2)
+
+        assert data_frame_manager.data['mixed'].file_name.endswith('.pkl')
+        pd.testing.assert_frame_equal(data_frame_manager['mixed'], df_mixed)
+
+    def test_nothing_is_spilled_without_memory_budget(self, data_frame_manager):
+        data_frame_manager['drinks_1'] = drinks(1000)
+        data_frame_manager['drinks_2'] = drinks(1000)
+        assert data_frame_manager.spill_metrics.spill_count == 0
+        assert not os.path.exists(data_frame_manager.spill_directory)
+
+    def test_data_frame_used_while_it_is_spilled_stays_in_memory(self, monkeypatch, data_frame_manager):
+        writing, release = threading.Event(), threading.Event()
+        spill_data_frame = scorpion.data_frame_manager._spill_data_frame
+
+        def slow_spill_data_frame(df, file_name):
+            # Only the first spill is held back
+            if not writing.is_set():
+                writing.set()
+                release.wait(5)
+            return spill_data_frame(df, file_name)
+
+        monkeypatch.setattr(scorpion.data_frame_manager, '_spill_data_frame', slow_spill_data_frame)
+        data_frame_manager.memory_budget = 1
+        data_frame_manager['drinks_1'] = drinks(100)
+        thread = threading.Thread(target=data_frame_manager.__setitem__, args=('drinks_2', drinks(100)))
+        thread.start()
+        assert writing.wait(5)
+
+        # The lock is not held while the spill is written
+        pd.testing.assert_frame_equal(data_frame_manager['drinks_1'], drinks(100))
+        release.set()
+        thread.join()
+
+        assert isinstance(data_frame_manager.data['drinks_1'], pd.DataFrame)
+        assert isinstance(data_frame_manager.data['drinks_2'], scorpion.data_frame_manager._SpilledDataFrame)
+        assert data_frame_manager.spill_metrics.spill_count == 1
+        assert len(os.listdir(data_frame_manager.spill_directory)) == 1
+
+    def test_concurrent_callers_wait_for_one_reload(self, monkeypatch, data_frame_manager):
+        data_frame_manager.memory_budget = 1
+        data_frame_manager['drinks_1'] = drinks(100)
+        data_frame_manager['drinks_2'] = drinks(100)
+        reloading, release = threading.Event(), threading.Event()
+        reload_data_frame = scorpion.data_frame_manager._reload_data_frame
+
+        def slow_reload_data_frame(file_name):
+            reloading.set()
+            release.wait(5)
+            return reload_data_frame(file_name)
+
+        monkeypatch.setattr(scorpion.data_frame_manager, '_reload_data_frame', slow_reload_data_frame)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(data_frame_manager.__getitem__, 'drinks_1')
+            assert reloading.wait(5)
+            second = executor.submit(data_frame_manager.__getitem__, 'drinks_1')
+            # The lock is not held while the data frame is read
+            assert len(data_frame_manager.memory_report().data_frames) == 2
+            assert not first.done()
+            release.set()
+            assert first.result() is second.result()
+
+        assert data_frame_manager.spill_metrics.reload_count == 1
+
+    @pytest.mark.parametrize('df', [
+        pd.DataFrame({'country': pd.Series(['Albania', None, 'Andorra'], dtype=object)}),
+        pd.DataFrame({'countries': [['Albania'], ['Algeria', 'Angola'], []]}),
+        pd.DataFrame({'beer_servings': [89, 25, 245]},
+                     index=pd.Index(['Albania', None, 'Andorra'], dtype=object)),
+    ])
+    def test_object_data_is_reloaded_unchanged(self, data_frame_manager, df):
+        pytest.importorskip('pyarrow')
+        data_frame_manager.memory_budget = 1
+
+        data_frame_manager['object'] = df
+        data_frame_manager['drinks'] = drinks(2)
+        assert isinstance(data_frame_manager.data['object'], scorpion.data_frame_manager._SpilledDataFrame)
+
+        df_reloaded = data_frame_manager['object']
+        pd.testing.assert_frame_equal(df_reloaded, df)
+        assert df_reloaded.dtypes.tolist() == df.dtypes.tolist()
+        assert df_reloaded.index.dtype == df.index.dtype
+        assert [type(value) for value in df_reloaded.iloc[:, 0]] == [type(value) for value in df.iloc[:, 0]]
+
+    def test_data_frames_are_pickled_without_pyarrow(self, monkeypatch, tmp_path):
+        find_spec = importlib.util.find_spec
+        monkeypatch.setattr(importlib.util, 'find_spec',
+                            lambda name, *args: None if name == 'pyarrow' else find_spec(name, *args))
+        file_name = scorpion.data_frame_manager._spill_data_frame(drinks(4), str(tmp_path / 'drinks'))
+
+        assert file_name.endswith('.pkl')
+        pd.testing.assert_frame_equal(scorpion.data_frame_manager._reload_data_frame(file_name), drinks(4))
+
+
+class TestMemoryReport:
+
+    def test_memory_report(self, data_frame_manager):
+        process_instruction = scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor='filter_europe',
+            step=1,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks_large'],
+            expected_output_data_frames=['drinks_medium'],
+        )
+        data_frame_manager['drinks_large'] = drinks(8000)
+        data_frame_manager['drinks_medium'] = drinks(1000)
+        data_frame_manager['drinks_small'] = drinks(10)
+
+        memory_report = data_frame_manager.memory_report([process_instruction])
+        assert [data_frame_memory.key for data_frame_memory in memory_report.data_frames] == \
+               ['drinks_large', 'drinks_medium', 'drinks_small']
+        assert memory_report.total_bytes == memory_report.in_memory_bytes == memory_report.high_water_mark_bytes
+        assert [data_frame_memory.key for data_frame_memory in memory_report.largest(0.8)] == ['drinks_large']
+
+        drinks_medium = memory_report.data_frames[1]
+        assert drinks_medium.produced_by_step == 1
+        assert drinks_medium.produced_by_data_processor == 'filter_europe'
+        assert list(drinks_medium.column_bytes) == ['country', 'beer_servings', 'continent']
+        assert drinks_medium.column_bytes['beer_servings'] == 8000
+        assert drinks_medium.dtype_bytes['int64'] == 8000
+        assert drinks_medium.memory_bytes == int(drinks(1000).memory_usage(deep=True).sum())
+
+        df = memory_report.to_data_frame()
+        assert df['cumulative_share'].iloc[-1] == pytest.approx(1.0)
+
+    def test_high_water_mark_includes_spilled_data_frames(self, data_frame_manager):
+        pytest.importorskip('pyarrow')
+        data_frame_manager.memory_budget = 1
+        data_frame_manager['drinks_1'] = drinks(1000)
+        data_frame_manager['drinks_2'] = drinks(1000)
+
+        memory_report = data_frame_manager.memory_report()
+        assert memory_report.in_memory_bytes == memory_report.data_frames[0].memory_bytes
+        assert memory_report.total_bytes == 2 * memory_report.in_memory_bytes
+        assert memory_report.high_water_mark_bytes == memory_report.total_bytes
+        assert {data_frame_memory.key: data_frame_memory.in_memory for data_frame_memory in memory_report.data_frames} \
+               == {'drinks_1': False, 'drinks_2': True}
+
+    def test_fingerprint_and_execution_plan_do_not_reload_spilled_data_frames(self, data_frame_manager, tmp_path):
+        pytest.importorskip('pyarrow')
+        data_frame_manager.memory_budget = 1
+        data_frame_manager['drinks_1'] = drinks(1000)
+        data_frame_manager['drinks_2'] = drinks(1000)
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager.__wrapped__()
+        data_processor_manager.add_df_manager(data_frame_manager)
+        data_processor_manager.process_instructions = [{
+            'uses_data_processor': 'filter_europe',
+            'step': 1,
+            'skip': False,
+            'description': '',
+            'uses_data_frames_for_input': ['drinks_1', 'drinks_2'],
+            'expected_output_data_frames': ['drinks_europe'],
+        }]
+        data_processor_manager.checkpoint_store = scorpion.checkpoint.CheckpointStore(str(tmp_path / 'cache'))
+
+        assert data_processor_manager._open_checkpoint_store(resume=False) == []
+        execution_plan = data_processor_manager.explain()
+        assert execution_plan.peak_memory_bytes >= 2 * int(drinks(1000).memory_usage(deep=True).sum())
+        assert data_frame_manager.spill_metrics.reload_count == 0
+        assert isinstance(data_frame_manager.data['drinks_1'], scorpion.data_frame_manager._SpilledDataFrame)
+
+
+class TestFrozenDataFrames:
+
+    @pytest.mark.parametrize(
+        'mutate',
+        [
+            lambda df: df.loc.__setitem__((0, 'beer_servings'), 0),
+            lambda df: df.loc.__setitem__((0, 'country'), 'Austria'),
+            lambda df: df.loc.__setitem__((0, 'continent'), 'AF'),
+            lambda df: df.__setitem__('wine_servings', 0),
+            lambda df: df.drop(columns='country', inplace=True),
+            lambda df: df.sort_values('beer_servings', ascending=False, inplace=True),
+        ]
+    )
+    def test_mutation_of_frozen_view_is_detected_and_not_stored(self, data_frame_manager, mutate):
+        df = drinks(4)
+        data_frame_manager.freeze = True
+        data_frame_manager['drinks'] = df
+
+        view = data_frame_manager['drinks']
+        assert view is not df
+        assert not scorpion.data_frame_manager.is_data_frame_mutated(view, df)
+
+        mutate(view)
+        assert scorpion.data_frame_manager.is_data_frame_mutated(view, df)
+        pd.testing.assert_frame_equal(data_frame_manager.data['drinks'], drinks(4))
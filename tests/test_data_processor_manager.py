@@ -0,0 +1,354 @@
+import dataclasses
+import os
+
+import pandas as pd
+import pytest
+
+import scorpion.data_processor
+import scorpion.data_frame_manager
+import scorpion.data_processor_manager
+import scorpion.run_history
+import scorpion.shared_frame_store
+
+from fixtures.fixtures import generic_manager
+
+
+class DataProcessorTotalServings(scorpion.data_processor.DataProcessor):
+    key = 'total_servings'
+
+    def process(self) -> None:
+        df = self.get_data_frame_by_key('drinks')
+        df_total = df.assign(total_servings=df['beer_servings'] + df['wine_servings'])
+        self.add_data_frame_to_output('drinks_total', df_total)
+
+
+class StreamingDataProcessorFilterEurope(scorpion.data_processor.StreamingDataProcessor):
+    key = 'filter_europe'
+    chunk_size = 2
+
+    def process_chunk(self, chunk):
+        return {'drinks_europe': chunk[chunk['continent'] == 'EU']}
+
+
+class StreamingDataProcessorSumBeerServings(scorpion.data_processor.StreamingDataProcessor):
+    key = 'sum_beer_servings'
+
+    def __init__(self):
+        super().__init__()
+        self._beer_servings = 0
+
+    def process_chunk(self, chunk):
+        self._beer_servings += chunk['beer_servings'].sum()
+        return {}
+
+    def finalize(self):
+        return {'beer_servings': pd.DataFrame({'beer_servings': [self._beer_servings]})}
+
+
+class StreamingDataProcessorBeerShare(scorpion.data_processor.StreamingDataProcessor):
+    key = 'beer_share'
+
+    def process_chunk(self, chunk):
+        df_europe = self.get_data_frame_by_key('drinks_europe')
+        return {'beer_share': df_europe.assign(beer_share=df_europe['beer_servings'] / chunk['beer_servings'].sum())}
+
+
+class TestPartitionedExecution:
+
+    data_frames = {
+        'drinks': pd.DataFrame({
+            'country': ['Albania', 'Algeria', 'Andorra', 'Angola'],
+            'continent': ['EU', 'AF', 'EU', None],
+            'beer_servings': [89, 25, 245, 217],
+            'wine_servings': [54, 14, 312, 45],
+        }),
+        'continents': pd.DataFrame({'continent_name': ['Europe', 'Africa']}),
+    }
+
+    def test_split_by_partition_column(self):
+        partitions = scorpion.data_processor_manager._split_data_frames_by_partition(self.data_frames, 'continent')
+        assert [partition['drinks']['country'].tolist() for partition in partitions] == \
+               [['Albania', 'Andorra'], ['Algeria'], ['Angola']]
+        assert all(partition['continents'] is self.data_frames['continents'] for partition in partitions)
+
+    def test_split_raises_if_partition_column_is_missing(self):
+        with pytest.raises(scorpion.data_processor_manager.DataProcessorManagerError):
+            scorpion.data_processor_manager._split_data_frames_by_partition(self.data_frames, 'region')
+
+    @pytest.mark.parametrize('partition_executor', ['thread', 'process'])
+    def test_partitioned_output_matches_whole_frame_output(self, partition_executor):
+        process_instruction = scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor='total_servings',
+            step=1,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks'],
+            expected_output_data_frames=['drinks_total'],
+            partition_by='continent',
+            partition_workers=2,
+            partition_executor=partition_executor,
+        )
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager()
+        output = data_processor_manager._exec_process_instruction_partitioned(
+            process_instruction, DataProcessorTotalServings, self.data_frames)
+        expected = scorpion.data_processor_manager._run_data_processor(
+            DataProcessorTotalServings, self.data_frames, ['drinks_total'])
+        pd.testing.assert_frame_equal(output['drinks_total'].sort_index(), expected['drinks_total'])
+
+    def test_unsplit_data_frames_are_shared_with_worker_processes(self, monkeypatch, tmp_path):
+        pytest.importorskip('pyarrow')
+        process_instruction = scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor='total_servings',
+            step=1,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks', 'continents'],
+            expected_output_data_frames=['drinks_total'],
+            partition_by='continent',
+            partition_workers=2,
+            partition_executor='process',
+        )
+        shared_frame_store = scorpion.shared_frame_store.SharedFrameStore(str(tmp_path))
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager()
+        monkeypatch.setattr(data_processor_manager, 'shared_frame_store', shared_frame_store)
+        output = data_processor_manager._exec_process_instruction_partitioned(
+            process_instruction, DataProcessorTotalServings, self.data_frames)
+        assert output['drinks_total']['total_servings'].tolist() == [143, 557, 39, 262]
+        # Only the data frame which is handed to every partition unchanged is shared
+        assert len(os.listdir(shared_frame_store.directory)) == 1
+        shared_frame_store.close()
+
+
+class DataProcessorMutateInput(scorpion.data_processor.DataProcessor):
+    key = 'mutate_input'
+
+    def process(self) -> None:
+        df = self.get_data_frame_by_key('drinks')
+        df.loc[0, 'beer_servings'] = 0
+        self.add_data_frame_to_output('drinks_mutated', df)
+
+
+class DataProcessorSpillAndReloadInput(scorpion.data_processor.DataProcessor):
+    key = 'spill_and_reload_input'
+    data_frame_manager = None
+
+    def process(self) -> None:
+        # Another step reads a data frame, which spills the input; the input is then reloaded as another data frame
+        _ = self.data_frame_manager['other']
+        _ = self.data_frame_manager['drinks']
+        df = self.get_data_frame_by_key('drinks')
+        self.add_data_frame_to_output('drinks_total', df.assign(total_servings=df['beer_servings'] + 1))
+
+
+class TestFrozenInput:
+
+    @pytest.mark.parametrize(
+        'data_processor, expected_output_data_frame, mutates_input',
+        [
+            (DataProcessorTotalServings, 'drinks_total', False),
+            (DataProcessorMutateInput, 'drinks_mutated', True),
+        ]
+    )
+    def test_input_mutation_is_detected(self, monkeypatch, data_processor, expected_output_data_frame,
+                                        mutates_input):
+        process_instruction = scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor=data_processor.key,
+            step=1,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks'],
+            expected_output_data_frames=[expected_output_data_frame],
+        )
+        data_frame_manager = type(scorpion.data_frame_manager.DataFrameManager())()
+        data_frame_manager.freeze = True
+        data_frame_manager['drinks'] = TestPartitionedExecution.data_frames['drinks']
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager()
+        monkeypatch.setattr(data_processor_manager, '_df_manager', data_frame_manager)
+        monkeypatch.setattr(data_processor_manager, 'get_data_processor_by_key',
+                            {data_processor.key: data_processor}.__getitem__)
+
+        if mutates_input:
+            with pytest.raises(scorpion.data_processor_manager.DataProcessorManagerError):
+                data_processor_manager._exec_process_instruction(process_instruction)
+        else:
+            data_processor_manager._exec_process_instruction(process_instruction)
+        assert data_frame_manager.data['drinks']['beer_servings'].tolist() == [89, 25, 245, 217]
+
+    def test_input_reloaded_by_another_step_is_not_reported_as_mutated(self, monkeypatch, tmp_path):
+        process_instruction = scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor=DataProcessorSpillAndReloadInput.key,
+            step=1,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks'],
+            expected_output_data_frames=['drinks_total'],
+        )
+        data_frame_manager = type(scorpion.data_frame_manager.DataFrameManager())()
+        data_frame_manager.freeze = True
+        data_frame_manager.memory_budget = 1
+        data_frame_manager.spill_directory = str(tmp_path)
+        data_frame_manager['drinks'] = TestPartitionedExecution.data_frames['drinks']
+        data_frame_manager['other'] = TestPartitionedExecution.data_frames['drinks'].copy()
+        stored = data_frame_manager.peek('drinks')
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager()
+        monkeypatch.setattr(data_processor_manager, '_df_manager', data_frame_manager)
+        monkeypatch.setattr(data_processor_manager, 'get_data_processor_by_key',
+                            {DataProcessorSpillAndReloadInput.key: DataProcessorSpillAndReloadInput}.__getitem__)
+        monkeypatch.setattr(DataProcessorSpillAndReloadInput, 'data_frame_manager', data_frame_manager)
+
+        output = data_processor_manager._exec_process_instruction(process_instruction)
+
+        assert data_frame_manager.data['drinks'] is not stored
+        assert output['drinks_total']['total_servings'].tolist() == [90, 26, 246, 218]
+
+
+class TestStreamingExecution:
+
+    df_drinks = pd.DataFrame({
+        'country': ['Albania', 'Algeria', 'Andorra', 'Angola', 'Armenia'],
+        'continent': ['EU', 'AF', 'EU', 'AF', 'EU'],
+        'beer_servings': [89, 25, 245, 217, 21],
+    })
+
+    process_instructions = [
+        scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor='filter_europe',
+            step=1,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks'],
+            expected_output_data_frames=['drinks_europe'],
+        ),
+        scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor='sum_beer_servings',
+            step=2,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks_europe'],
+            expected_output_data_frames=['beer_servings'],
+        ),
+    ]
+
+    data_processors = {
+        'filter_europe': StreamingDataProcessorFilterEurope,
+        'sum_beer_servings': StreamingDataProcessorSumBeerServings,
+    }
+
+    @pytest.fixture
+    def data_processor_manager(self, monkeypatch, generic_manager):
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager()
+        monkeypatch.setattr(data_processor_manager, 'get_data_processor_by_key', self.data_processors.__getitem__)
+        data_processor_manager.add_df_manager(generic_manager)
+        return data_processor_manager
+
+    @pytest.mark.parametrize(
+        'drinks',
+        [
+            df_drinks,
+            scorpion.data_frame_manager.DataFrameChunks(lambda: (
+                TestStreamingExecution.df_drinks.iloc[start:start + 3] for start in range(0, 5, 3))),
+        ]
+    )
+    def test_streaming_chain_does_not_materialize_intermediate_data_frames(self, data_processor_manager, drinks):
+        chains = data_processor_manager._group_streaming_chains(self.process_instructions)
+        assert chains == [self.process_instructions]
+
+        data_processor_manager._df_manager['drinks'] = drinks
+        outputs = data_processor_manager._exec_streaming_chain(chains[0], keys_required_later=set())
+        assert outputs[0] == {}
+        assert outputs[1]['beer_servings']['beer_servings'].tolist() == [355]
+
+    def test_further_input_produced_by_the_chain_is_materialized(self, generic_manager):
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager.__wrapped__()
+        data_processor_manager.add_df_manager(generic_manager)
+        data_processor_manager.data_processors = [*self.data_processors.values(), StreamingDataProcessorBeerShare]
+        data_processor_manager.process_instructions = [
+            *[dataclasses.asdict(process_instruction) for process_instruction in self.process_instructions],
+            {
+                'uses_data_processor': 'beer_share',
+                'step': 3,
+                'skip': False,
+                'description': '',
+                'uses_data_frames_for_input': ['beer_servings', 'drinks_europe'],
+                'expected_output_data_frames': ['beer_share'],
+            },
+        ]
+        generic_manager['drinks'] = self.df_drinks
+
+        chains = data_processor_manager._group_streaming_chains(data_processor_manager.process_instructions)
+        assert [[process_instruction.step for process_instruction in chain] for chain in chains] == [[1, 2], [3]]
+        data_processor_manager._exec_process_instructions()
+        assert generic_manager['beer_share']['beer_share'].round(2).tolist() == [0.25, 0.69, 0.06]
+
+    def test_data_frames_required_after_processing_are_materialized(self, data_processor_manager):
+        data_processor_manager._df_manager['drinks'] = self.df_drinks
+        data_processor_manager.data_frames_required_after_processing = {'drinks_europe'}
+        outputs, _, _ = data_processor_manager._exec_chain(self.process_instructions, [self.process_instructions])
+        assert outputs[0]['drinks_europe']['country'].tolist() == ['Albania', 'Andorra', 'Armenia']
+
+    def test_streaming_chain_materializes_data_frames_required_later(self, data_processor_manager):
+        data_processor_manager._df_manager['drinks'] = self.df_drinks
+        outputs = data_processor_manager._exec_streaming_chain(
+            self.process_instructions, keys_required_later={'drinks_europe'})
+        assert outputs[0]['drinks_europe']['country'].tolist() == ['Albania', 'Andorra', 'Armenia']
+
+
+class DataProcessorRecordOrder(scorpion.data_processor.DataProcessor):
+    key = 'record_order'
+    order = []
+
+    def process(self) -> None:
+        df = self.get_data_frame_by_key('drinks')
+        for key in self._expected_output_data_frames:
+            self.order.append(key)
+            self.add_data_frame_to_output(key, df)
+
+
+class TestScheduledExecution:
+
+    process_instructions = [
+        scorpion.data_processor_manager.ProcessInstruction(
+            uses_data_processor='record_order',
+            step=step,
+            skip=False,
+            description='',
+            uses_data_frames_for_input=['drinks'],
+            expected_output_data_frames=[f'drinks_{step}'],
+        )
+        for step in [1, 2, 3]
+    ]
+
+    @pytest.fixture
+    def data_processor_manager(self, monkeypatch, generic_manager, tmp_path):
+        data_processor_manager = scorpion.data_processor_manager.DataProcessorManager()
+        monkeypatch.setattr(data_processor_manager, 'get_data_processor_by_key',
+                            {'record_order': DataProcessorRecordOrder}.__getitem__)
+        monkeypatch.setattr(data_processor_manager, 'max_workers', 2)
+        monkeypatch.setattr(data_processor_manager, 'memory_budget', 100)
+        monkeypatch.setattr(data_processor_manager, 'run_history',
+                            scorpion.run_history.RunHistory(str(tmp_path / 'run_history.json')))
+        data_processor_manager.add_df_manager(generic_manager)
+        data_processor_manager._df_manager['drinks'] = pd.DataFrame({'beer_servings': [89, 25]})
+        DataProcessorRecordOrder.order.clear()
+        return data_processor_manager
+
+    def test_longest_step_runs_first_within_memory_budget(self, data_processor_manager):
+        for process_instruction, duration in zip(self.process_instructions, [1.0, 3.0, 2.0]):
+            data_processor_manager.run_history.record(process_instruction, duration, peak_memory_bytes=60)
+
+        chains = data_processor_manager._group_streaming_chains(self.process_instructions)
+        data_processor_manager._exec_chains_scheduled(
+            chains, data_processor_manager._count_pending_uses(self.process_instructions))
+        assert DataProcessorRecordOrder.order == ['drinks_2', 'drinks_3', 'drinks_1']
+        assert all(f'drinks_{step}' in data_processor_manager._df_manager for step in [1, 2, 3])
+        assert set(data_processor_manager.run_history.step_durations(self.process_instructions)) == {1, 2, 3}
+
+    def test_data_frames_are_released_once_no_remaining_step_uses_them(self, monkeypatch, data_processor_manager):
+        monkeypatch.setattr(type(data_processor_manager), 'process_instructions', self.process_instructions)
+        monkeypatch.setattr(data_processor_manager, 'max_workers', None)
+        released = []
+        monkeypatch.setattr(data_processor_manager, 'on_data_frames_final', released.append)
+        data_processor_manager._df_manager['continents'] = pd.DataFrame({'continent': ['EU', 'AF']})
+
+        data_processor_manager._exec_process_instructions()
+        assert released == [['continents'], ['drinks_1'], ['drinks_2'], ['drinks', 'drinks_3']]
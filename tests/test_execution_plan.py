@@ -0,0 +1,113 @@
+import pandas as pd
+import pytest
+
+import scorpion.data_frame_manager
+import scorpion.data_processor
+import scorpion.data_processor_manager
+import scorpion.execution_plan
+from scorpion.data_processor_manager import ProcessInstruction
+
+
+def process_instruction(step, uses_data_frames_for_input, expected_output_data_frames):
+    return ProcessInstruction(
+        uses_data_processor=f'processor_{step}',
+        step=step,
+        skip=False,
+        description='',
+        uses_data_frames_for_input=uses_data_frames_for_input,
+        expected_output_data_frames=expected_output_data_frames,
+    )
+
+
+class TestBuildExecutionPlan:
+
+    process_instructions = [
+        process_instruction(1, ['drinks'], ['drinks_eu']),
+        process_instruction(2, ['drinks'], ['drinks_af']),
+        process_instruction(3, ['drinks_eu', 'drinks_af'], ['drinks_eu_af']),
+        process_instruction(4, ['drinks'], ['drinks_as']),
+    ]
+
+    def test_levels_and_dependencies(self):
+        execution_plan = scorpion.execution_plan.build_execution_plan(self.process_instructions)
+        assert execution_plan.levels == [[1, 2, 4], [3]]
+        assert execution_plan.steps[2].depends_on_steps == [1, 2]
+        assert execution_plan.steps[0].parallel_with_steps == [2, 4]
+
+    @pytest.mark.parametrize(
+        'step_durations, expected_critical_path, expected_duration',
+        [
+            ({}, [1, 3], 0.0),
+            ({1: 1.0, 2: 5.0, 3: 1.0, 4: 2.0}, [2, 3], 6.0),
+            ({1: 1.0, 2: 1.0, 3: 1.0, 4: 9.0}, [4], 9.0),
+        ]
+    )
+    def test_critical_path(self, step_durations, expected_critical_path, expected_duration):
+        execution_plan = scorpion.execution_plan.build_execution_plan(
+            self.process_instructions, step_durations=step_durations)
+        assert execution_plan.critical_path == expected_critical_path
+        assert execution_plan.critical_path_duration == expected_duration
+
+    def test_memory_estimate(self):
+        execution_plan = scorpion.execution_plan.build_execution_plan(
+            self.process_instructions, data_frame_sizes={'drinks': 100, 'drinks_eu': 10})
+        assert [planned_step.estimated_output_bytes for planned_step in execution_plan.steps] == [10, 100, 110, 100]
+        assert execution_plan.memory_after_level == [310, 420]
+        assert execution_plan.peak_memory_bytes == 420
+
+
+def test_file_sizes(tmp_path):
+    drinks_file = tmp_path / 'drinks.csv'
+    drinks_file.write_text('country\nAlbania\n')
+    assert scorpion.execution_plan.file_sizes(
+        {'drinks': str(drinks_file), 'missing': str(tmp_path / 'missing.csv')}) == {'drinks': 16}
+
+
+def test_explain_estimates_data_frames_which_are_not_stored_by_the_given_sizes():
+    data_frame_manager = scorpion.data_frame_manager.DataFrameManager.__wrapped__()
+    data_frame_manager['continents'] = pd.DataFrame({'continent': ['EU', 'AF']})
+    data_processor_manager = scorpion.data_processor_manager.DataProcessorManager.__wrapped__()
+    data_processor_manager.add_df_manager(data_frame_manager)
+    data_processor_manager.process_instructions = [
+        {
+            'uses_data_processor': 'nothing',
+            'step': 1,
+            'skip': False,
+            'description': '',
+            'uses_data_frames_for_input': ['drinks', 'continents'],
+            'expected_output_data_frames': ['drinks_continents'],
+        }
+    ]
+    continents_bytes = data_frame_manager.memory_report().data_frames[0].memory_bytes
+
+    execution_plan = data_processor_manager.explain({'drinks': 1000, 'continents': 1})
+    assert execution_plan.steps[0].estimated_input_bytes == 1000 + continents_bytes
+
+
+class DataProcessorNothing(scorpion.data_processor.DataProcessor):
+    key = 'nothing'
+
+    def process(self) -> None:
+        pass
+
+
+def test_readout_lists_skipped_steps(capsys):
+    data_processor_manager = scorpion.data_processor_manager.DataProcessorManager.__wrapped__()
+    data_processor_manager.process_instructions = [
+        {
+            'uses_data_processor': 'nothing',
+            'step': step,
+            'skip': step == 2,
+            'description': f'description_{step}',
+            'uses_data_frames_for_input': ['drinks'],
+            'expected_output_data_frames': [f'drinks_{step}'],
+        }
+        for step in [1, 2]
+    ]
+    data_processor_manager.data_processors = [DataProcessorNothing]
+    data_processor_manager.readout
+
+    applied, skipped = capsys.readouterr().out.split('These process instructions are skipped:')
+    assert 'description_1' in applied and 'description_2' not in applied
+    assert 'description_2' in skipped and 'description_1' not in skipped
+
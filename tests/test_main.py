@@ -0,0 +1,222 @@
+import argparse
+import datetime
+import json
+import os
+import pstats
+import subprocess
+import sys
+import textwrap
+
+import pandas as pd
+import pytest
+import yaml
+
+import scorpion.config
+import scorpion.data_frame_manager
+import scorpion.data_processor
+import scorpion.main
+import scorpion.utils
+
+
+class DataProcessorCountCountries(scorpion.data_processor.DataProcessor):
+    key = 'count_countries'
+
+    def process(self) -> None:
+        df_drinks = self.get_data_frame_by_key('drinks')
+        self.add_data_frame_to_output('country_count', pd.DataFrame({'count': [len(df_drinks)]}))
+
+
+class StreamingDataProcessorFilterEurope(scorpion.data_processor.StreamingDataProcessor):
+    key = 'filter_europe'
+
+    def process_chunk(self, chunk):
+        return {'drinks_europe': chunk[chunk['continent'] == 'EU']}
+
+
+class StreamingDataProcessorCountChunks(scorpion.data_processor.StreamingDataProcessor):
+    key = 'count_chunks'
+
+    def __init__(self):
+        super().__init__()
+        self._chunk_sizes = []
+
+    def process_chunk(self, chunk):
+        self._chunk_sizes.append(len(chunk))
+        return {}
+
+    def finalize(self):
+        return {'country_count': pd.DataFrame({'count': [sum(self._chunk_sizes)], 'chunks': [len(self._chunk_sizes)]})}
+
+
+data_processors = [DataProcessorCountCountries, StreamingDataProcessorFilterEurope, StreamingDataProcessorCountChunks]
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    drinks_file = tmp_path / 'drinks.csv'
+    pd.DataFrame({'country': ['Albania', 'Algeria', 'Andorra', 'Angola']}).to_csv(drinks_file, index=False)
+    config_file = tmp_path / 'config.yaml'
+    config_file.write_text(textwrap.dedent(f"""\
+        config:
+          sources:
+            priority: source
+            required_config_items_in_source: [priority, filepath_or_buffer]
+            defaults:
+              format: csv
+            data:
+              drinks:
+                priority: source
+                filepath_or_buffer: {drinks_file}
+          process-steps:
+            - uses_data_processor: count_countries
+              step: 1
+              skip: false
+              description: ''
+              uses_data_frames_for_input: [drinks]
+              expected_output_data_frames: [country_count]
+          output:
+            skip: false
+            target_format: csv
+            target_folder: {tmp_path / 'output'}
+            target_file_name: drinks
+            current_date_suffix_to_target_file_name: false
+            output_tables:
+              - skip: false
+                output_table_name: count
+                output_table_data_frame: country_count
+                output_table_columns: []
+        """))
+    return str(config_file)
+
+
+def read_count(tmp_path):
+    return pd.read_csv(tmp_path / 'output__' / 'drinks__count__.csv', sep=';', index_col=0)['count'].tolist()
+
+
+@pytest.mark.parametrize('value, expected', [('1024', 1024), ('512M', 512 * 2 ** 20), ('1.5GiB', 3 * 2 ** 29)])
+def test_parse_bytes(value, expected):
+    assert scorpion.main.parse_bytes(value) == expected
+
+
+def test_parse_bytes_rejects_invalid_value():
+    with pytest.raises(argparse.ArgumentTypeError):
+        scorpion.main.parse_bytes('lots')
+
+
+class TestMain:
+
+    def test_run_with_limit_rows_and_profile(self, tmp_path, config_file):
+        profile_file = tmp_path / 'run.prof'
+        assert scorpion.main.main([
+            'run', config_file, '--data-processors-module', __name__, '--limit-rows', '3',
+            '--memory-budget', '1G', '--max-workers', '2', '--profile', str(profile_file),
+        ]) == 0
+
+        assert read_count(tmp_path) == [3]
+        assert pstats.Stats(str(profile_file)).total_calls > 0
+
+    def test_run_writes_checkpoints_and_resumes(self, tmp_path, config_file):
+        arguments = [config_file, '--data-processors-module', __name__, '--cache-dir', str(tmp_path / 'cache')]
+        assert scorpion.main.main(arguments) == 0
+        assert (tmp_path / 'cache' / 'manifest.json').exists()
+
+        (tmp_path / 'output__' / 'drinks__count__.csv').unlink()
+        assert scorpion.main.main(arguments + ['--resume']) == 0
+        assert read_count(tmp_path) == [4]
+
+    def test_run_records_history(self, tmp_path, config_file):
+        history_file = tmp_path / 'history.json'
+        arguments = [config_file, '--data-processors-module', __name__, '--history', str(history_file)]
+        assert scorpion.main.main(arguments) == 0
+        assert scorpion.main.main(arguments + ['--memory-budget', '1G', '--max-workers', '2']) == 0
+
+        records = json.loads(history_file.read_text())['1:count_countries']
+        assert len(records) == 2
+        assert all(record['peak_memory_bytes'] > 0 for record in records)
+
+    @pytest.mark.parametrize('global_section, date_format', [
+        ('', '%Y%m%d'),
+        ('  global:\n    - date_format: "%Y-%m"\n', '%Y-%m'),
+    ])
+    def test_run_with_current_date_suffix(self, tmp_path, config_file, global_section, date_format):
+        config = open(config_file).read().replace(
+            'current_date_suffix_to_target_file_name: false', 'current_date_suffix_to_target_file_name: true')
+        with open(config_file, 'w') as file:
+            file.write(config.replace('config:\n', f'config:\n{global_section}', 1))
+        assert scorpion.main.main([config_file, '--data-processors-module', __name__]) == 0
+
+        current_date = datetime.datetime.now().strftime(date_format)
+        assert (tmp_path / f'output__{current_date}' / f'drinks__count__{current_date}.csv').exists()
+
+    @pytest.mark.parametrize('arguments, expected_count', [([], [3]), (['--limit-rows', '3'], [2])])
+    def test_run_streams_source_in_chunks(self, tmp_path, config_file, arguments, expected_count):
+        pd.DataFrame({'country': ['Albania', 'Algeria', 'Andorra', 'Angola', 'Austria'],
+                      'continent': ['EU', 'AF', 'EU', 'AF', 'EU']}).to_csv(tmp_path / 'drinks.csv', index=False)
+        with open(config_file) as file:
+            config = yaml.safe_load(file)
+        config['config']['sources']['data']['drinks']['chunk_size'] = 2
+        config['config']['process-steps'] = [
+            {'uses_data_processor': 'filter_europe', 'step': 1, 'skip': False, 'description': '',
+             'uses_data_frames_for_input': ['drinks'], 'expected_output_data_frames': ['drinks_europe']},
+            {'uses_data_processor': 'count_chunks', 'step': 2, 'skip': False, 'description': '',
+             'uses_data_frames_for_input': ['drinks_europe'], 'expected_output_data_frames': ['country_count']},
+        ]
+        with open(config_file, 'w') as file:
+            yaml.safe_dump(config, file)
+        arguments = [config_file, '--data-processors-module', __name__, *arguments]
+        pipeline = scorpion.main.build_pipeline(scorpion.main._build_parser().parse_args(arguments))
+        assert isinstance(pipeline.data_frame_manager.data['drinks'], scorpion.data_frame_manager.DataFrameChunks)
+
+        assert scorpion.main.main(arguments) == 0
+        assert read_count(tmp_path) == expected_count
+
+    def test_resume_needs_cache_dir(self, config_file):
+        with pytest.raises(SystemExit):
+            scorpion.main.main([config_file, '--resume'])
+
+    def test_batch_command_is_delegated(self, tmp_path, config_file):
+        assert scorpion.main.main(['batch', config_file, '--data-processors-module', __name__]) == 0
+        assert read_count(tmp_path) == [4]
+
+
+class TestValidateAndSteps:
+
+    def test_valid_config(self, config_file, capsys):
+        assert scorpion.main.main(['validate', config_file]) == 0
+        assert 'Config is valid' in capsys.readouterr().out
+
+    def test_invalid_config(self, tmp_path):
+        config_file = tmp_path / 'invalid.yaml'
+        config_file.write_text(textwrap.dedent("""\
+            config:
+              process-steps:
+                - step: 1
+                  uses_data_processor: count_countries
+                - step: 1
+            """))
+        problems = scorpion.main.validate_config(scorpion.config.Config(scorpion.utils.load_config(
+            str(config_file), 'yaml', skip_first_level=True, first_level_key='config')))
+        assert problems == [
+            'Config has no "sources"',
+            'Config has no "output"',
+            'Process step 1 has no uses_data_processor',
+            'Steps are not unique: 1',
+        ]
+
+    def test_steps(self, config_file, capsys):
+        assert scorpion.main.main(['steps', config_file]) == 0
+        assert 'count_countries' in capsys.readouterr().out
+
+    def test_plan_estimates_sizes_from_source_files(self, tmp_path, config_file, capsys):
+        assert scorpion.main.main(['plan', config_file]) == 0
+        output = capsys.readouterr().out
+        assert 'count_countries' in output
+        # The source and the output of the step, which is estimated by the size of its input
+        assert f'Predicted peak memory: {2 * os.path.getsize(tmp_path / "drinks.csv")} bytes' in output
+
+    def test_validate_does_not_import_pandas(self, config_file):
+        repository_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        statement = f'import sys, scorpion.main; scorpion.main.validate([{config_file!r}]); print("pandas" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', statement], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'PYTHONPATH': repository_directory}).stdout
+        assert output.split()[-1] == 'False'
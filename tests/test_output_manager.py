@@ -0,0 +1,402 @@
+import datetime
+import decimal
+import importlib.util
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import scorpion.output_manager
+
+from fixtures.fixtures import generic_manager
+
+
+def output_configuration(target_folder, target_format, output_table_options=None, **kwargs):
+    # output_table_options holds further keys of output tables by output table name
+    output_table_options = output_table_options if output_table_options is not None else {}
+    output_tables = [
+        {
+            'skip': False,
+            'output_table_name': 'europe',
+            'output_table_data_frame': 'drinks_europe',
+            'output_table_columns': ['country', 'beer_servings'],
+        },
+        {
+            'skip': False,
+            'output_table_name': 'africa',
+            'output_table_data_frame': 'drinks_africa',
+            'output_table_columns': [],
+        },
+        {
+            'skip': True,
+            'output_table_name': 'asia',
+            'output_table_data_frame': 'drinks_asia',
+            'output_table_columns': [],
+        },
+    ]
+    return {
+        'skip': False,
+        'target_format': target_format,
+        'target_folder': target_folder,
+        'target_file_name': 'drinks.out',
+        'current_date_suffix_to_target_file_name': False,
+        'output_tables': [{**output_table, **output_table_options.get(output_table['output_table_name'], {})}
+                          for output_table in output_tables],
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def data_frames(generic_manager):
+    generic_manager['drinks_europe'] = pd.DataFrame({
+        'country': ['Albania', 'Andorra'],
+        'beer_servings': [89, 245],
+        'wine_servings': [54, 312],
+    })
+    generic_manager['drinks_africa'] = pd.DataFrame({
+        'country': ['Algeria', 'Angola'],
+        'beer_servings': [25, 217],
+        'wine_servings': [14, 45],
+    })
+    return generic_manager
+
+
+@pytest.fixture
+def output_manager_factory(data_frames, tmp_path):
+    """New output manager whose configuration is validated by its set-once descriptors."""
+
+    def factory(target_format, **kwargs):
+        output_manager = scorpion.output_manager.OutputManager.__wrapped__()
+        output_manager.global_configuration = {}
+        output_manager.output_configuration = output_configuration(str(tmp_path / 'output'), target_format, **kwargs)
+        output_manager.data_frames = data_frames
+        return output_manager
+
+    return factory
+
+
+class TestOutputConfigurationValidation:
+
+    @pytest.mark.parametrize('target_format, configuration', [
+        ('xml', {}),
+        ('csv', {'parallel_workers': 0}),
+        ('csv', {'parallel_workers': '2'}),
+        ('csv', {'parallel_executor': 'cluster'}),
+        ('csv', {'chunk_size': -1}),
+        ('csv', {'compression': 'snappy'}),
+        ('parquet', {'compression': 'lzo'}),
+        ('parquet', {'row_group_size': 0}),
+        ('feather', {'compression': 'snappy'}),
+        ('arrow', {'compression': 'gzip'}),
+        ('excel', {'excel_engine': 'xlwt'}),
+        ('excel', {'compression': 'gzip'}),
+        ('sqlite', {'output_table_options': {'africa': {'partition_columns': ['continent']}}}),
+        ('parquet', {'output_table_options': {'africa': {'partition_columns': 'continent'}}}),
+        ('parquet', {'output_table_options': {'africa': {'partition_columns': ['continent'],
+                                                          'max_rows_per_file': 0}}}),
+    ])
+    def test_invalid_configuration_is_rejected(self, output_manager_factory, target_format, configuration):
+        with pytest.raises(ValueError):
+            output_manager_factory(target_format, **configuration)
+
+    def test_output_configuration_can_only_be_set_once(self, output_manager_factory, tmp_path):
+        output_manager = output_manager_factory('csv')
+        with pytest.raises(AttributeError):
+            output_manager.output_configuration = output_configuration(str(tmp_path), 'csv')
+
+
+class TestOptionalDependencies:
+
+    @pytest.mark.parametrize('target_format, configuration, missing_module', [
+        ('parquet', {}, 'pyarrow'),
+        ('arrow', {}, 'pyarrow'),
+        ('excel', {'excel_engine': 'streaming'}, 'xlsxwriter'),
+        ('excel', {}, 'openpyxl'),
+        ('csv', {'compression': 'zstd'}, 'zstandard'),
+    ])
+    def test_missing_dependency_is_rejected_when_output_is_configured(
+            self, monkeypatch, tmp_path, target_format, configuration, missing_module):
+        find_spec = importlib.util.find_spec
+        monkeypatch.setattr(importlib.util, 'find_spec',
+                            lambda name, *args: None if name == missing_module else find_spec(name, *args))
+        output_manager = scorpion.output_manager.OutputManager.__wrapped__()
+        with pytest.raises(ImportError, match='pip install local_scorpion'):
+            output_manager.output_configuration = output_configuration(str(tmp_path), target_format, **configuration)
+
+
+class TestCsvOutput:
+
+    @pytest.mark.parametrize(
+        'parallel_configuration',
+        [
+            {},
+            {'parallel_workers': 2, 'parallel_executor': 'thread'},
+            {'parallel_workers': 2, 'parallel_executor': 'process'},
+        ]
+    )
+    def test_produce_csv_output(self, output_manager_factory, tmp_path, parallel_configuration):
+        output_manager = output_manager_factory('csv', **parallel_configuration)
+        output_manager.produce_output()
+
+        target_folder = tmp_path / 'output__'
+        assert sorted(os.listdir(target_folder)) == ['drinks__africa__.csv', 'drinks__europe__.csv']
+        df_europe = pd.read_csv(target_folder / 'drinks__europe__.csv', sep=';', index_col=0)
+        assert df_europe.columns.tolist() == ['country', 'beer_servings']
+        df_africa = pd.read_csv(target_folder / 'drinks__africa__.csv', sep=';', index_col=0)
+        assert df_africa['beer_servings'].tolist() == [25, 217]
+
+    @pytest.mark.parametrize('compression, file_extension', [('gzip', 'csv.gz'), ('zstd', 'csv.zst')])
+    def test_produce_compressed_csv_output_in_chunks(self, output_manager_factory, tmp_path, compression, file_extension):
+        if compression == 'zstd':
+            pytest.importorskip('zstandard')
+        output_manager = output_manager_factory('csv', compression=compression, chunk_size=1)
+        output_manager.produce_output()
+
+        file_path = tmp_path / 'output__' / f'drinks__europe__.{file_extension}'
+        df_europe = pd.read_csv(file_path, sep=';', index_col=0, compression=compression)
+        assert df_europe['country'].tolist() == ['Albania', 'Andorra']
+
+
+class TestColumnarOutput:
+
+    @pytest.mark.parametrize('target_format', ['parquet', 'feather', 'arrow'])
+    @pytest.mark.parametrize('compression', ['zstd', 'lz4'])
+    def test_produce_columnar_output(self, output_manager_factory, tmp_path, target_format, compression):
+        pa = pytest.importorskip('pyarrow')
+        import pyarrow.ipc
+        import pyarrow.parquet
+
+        output_manager = output_manager_factory(target_format, compression=compression, row_group_size=1)
+        output_manager.produce_output()
+
+        file_path = str(tmp_path / 'output__' / f'drinks__europe__.{target_format}')
+        if target_format == 'parquet':
+            assert pyarrow.parquet.ParquetFile(file_path).num_row_groups == 2
+            table = pyarrow.parquet.read_table(file_path)
+        else:
+            with pa.memory_map(file_path) as source:
+                reader = pyarrow.ipc.open_file(source)
+                assert reader.num_record_batches == 2
+                table = reader.read_all()
+        df_europe = table.to_pandas()
+        assert df_europe.columns.tolist() == ['country', 'beer_servings']
+        assert df_europe['beer_servings'].tolist() == [89, 245]
+
+
+class TestExcelOutput:
+
+    @pytest.mark.parametrize('excel_engine', [None, 'xlsxwriter', 'streaming'])
+    def test_produce_excel_output(self, output_manager_factory, data_frames, tmp_path, excel_engine):
+        pytest.importorskip('openpyxl')
+        pytest.importorskip('xlsxwriter')
+        data_frames['drinks_africa'].loc[1, 'wine_servings'] = float('nan')
+
+        output_manager = output_manager_factory('excel', excel_engine=excel_engine)
+        output_manager.produce_output()
+
+        sheets = pd.read_excel(tmp_path / 'output__' / 'drinks__.xlsx', sheet_name=None, index_col=0)
+        assert list(sheets) == ['europe', 'africa']
+        assert sheets['europe'].columns.tolist() == ['country', 'beer_servings']
+        assert sheets['africa']['country'].tolist() == ['Algeria', 'Angola']
+        assert sheets['africa']['wine_servings'].isna().tolist() == [False, True]
+
+
+    def test_streaming_writer_expands_multi_index_and_writes_durations(self, tmp_path):
+        openpyxl = pytest.importorskip('openpyxl')
+        pytest.importorskip('xlsxwriter')
+        df = pd.DataFrame(
+            {'duration': pd.to_timedelta(['30 hours', None]), 'beer_servings': [89, 25]},
+            index=pd.MultiIndex.from_tuples([('EU', 'Albania'), ('AF', 'Algeria')], names=['continent', 'country']),
+        )
+        file_name = str(tmp_path / 'drinks.xlsx')
+        scorpion.output_manager._write_excel_streaming(file_name, [('drinks', df)])
+
+        worksheet = openpyxl.load_workbook(file_name)['drinks']
+        assert [[cell.value for cell in row] for row in worksheet.iter_rows()] == [
+            ['continent', 'country', 'duration', 'beer_servings'],
+            ['EU', 'Albania', datetime.timedelta(hours=30), 89],
+            ['AF', 'Algeria', None, 25],
+        ]
+        assert worksheet['C2'].number_format == '[h]:mm:ss'
+
+    def test_streaming_writer_rejects_multi_index_columns(self, tmp_path):
+        pytest.importorskip('xlsxwriter')
+        df = pd.DataFrame([[89, 245]], columns=pd.MultiIndex.from_tuples([('servings', 'beer'), ('servings', 'wine')]))
+        with pytest.raises(ValueError, match='MultiIndex columns'):
+            scorpion.output_manager._write_excel_streaming(str(tmp_path / 'drinks.xlsx'), [('drinks', df)])
+
+
+class TestSkipUnchangedOutput:
+
+    def test_unchanged_tables_are_linked_instead_of_written(self, output_manager_factory, data_frames, tmp_path,
+                                                            monkeypatch):
+        output_manager = output_manager_factory('csv', skip_unchanged=True)
+        monkeypatch.setattr(output_manager, '_get_current_date', lambda: '20260101')
+        output_manager.produce_output()
+
+        data_frames._data['drinks_africa'] = data_frames['drinks_africa'].assign(beer_servings=[26, 218])
+        monkeypatch.setattr(output_manager, '_get_current_date', lambda: '20260102')
+        output_manager.produce_output()
+
+        folder_previous = tmp_path / 'output__20260101'
+        folder_current = tmp_path / 'output__20260102'
+        europe_previous = os.stat(folder_previous / 'drinks__europe__20260101.csv')
+        europe_current = os.stat(folder_current / 'drinks__europe__20260102.csv')
+        assert europe_current.st_ino == europe_previous.st_ino
+        africa_previous = os.stat(folder_previous / 'drinks__africa__20260101.csv')
+        africa_current = os.stat(folder_current / 'drinks__africa__20260102.csv')
+        assert africa_current.st_ino != africa_previous.st_ino
+        df_africa = pd.read_csv(folder_current / 'drinks__africa__20260102.csv', sep=';', index_col=0)
+        assert df_africa['beer_servings'].tolist() == [26, 218]
+
+    @pytest.mark.parametrize('target_format, file_name', [
+        ('csv', 'drinks__africa__{}.csv'),
+        ('parquet', 'drinks__africa__{}.parquet'),
+        ('sqlite', 'drinks__{}.sqlite'),
+    ])
+    def test_rewriting_a_linked_output_keeps_the_earlier_file(self, output_manager_factory, data_frames, tmp_path,
+                                                               monkeypatch, target_format, file_name):
+        if target_format == 'parquet':
+            pytest.importorskip('pyarrow')
+        output_manager = output_manager_factory(target_format, skip_unchanged=True)
+        monkeypatch.setattr(output_manager, '_get_current_date', lambda: '20260101')
+        output_manager.produce_output()
+        file_previous = tmp_path / 'output__20260101' / file_name.format('20260101')
+        content_previous = file_previous.read_bytes()
+
+        # The unchanged output of the next day is linked to the file of the previous day
+        monkeypatch.setattr(output_manager, '_get_current_date', lambda: '20260102')
+        output_manager.produce_output()
+        file_current = tmp_path / 'output__20260102' / file_name.format('20260102')
+        assert os.stat(file_current).st_ino == os.stat(file_previous).st_ino
+
+        # Another run of the same day with changed data replaces the link instead of writing through it
+        data_frames._data['drinks_africa'] = data_frames['drinks_africa'].assign(beer_servings=[0, 9])
+        output_manager.produce_output()
+        assert file_previous.read_bytes() == content_previous
+        assert file_current.read_bytes() != content_previous
+        assert [name for name in os.listdir(file_current.parent) if name.startswith('.')] == []
+
+
+class TestPartitionedOutput:
+
+    def test_produce_hive_partitioned_output(self, output_manager_factory, data_frames, tmp_path):
+        pytest.importorskip('pyarrow')
+        import pyarrow.dataset
+
+        data_frames._data['drinks_africa'] = pd.DataFrame({
+            'country': ['Algeria', 'Angola', 'Albania', 'Andorra', 'Armenia'],
+            'continent': ['AF', 'AF', 'EU', 'EU', 'EU'],
+            'beer_servings': [25, 217, 89, 245, 21],
+        })
+        output_manager = output_manager_factory(
+            'parquet', parallel_executor='thread',
+            output_table_options={'africa': {'partition_columns': ['continent'], 'max_rows_per_file': 2}})
+        output_manager.produce_output()
+
+        table_folder = tmp_path / 'output__' / 'drinks__africa__'
+        assert sorted(os.listdir(table_folder)) == ['continent=AF', 'continent=EU']
+        assert sorted(os.listdir(table_folder / 'continent=EU')) == ['part-0000.parquet', 'part-0001.parquet']
+        df_africa = pyarrow.dataset.dataset(table_folder, partitioning='hive').to_table().to_pandas()
+        df_africa = df_africa.sort_values('beer_servings')
+        assert df_africa['country'].tolist() == ['Armenia', 'Algeria', 'Albania', 'Angola', 'Andorra']
+        assert df_africa['continent'].tolist() == ['EU', 'AF', 'EU', 'AF', 'EU']
+
+
+class TestSqliteOutput:
+
+    def test_produce_sqlite_output(self, output_manager_factory, data_frames, tmp_path):
+        data_frames['drinks_africa'].loc[1, 'wine_servings'] = float('nan')
+
+        output_manager = output_manager_factory('sqlite')
+        output_manager.produce_output()
+
+        database = str(tmp_path / 'output__' / 'drinks__.sqlite')
+        with sqlite3.connect(database) as connection:
+            df_europe = pd.read_sql_query('SELECT * FROM europe', connection, index_col='index')
+            df_africa = pd.read_sql_query('SELECT * FROM africa', connection, index_col='index')
+            column_types = {row[1]: row[2] for row in connection.execute('PRAGMA table_info(africa)')}
+        connection.close()
+        assert df_europe.columns.tolist() == ['country', 'beer_servings']
+        assert df_africa['beer_servings'].tolist() == [25, 217]
+        assert df_africa['wine_servings'].isna().tolist() == [False, True]
+        assert column_types == {'index': 'INTEGER', 'country': 'TEXT', 'beer_servings': 'INTEGER',
+                                'wine_servings': 'REAL'}
+
+    @pytest.mark.parametrize('values, expected_type, expected_values', [
+        (pd.array([1, None], dtype='Int64'), 'INTEGER', [1, None]),
+        (pd.array([True, None], dtype='boolean'), 'INTEGER', [1, None]),
+        (pd.Categorical(['EU', None]), 'TEXT', ['EU', None]),
+        (pd.to_datetime(['2020-01-02 03:04:05', None]), 'TEXT', ['2020-01-02 03:04:05', None]),
+        (pd.to_datetime(['2020-01-02', None]).tz_localize('UTC'), 'TEXT', ['2020-01-02 00:00:00', None]),
+        (pd.to_timedelta(['1 days 2 hours', None]), 'INTEGER', [26 * 3600 * 10 ** 9, None]),
+        (pd.period_range('2020-01', periods=2, freq='M'), 'TEXT', ['2020-01', '2020-02']),
+        (pd.Series([datetime.time(10, 30), None], dtype=object), 'TEXT', ['10:30:00', None]),
+        (pd.Series([decimal.Decimal('1.25'), None], dtype=object), 'TEXT', ['1.25', None]),
+        (pd.Series([datetime.timedelta(seconds=1), None], dtype=object), 'TEXT', ['1000000000', None]),
+        (pd.Series([b'ab', None], dtype=object), 'TEXT', [b'ab', None]),
+    ])
+    def test_dtypes_are_written(self, tmp_path, values, expected_type, expected_values):
+        database = str(tmp_path / 'dtypes.sqlite')
+        scorpion.output_manager._write_sqlite(database, [('dtypes', pd.DataFrame({'value': values}))])
+
+        with sqlite3.connect(database) as connection:
+            column_types = {row[1]: row[2] for row in connection.execute('PRAGMA table_info(dtypes)')}
+            rows = connection.execute('SELECT value FROM dtypes').fetchall()
+        connection.close()
+        assert column_types['value'] == expected_type
+        assert [value for value, in rows] == expected_values
+
+    @pytest.mark.parametrize('skip_unchanged', [False, True])
+    def test_tables_are_produced_one_at_a_time(self, monkeypatch, output_manager_factory, data_frames,
+                                               skip_unchanged):
+        events = []
+        get_item = type(data_frames).__getitem__
+
+        def record_get_item(manager, key):
+            events.append(('get', key))
+            return get_item(manager, key)
+
+        def record_tables(file_name, tables):
+            for table_name, _ in tables:
+                events.append(('write', table_name))
+
+        monkeypatch.setattr(type(data_frames), '__getitem__', record_get_item)
+        monkeypatch.setattr(scorpion.output_manager, '_write_sqlite', record_tables)
+        output_manager = output_manager_factory('sqlite', skip_unchanged=skip_unchanged)
+        events.clear()
+        output_manager.produce_output()
+
+        assert events[-4:] == [('get', 'drinks_europe'), ('write', 'europe'),
+                               ('get', 'drinks_africa'), ('write', 'africa')]
+        assert len(events) == (6 if skip_unchanged else 4)
+
+
+class TestBackgroundOutput:
+
+    @pytest.mark.parametrize('target_format', ['csv', 'sqlite'])
+    def test_tables_are_written_once_their_data_frames_are_final(self, output_manager_factory, tmp_path,
+                                                                 target_format):
+        output_manager = output_manager_factory(target_format, parallel_workers=2)
+        output_manager.start_background_output()
+        output_manager.data_frames_final(['drinks_europe'])
+        for future in output_manager._background_output.futures:
+            future.result()
+
+        target_folder = tmp_path / 'output__'
+        if target_format == 'csv':
+            assert os.listdir(target_folder) == ['drinks__europe__.csv']
+        else:
+            # A single file is only written once all of its tables are final
+            assert not os.path.exists(target_folder / 'drinks__.sqlite')
+
+        output_manager.produce_output()
+        assert output_manager._background_output is None
+        if target_format == 'csv':
+            assert sorted(os.listdir(target_folder)) == ['drinks__africa__.csv', 'drinks__europe__.csv']
+        else:
+            with sqlite3.connect(target_folder / 'drinks__.sqlite') as connection:
+                tables = [row[0] for row in connection.execute('SELECT name FROM sqlite_master ORDER BY name')]
+            connection.close()
+            assert tables == ['africa', 'europe']
@@ -0,0 +1,239 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import scorpion.data_frame_manager
+import scorpion.data_processor
+import scorpion.pipeline
+import scorpion.shared_frame_store
+
+
+class DataProcessorJoinContinents(scorpion.data_processor.DataProcessor):
+    key = 'join_continents'
+
+    def process(self) -> None:
+        df_drinks = self.get_data_frame_by_key('drinks')
+        df_continents = self.get_data_frame_by_key('continents')
+        self.add_data_frame_to_output('drinks_continents', df_drinks.merge(df_continents, on='continent'))
+
+
+class DataProcessorFail(scorpion.data_processor.DataProcessor):
+    key = 'fail'
+
+    def process(self) -> None:
+        raise RuntimeError('Processing failed')
+
+
+class StreamingDataProcessorFilterEurope(scorpion.data_processor.StreamingDataProcessor):
+    key = 'filter_europe'
+
+    def process_chunk(self, chunk):
+        return {'drinks_europe': chunk[chunk['continent'] == 'EU']}
+
+
+class StreamingDataProcessorSumBeerServings(scorpion.data_processor.StreamingDataProcessor):
+    key = 'sum_beer_servings'
+
+    def __init__(self):
+        super().__init__()
+        self._beer_servings = 0
+
+    def process_chunk(self, chunk):
+        self._beer_servings += chunk['beer_servings'].sum()
+        return {}
+
+    def finalize(self):
+        return {'beer_servings': pd.DataFrame({'beer_servings': [self._beer_servings]})}
+
+
+def pipeline(target_folder, df_drinks, df_continents, data_processor=DataProcessorJoinContinents):
+    return scorpion.pipeline.Pipeline(
+        process_instructions=[{
+            'uses_data_processor': data_processor.key,
+            'step': 1,
+            'skip': False,
+            'description': '',
+            'uses_data_frames_for_input': ['drinks', 'continents'],
+            'expected_output_data_frames': ['drinks_continents'],
+        }],
+        data_processors=[data_processor],
+        output_configuration={
+            'skip': False,
+            'target_format': 'csv',
+            'target_folder': target_folder,
+            'target_file_name': 'drinks.out',
+            'current_date_suffix_to_target_file_name': False,
+            'output_tables': [{
+                'skip': False,
+                'output_table_name': 'continents',
+                'output_table_data_frame': 'drinks_continents',
+                'output_table_columns': [],
+            }],
+        },
+        data_frames={'drinks': df_drinks, 'continents': df_continents},
+    )
+
+
+@pytest.fixture
+def df_continents():
+    return pd.DataFrame({'continent': ['EU', 'AF'], 'continent_name': ['Europe', 'Africa']})
+
+
+class TestPipeline:
+
+    def test_pipelines_run_side_by_side_with_shared_reference_data(self, tmp_path, df_continents):
+        pipelines = [
+            pipeline(str(tmp_path / 'europe'), pd.DataFrame({'country': ['Albania'], 'continent': ['EU']}),
+                     df_continents),
+            pipeline(str(tmp_path / 'africa'), pd.DataFrame({'country': ['Algeria'], 'continent': ['AF']}),
+                     df_continents),
+        ]
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(pipelines[0].run), pool.submit(pipelines[1].run, overlap_output=True)]
+            for future in futures:
+                future.result()
+
+        df_europe = pd.read_csv(tmp_path / 'europe__' / 'drinks__continents__.csv', sep=';', index_col=0)
+        df_africa = pd.read_csv(tmp_path / 'africa__' / 'drinks__continents__.csv', sep=';', index_col=0)
+        assert df_europe['continent_name'].tolist() == ['Europe']
+        assert df_africa['continent_name'].tolist() == ['Africa']
+        assert pipelines[0].data_frame_manager.data['continents'] is df_continents
+        assert pipelines[1].data_frame_manager.data['continents'] is df_continents
+
+    def test_streamed_data_frame_of_an_output_table_is_materialized(self, tmp_path):
+        pipeline_ = scorpion.pipeline.Pipeline(
+            process_instructions=[{
+                'uses_data_processor': 'filter_europe',
+                'step': 1,
+                'skip': False,
+                'description': '',
+                'uses_data_frames_for_input': ['drinks'],
+                'expected_output_data_frames': ['drinks_europe'],
+            }, {
+                'uses_data_processor': 'sum_beer_servings',
+                'step': 2,
+                'skip': False,
+                'description': '',
+                'uses_data_frames_for_input': ['drinks_europe'],
+                'expected_output_data_frames': ['beer_servings'],
+            }],
+            data_processors=[StreamingDataProcessorFilterEurope, StreamingDataProcessorSumBeerServings],
+            output_configuration={
+                'skip': False,
+                'target_format': 'csv',
+                'target_folder': str(tmp_path / 'europe'),
+                'target_file_name': 'drinks.out',
+                'current_date_suffix_to_target_file_name': False,
+                'output_tables': [{
+                    'skip': False,
+                    'output_table_name': 'europe',
+                    'output_table_data_frame': 'drinks_europe',
+                    'output_table_columns': [],
+                }],
+            },
+            data_frames={'drinks': pd.DataFrame({'country': ['Albania', 'Algeria'], 'continent': ['EU', 'AF'],
+                                                 'beer_servings': [89, 25]})},
+        )
+        pipeline_.run()
+
+        df_europe = pd.read_csv(tmp_path / 'europe__' / 'drinks__europe__.csv', sep=';', index_col=0)
+        assert df_europe['country'].tolist() == ['Albania']
+        assert pipeline_.data_frame_manager['beer_servings']['beer_servings'].tolist() == [89]
+
+    def test_partitioned_process_execution_shares_data_frames_and_removes_them(self, tmp_path, monkeypatch,
+                                                                              df_continents):
+        pytest.importorskip('pyarrow')
+        stores = []
+
+        class RecordingSharedFrameStore(scorpion.shared_frame_store.SharedFrameStore):
+            def __init__(self, directory):
+                super().__init__(directory)
+                self.shared_keys = []
+                stores.append(self)
+
+            def share(self, df):
+                self.shared_keys.append(list(df.columns))
+                return super().share(df)
+
+        monkeypatch.setattr(scorpion.pipeline, 'SharedFrameStore', RecordingSharedFrameStore)
+        pipeline_ = pipeline(str(tmp_path / 'world'),
+                             pd.DataFrame({'country': ['Albania', 'Algeria'], 'continent': ['EU', 'AF']}),
+                             df_continents)
+        process_instruction = pipeline_.data_processor_manager.process_instructions[0]
+        monkeypatch.setattr(process_instruction, 'partition_by', 'country')
+        monkeypatch.setattr(process_instruction, 'partition_workers', 2)
+        pipeline_.shared_frame_directory = str(tmp_path)
+        pipeline_.run(share_frames=True)
+
+        df_world = pd.read_csv(tmp_path / 'world__' / 'drinks__continents__.csv', sep=';', index_col=0)
+        assert sorted(df_world['continent_name']) == ['Africa', 'Europe']
+        assert len(stores) == 1
+        assert stores[0].shared_keys == [['continent', 'continent_name']]
+        assert not os.path.exists(stores[0].directory)
+        assert pipeline_.data_processor_manager.shared_frame_store is None
+
+    def test_data_frames_are_shared_only_on_request(self, tmp_path, monkeypatch, df_continents):
+        monkeypatch.setattr(scorpion.pipeline, 'SharedFrameStore', None)
+        pipeline_ = pipeline(str(tmp_path / 'world'),
+                             pd.DataFrame({'country': ['Albania', 'Algeria'], 'continent': ['EU', 'AF']}),
+                             df_continents)
+        process_instruction = pipeline_.data_processor_manager.process_instructions[0]
+        monkeypatch.setattr(process_instruction, 'partition_by', 'country')
+        monkeypatch.setattr(process_instruction, 'partition_workers', 2)
+        pipeline_.run()
+
+        df_world = pd.read_csv(tmp_path / 'world__' / 'drinks__continents__.csv', sep=';', index_col=0)
+        assert sorted(df_world['continent_name']) == ['Africa', 'Europe']
+
+    def test_partitions_are_sent_as_they_are_if_the_shared_frame_directory_is_full(self, tmp_path, monkeypatch,
+                                                                                  df_continents):
+        pyarrow_ipc = pytest.importorskip('pyarrow.ipc')
+
+        def new_file(file_name, schema):
+            with open(file_name, 'wb') as file:
+                file.write(b'ARROW1')
+            raise OSError(28, 'No space left on device')
+
+        monkeypatch.setattr(pyarrow_ipc, 'new_file', new_file)
+        pipeline_ = pipeline(str(tmp_path / 'world'),
+                             pd.DataFrame({'country': ['Albania', 'Algeria'], 'continent': ['EU', 'AF']}),
+                             df_continents)
+        process_instruction = pipeline_.data_processor_manager.process_instructions[0]
+        monkeypatch.setattr(process_instruction, 'partition_by', 'country')
+        monkeypatch.setattr(process_instruction, 'partition_workers', 2)
+        pipeline_.shared_frame_directory = str(tmp_path / 'shm')
+        os.mkdir(pipeline_.shared_frame_directory)
+        pipeline_.run(share_frames=True)
+
+        df_world = pd.read_csv(tmp_path / 'world__' / 'drinks__continents__.csv', sep=';', index_col=0)
+        assert sorted(df_world['continent_name']) == ['Africa', 'Europe']
+        assert os.listdir(pipeline_.shared_frame_directory) == []
+
+    def test_failed_run_cancels_background_output_and_removes_spill_files(self, tmp_path, df_continents):
+        pytest.importorskip('pyarrow')
+        pipeline_ = pipeline(str(tmp_path / 'world'),
+                             pd.DataFrame({'country': ['Albania', 'Algeria'], 'continent': ['EU', 'AF']}),
+                             df_continents, DataProcessorFail)
+        pipeline_.data_frame_manager.memory_budget = 1
+        pipeline_.data_frame_manager['drinks_asia'] = pd.DataFrame({'country': ['Armenia'], 'continent': ['AS']})
+        spill_directory = pipeline_.data_frame_manager.spill_directory
+        assert len(os.listdir(spill_directory)) == 2
+
+        with pytest.raises(RuntimeError, match='Processing failed'):
+            pipeline_.run(overlap_output=True)
+
+        assert pipeline_.output_manager._background_output is None
+        assert pipeline_.data_processor_manager.on_data_frames_final is None
+        assert not os.path.exists(spill_directory)
+        # Data frames which were spilled are removed, the data frame in memory is kept
+        assert len(pipeline_.data_frame_manager.keys()) == 1
+        assert all(isinstance(df, pd.DataFrame) for df in pipeline_.data_frame_manager.data.values())
+
+    def test_pipelines_do_not_use_the_singletons(self, tmp_path, df_continents):
+        pipeline_ = pipeline(str(tmp_path / 'europe'), pd.DataFrame({'country': ['Albania'], 'continent': ['EU']}),
+                             df_continents)
+        assert pipeline_.data_frame_manager is not scorpion.data_frame_manager.DataFrameManager()
+        assert 'drinks' not in scorpion.data_frame_manager.DataFrameManager()
+        assert pipeline_.output_manager.output_configuration['target_folder'].endswith('europe')
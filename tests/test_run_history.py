@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import scorpion.run_history
+from scorpion.data_processor_manager import ProcessInstruction
+
+
+class TestRunHistory:
+
+    process_instruction = ProcessInstruction(
+        uses_data_processor='processor_1',
+        step=1,
+        skip=False,
+        description='',
+        uses_data_frames_for_input=['drinks'],
+        expected_output_data_frames=['drinks_eu'],
+    )
+
+    def test_estimates_are_median_of_saved_records(self, tmp_path):
+        file_path = str(tmp_path / 'history' / 'run_history.json')
+        run_history = scorpion.run_history.RunHistory(file_path)
+        for duration, memory_bytes in [(1.0, 100), (9.0, 300), (2.0, 200)]:
+            run_history.record(self.process_instruction, duration, memory_bytes)
+        run_history.save()
+
+        run_history_loaded = scorpion.run_history.RunHistory(file_path)
+        assert run_history_loaded.step_durations([self.process_instruction]) == {1: 2.0}
+        assert run_history_loaded.step_memory([self.process_instruction]) == {1: 200}
+
+    def test_keeps_latest_records_only(self, tmp_path):
+        run_history = scorpion.run_history.RunHistory(str(tmp_path / 'run_history.json'))
+        for duration in range(run_history.max_records + 5):
+            run_history.record(self.process_instruction, float(duration), 0)
+        assert run_history.step_durations([self.process_instruction]) == {1: 9.5}
+
+    def test_unknown_step_has_no_estimate(self, tmp_path):
+        run_history = scorpion.run_history.RunHistory(str(tmp_path / 'run_history.json'))
+        assert run_history.step_durations([self.process_instruction]) == {}
+
+
+def test_peak_memory_sampler_measures_growth():
+    pytest.importorskip('psutil')
+    with scorpion.run_history.PeakMemorySampler() as sampler:
+        data = b'x' * (64 * 2 ** 20)
+        time.sleep(0.05)
+    del data
+    assert sampler.growth_bytes >= 32 * 2 ** 20
+    assert sampler.peak_bytes >= sampler.growth_bytes
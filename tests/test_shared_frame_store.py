@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+import scorpion.shared_frame_store
+
+pytest.importorskip('pyarrow')
+
+
+def sum_beer_servings(handle):
+    return int(handle.open()['beer_servings'].sum())
+
+
+@pytest.fixture
+def shared_frame_store(tmp_path):
+    shared_frame_store = scorpion.shared_frame_store.SharedFrameStore(str(tmp_path))
+    yield shared_frame_store
+    shared_frame_store.close()
+
+
+@pytest.fixture
+def df_drinks():
+    return pd.DataFrame({
+        'country': ['Albania', 'Algeria', 'Andorra'],
+        'beer_servings': [89, 25, 245],
+    })
+
+
+class TestSharedFrameStore:
+
+    def test_views_are_read_only(self, shared_frame_store, df_drinks):
+        shared_frame_store['drinks'] = df_drinks
+        df = shared_frame_store['drinks']
+        pd.testing.assert_frame_equal(df, df_drinks)
+        assert not df['beer_servings'].to_numpy().flags.writeable
+        with pytest.raises(ValueError):
+            df.loc[0, 'beer_servings'] = 0
+
+    def test_handles_open_in_worker_processes(self, shared_frame_store, df_drinks):
+        shared_frame_store['drinks'] = df_drinks
+        handle = shared_frame_store.handle('drinks')
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            assert list(pool.map(sum_beer_servings, [handle, handle])) == [359, 359]
+
+    def test_non_data_frame_values_have_no_handle(self, shared_frame_store):
+        shared_frame_store['settings'] = {'chunk_size': 2}
+        assert shared_frame_store['settings'] == {'chunk_size': 2}
+        with pytest.raises(scorpion.shared_frame_store.SharedFrameStoreError):
+            shared_frame_store.handle('settings')
+
+    def test_failed_write_raises_and_removes_the_partial_file(self, shared_frame_store, df_drinks, monkeypatch):
+        import pyarrow.ipc
+
+        def new_file(file_name, schema):
+            with open(file_name, 'wb') as file:
+                file.write(b'ARROW1')
+            raise OSError(28, 'No space left on device')
+
+        monkeypatch.setattr(pyarrow.ipc, 'new_file', new_file)
+        with pytest.raises(scorpion.shared_frame_store.SharedFrameStoreError, match='No space left'):
+            shared_frame_store.share(df_drinks)
+        assert os.listdir(shared_frame_store.directory) == []
@@ -1,3 +1,6 @@
+import sqlite3
+
+import pandas as pd
 import pytest
 
 import scorpion.sources
@@ -359,3 +362,77 @@ class TestSourceConfigPositive:
         )
         with pytest.raises(scorpion.sources.SourceManagementError):
             _ = source_config.config
+
+
+class TestSourceFileLoaderSqlite:
+
+    @pytest.fixture
+    def database(self, tmp_path):
+        database = str(tmp_path / 'drinks.sqlite')
+        with sqlite3.connect(database) as connection:
+            connection.execute('CREATE TABLE drinks (country TEXT, beer_servings INTEGER)')
+            connection.executemany('INSERT INTO drinks VALUES (?, ?)',
+                                   [('Albania', 89), ('Algeria', 25), ('Andorra', 245)])
+        connection.close()
+        return database
+
+    def test_load(self, database):
+        df = scorpion.sources.SourceFileLoader.load(
+            format='sqlite', database=database, query='SELECT * FROM drinks ORDER BY country', batch_size=2)
+        assert df['country'].tolist() == ['Albania', 'Algeria', 'Andorra']
+        assert df.index.tolist() == [0, 1, 2]
+
+    def test_load_chunks(self, database):
+        chunks = scorpion.sources.SourceFileLoader.load_chunks(
+            chunksize=2, format='sqlite', database=database, query='SELECT * FROM drinks')
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert chunks.materialize()['beer_servings'].sum() == 359
+
+
+class TestSourceCache:
+
+    def test_same_file_is_loaded_once_and_reloaded_after_change(self, tmp_path):
+        file_name = tmp_path / 'drinks.csv'
+        pd.DataFrame({'country': ['Albania']}).to_csv(file_name, index=False)
+        source_cache = scorpion.sources.SourceCache()
+
+        df_first = source_cache.load({'format': 'csv', 'filepath_or_buffer': str(file_name)})
+        df_second = source_cache.load({'format': 'csv', 'filepath_or_buffer': str(tmp_path / '.' / 'drinks.csv')})
+        assert df_second is df_first
+
+        pd.DataFrame({'country': ['Algeria', 'Angola']}).to_csv(file_name, index=False)
+        df_changed = source_cache.load({'format': 'csv', 'filepath_or_buffer': str(file_name)})
+        assert df_changed['country'].tolist() == ['Algeria', 'Angola']
+        assert (source_cache.load_count, source_cache.hit_count) == (2, 1)
+
+    def test_different_loader_config_is_loaded_separately(self, tmp_path):
+        file_name = tmp_path / 'drinks.csv'
+        pd.DataFrame({'country': ['Albania', 'Algeria']}).to_csv(file_name, index=False)
+        source_cache = scorpion.sources.SourceCache()
+
+        df_all = source_cache.load({'format': 'csv', 'filepath_or_buffer': str(file_name)})
+        df_first_row = source_cache.load({'format': 'csv', 'filepath_or_buffer': str(file_name), 'nrows': 1})
+        assert (len(df_all), len(df_first_row)) == (2, 1)
+        assert source_cache.load_count == 2
+
+    def test_least_recently_used_sources_are_evicted_above_max_bytes(self, tmp_path):
+        source_configs = {}
+        for name in ['drinks', 'continents', 'countries']:
+            pd.DataFrame({'name': [f'{name}_{number}' for number in range(100)]}).to_csv(
+                tmp_path / f'{name}.csv', index=False)
+            source_configs[name] = {'format': 'csv', 'filepath_or_buffer': str(tmp_path / f'{name}.csv')}
+        source_cache = scorpion.sources.SourceCache()
+        memory_bytes = int(source_cache.load(source_configs['drinks']).memory_usage(deep=True).sum())
+        source_cache = scorpion.sources.SourceCache(max_bytes=int(memory_bytes * 2.5))
+
+        df_drinks = source_cache.load(source_configs['drinks'])
+        source_cache.load(source_configs['continents'])
+        source_cache.load(source_configs['drinks'])
+        source_cache.load(source_configs['countries'])
+        assert (len(source_cache), source_cache.eviction_count) == (2, 1)
+        assert source_cache.memory_bytes <= source_cache.max_bytes
+
+        # The evicted source is loaded again, the recently used one is still cached
+        assert source_cache.load(source_configs['drinks']) is df_drinks
+        source_cache.load(source_configs['continents'])
+        assert (source_cache.load_count, source_cache.hit_count) == (4, 2)
@@ -1,6 +1,11 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from fixtures.fixtures import generic_manager
+import scorpion.util_classes
+from fixtures.fixtures import generic_manager, GenericManagerTestException
 
 
 class TestAbstractManagerUsingDataFrameManagerPositive:
@@ -57,4 +62,56 @@ class TestAbstractManagerUsingDataFrameManagerPositive:
     #
     # @pytest.mark.parametrize(*content_2nd_level)
     # def test_load_json_2nd_level(self, config_from_json, key, expected):
-    #     assert (key in config_from_json['config']) == expected
\ No newline at end of file
+    #     assert (key in config_from_json['config']) == expected
+
+
+class TestGenericManagerConcurrency:
+
+    def test_key_is_set_only_once_by_concurrent_producers(self, generic_manager):
+        barrier = threading.Barrier(8)
+
+        def produce(value):
+            barrier.wait()
+            try:
+                generic_manager['drinks'] = value
+            except GenericManagerTestException:
+                return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(produce, range(8)))
+        assert results.count(True) == 1
+        assert generic_manager['drinks'] == results.index(True)
+
+    def test_consumer_waits_until_key_is_produced(self, generic_manager):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            consumer = pool.submit(generic_manager.wait_for_multiple_items, ['drinks', 'continents'], 5)
+            generic_manager['drinks'] = 'drinks'
+            time.sleep(0.05)
+            assert not consumer.done()
+            generic_manager['continents'] = 'continents'
+            assert consumer.result() == {'drinks': 'drinks', 'continents': 'continents'}
+
+    def test_wait_for_raises_after_timeout(self, generic_manager):
+        with pytest.raises(GenericManagerTestException):
+            generic_manager.wait_for('drinks', timeout=0.01)
+
+
+def test_singleton_creates_one_instance_under_concurrent_calls():
+    barrier = threading.Barrier(8)
+    created = []
+
+    @scorpion.util_classes.singleton
+    class SlowToCreate:
+        def __init__(self):
+            created.append(self)
+            time.sleep(0.05)
+
+    def get_instance():
+        barrier.wait()
+        return SlowToCreate()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        instances = list(pool.map(lambda _: get_instance(), range(8)))
+    assert len(created) == 1
+    assert all(instance is created[0] for instance in instances)